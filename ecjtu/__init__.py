@@ -3,8 +3,12 @@
 
 import sys
 
+from ecjtu.changes import Changes
 from ecjtu.client import ECJTU, AsyncECJTU
-from ecjtu.models import GPA, ElectiveCourse, ScheduledCourse, Score
+from ecjtu.columnar import ColumnarResult
+from ecjtu.models import GPA, ElectiveCourse, ScheduledCourse, Score, ScoreSheet
+from ecjtu.pool import AsyncClientPool, ClientPool
+from ecjtu.retry import RetryPolicy
 
 if sys.version_info >= (3, 8):
     from importlib import metadata as importlib_metadata
@@ -20,4 +24,17 @@ def get_version() -> str:
 
 
 version: str = get_version()
-__all__ = ["ECJTU", "AsyncECJTU", "GPA", "ElectiveCourse", "ScheduledCourse", "Score"]
+__all__ = [
+    "ECJTU",
+    "AsyncECJTU",
+    "GPA",
+    "ElectiveCourse",
+    "ScheduledCourse",
+    "Score",
+    "ScoreSheet",
+    "ColumnarResult",
+    "Changes",
+    "RetryPolicy",
+    "ClientPool",
+    "AsyncClientPool",
+]
@@ -0,0 +1,285 @@
+"""Circuit breakers of the ECJTU systems, so that an outage fails fast instead of
+every request waiting for its timeout.
+
+Clients created with `circuit_breaker=True` send their requests through the
+process-wide breaker of the system they call, CAS or JWXT. A breaker opens
+after `failure_threshold` consecutive failures (transport errors or 5xx), then
+rejects every request with `CircuitOpenError` for `recovery_timeout` seconds.
+After that, it lets `half_open_max_calls` probe requests through: if they
+succeed the breaker closes again, if one fails it opens for another period.
+
+Clients created with `serve_stale=True` also answer with the last resource they
+fetched successfully when the upstream fails, that is on a transport error, an
+open breaker or a 5xx status, see `track_staleness` to know
+whether a result is stale:
+
+    with track_staleness() as staleness:
+        scores = client.scores.today()
+    if staleness.fetched_at is not None:
+        print(f"scores are {staleness.age:.0f}s old")
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import httpx
+
+from ecjtu.constants import CAS_ECJTU_DOMAIN
+from ecjtu.exceptions import CircuitOpenError
+from ecjtu.utils.logger import logger
+
+# status codes telling that the server is failing, 429 means it is alive
+FAILURE_STATUS_CODES = (500, 502, 503, 504)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """State machine of the circuit breaker of an upstream system.
+
+    Args:
+        name(str): Name of the upstream, used in logs and errors
+        failure_threshold(int): Consecutive failures opening the breaker
+        recovery_timeout(float): Seconds the breaker stays open before probing
+        half_open_max_calls(int): Probe requests allowed at once when half open
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        """closed, open or half_open"""
+        with self._lock:
+            if self._state == OPEN and self._retry_in() <= 0:
+                return HALF_OPEN
+            return self._state
+
+    def _retry_in(self) -> float:
+        return self._opened_at + self.recovery_timeout - time.monotonic()
+
+    def before_request(self) -> None:
+        """Let a request through, or reject it.
+
+        Raises:
+            CircuitOpenError: if the breaker is open, or half open with all of
+                its probes in flight
+        """
+        with self._lock:
+            if self._state == OPEN:
+                retry_in = self._retry_in()
+                if retry_in > 0:
+                    raise CircuitOpenError(
+                        f"Upstream {self.name} is unavailable, retry in {retry_in:.1f}s"
+                    )
+                self._state = HALF_OPEN
+                self._probes = 0
+
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    raise CircuitOpenError(
+                        f"Upstream {self.name} is unavailable, probing for recovery"
+                    )
+                self._probes += 1
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Upstream {self.name} recovered, circuit closed")
+            self._state = CLOSED
+            self._failures = 0
+
+    def on_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning(
+                        f"Upstream {self.name} failing, circuit open for "
+                        f"{self.recovery_timeout:.0f}s"
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def on_abort(self) -> None:
+        """The request was cancelled, or failed before reaching the upstream."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def reset(self) -> None:
+        """Close the breaker, forgetting the failures."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+
+
+class BreakerTransport(httpx.BaseTransport):
+    """Send requests through another transport, guarded by the circuit breakers
+    of the upstream systems.
+
+    Args:
+        transport(httpx.BaseTransport): Transport sending the requests
+    """
+
+    def __init__(self, transport: httpx.BaseTransport) -> None:
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        breaker = get_circuit_breaker(request)
+        breaker.before_request()
+        try:
+            response = self._transport.handle_request(request)
+        except httpx.TransportError:
+            breaker.on_failure()
+            raise
+        except BaseException:
+            breaker.on_abort()
+            raise
+        if response.status_code in FAILURE_STATUS_CODES:
+            breaker.on_failure()
+        else:
+            breaker.on_success()
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncBreakerTransport(httpx.AsyncBaseTransport):
+    """Async version of `BreakerTransport`.
+
+    Args:
+        transport(httpx.AsyncBaseTransport): Transport sending the requests
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        breaker = get_circuit_breaker(request)
+        breaker.before_request()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TransportError:
+            breaker.on_failure()
+            raise
+        except BaseException:
+            breaker.on_abort()
+            raise
+        if response.status_code in FAILURE_STATUS_CODES:
+            breaker.on_failure()
+        else:
+            breaker.on_success()
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+_lock = threading.Lock()
+_options: Dict[str, Any] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def configure_circuit_breakers(
+    failure_threshold: int = 5,
+    recovery_timeout: float = 30.0,
+    half_open_max_calls: int = 1,
+) -> None:
+    """Replace the process-wide breakers with closed ones of the given options.
+
+    Args:
+        failure_threshold(int): Consecutive failures opening a breaker
+        recovery_timeout(float): Seconds a breaker stays open before probing
+        half_open_max_calls(int): Probe requests allowed at once when half open
+    """
+    with _lock:
+        _options.update(
+            failure_threshold=failure_threshold,
+            recovery_timeout=recovery_timeout,
+            half_open_max_calls=half_open_max_calls,
+        )
+        _breakers.clear()
+
+
+def get_circuit_breaker(request: httpx.Request) -> CircuitBreaker:
+    """Get the process-wide breaker of the upstream system a request is sent to."""
+    name = "cas" if request.url.host == CAS_ECJTU_DOMAIN else "jwxt"
+    with _lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **_options)
+        return breaker
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Whether error tells that the upstream is down or failing, the only errors
+    stale resources are served for. Anything else, eg: an expired session or a
+    page that cannot be parsed, would not be fixed by serving old data."""
+    if isinstance(error, (httpx.TransportError, CircuitOpenError)):
+        return True
+    return (
+        isinstance(error, httpx.HTTPStatusError) and error.response.status_code >= 500
+    )
+
+
+class Staleness:
+    """When the oldest stale resource read in a `track_staleness` block was
+    fetched, None if every resource was fresh."""
+
+    def __init__(self) -> None:
+        self.fetched_at: Optional[float] = None
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the oldest stale resource was fetched."""
+        if self.fetched_at is None:
+            return None
+        return time.time() - self.fetched_at
+
+
+_staleness: contextvars.ContextVar[Optional[Staleness]] = contextvars.ContextVar(
+    "ecjtu_staleness", default=None
+)
+
+
+@contextmanager
+def track_staleness() -> Iterator[Staleness]:
+    """Record whether the resources read in the block are stale, in the current
+    thread or asyncio task."""
+    staleness = Staleness()
+    token = _staleness.set(staleness)
+    try:
+        yield staleness
+    finally:
+        _staleness.reset(token)
+
+
+def record_stale(fetched_at: float) -> None:
+    """Record that a stale resource, fetched at the given time, was served."""
+    staleness = _staleness.get()
+    if staleness is not None and (
+        staleness.fetched_at is None or fetched_at < staleness.fetched_at
+    ):
+        staleness.fetched_at = fetched_at
@@ -0,0 +1,87 @@
+"""Cache of the resources fetched by the CRUD clients."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+MISSING: Any = object()
+
+
+class TTLCache:
+    """A thread-safe LRU cache whose entries expire `ttl` seconds after they are
+    set.
+
+    Args:
+        maxsize(int): Max entries kept, the least recently used entry is evicted
+            when the cache is full
+        ttl(float): Seconds an entry stays fresh, 0 disables the cache
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not MISSING
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Get a fresh entry.
+
+        Args:
+            key(Hashable): Key of the entry
+            default(Any): Returned if the entry is missing or expired
+
+        Returns:
+            Any: The cached value or default
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Set an entry.
+
+        Args:
+            key(Hashable): Key of the entry
+            value(Any): Value to cache
+            ttl(Optional[float]): Seconds the entry stays fresh, defaults to
+                `self.ttl`
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop an entry.
+
+        Args:
+            key(Hashable): Key of the entry
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
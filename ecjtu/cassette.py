@@ -0,0 +1,413 @@
+"""Record the exchanges of a client with the ECJTU systems to a cassette file and
+replay them from disk, for deterministic runs without network access.
+
+A client records when it sends its requests through a `RecordTransport`, every
+hop of the login redirect chain included, and replays them from a
+`ReplayTransport`:
+
+    client = ECJTU(stud_id, password, transport=RecordTransport("login.json"))
+    client.close()  # the cassette is written when the transport is closed
+
+    client = ECJTU(stud_id, password, transport=ReplayTransport("login.json"))
+
+Passwords and session cookies are redacted before they are written, replayed
+requests are redacted the same way before they are matched.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from ecjtu.exceptions import CassetteError
+
+CASSETTE_FORMAT_VERSION = 1
+REDACTED = "REDACTED"
+
+# form fields carrying the password, in plain text or encrypted
+_PASSWORD_FIELD_PATTERN = re.compile(rb"((?:^|&)(?:pwd|password)=)[^&]*")
+# the password encryption API answers with a JS object literal
+_ENC_PASSWORD_PATTERN = re.compile(rb"""(['"]passwordEnc['"]\s*:\s*['"])[^'"]*""")
+_SET_COOKIE_PATTERN = re.compile(r"^([^=;]+=)[^;]*")
+# headers describing the encoding of the recorded body rather than the body itself
+_TRANSFER_HEADERS = frozenset(
+    ["content-encoding", "content-length", "transfer-encoding"]
+)
+
+_Key = Tuple[str, str, bytes]
+
+
+def _redact_body(content: bytes) -> bytes:
+    content = _PASSWORD_FIELD_PATTERN.sub(rb"\1" + REDACTED.encode(), content)
+    return _ENC_PASSWORD_PATTERN.sub(rb"\1" + REDACTED.encode(), content)
+
+
+def _live_response(response: httpx.Response, request: httpx.Request) -> httpx.Response:
+    """Copy of a read response, unredacted, for the client recording it."""
+    headers = [
+        (name, value)
+        for name, value in response.headers.multi_items()
+        if name not in _TRANSFER_HEADERS
+    ]
+    return httpx.Response(
+        response.status_code,
+        headers=headers,
+        content=response.content,
+        request=request,
+    )
+
+
+def _request_key(request: httpx.Request) -> _Key:
+    return request.method, str(request.url), _redact_body(request.read())
+
+
+def _dump_content(content: bytes) -> Dict[str, str]:
+    try:
+        return {"encoding": "utf-8", "content": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"encoding": "base64", "content": base64.b64encode(content).decode()}
+
+
+def _load_content(data: Dict[str, str]) -> bytes:
+    if data["encoding"] == "base64":
+        return base64.b64decode(data["content"])
+    return data["content"].encode("utf-8")
+
+
+class Interaction:
+    """A recorded request and the response of the ECJTU system to it.
+
+    Args:
+        method(str): Method of the request
+        url(str): URL of the request
+        body(bytes): Redacted body of the request
+        status_code(int): Status code of the response
+        headers(List[Tuple[str, str]]): Redacted headers of the response
+        content(bytes): Decoded body of the response
+        elapsed(float): Seconds the ECJTU system took to answer
+    """
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        body: bytes,
+        status_code: int,
+        headers: List[Tuple[str, str]],
+        content: bytes,
+        elapsed: float = 0.0,
+    ) -> None:
+        self.method = method
+        self.url = url
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.elapsed = elapsed
+
+    @property
+    def key(self) -> _Key:
+        return self.method, self.url, self.body
+
+    @classmethod
+    def from_exchange(
+        cls, request: httpx.Request, response: httpx.Response, elapsed: float
+    ) -> "Interaction":
+        """Record an exchange, redacting the secrets in it.
+
+        Args:
+            request(httpx.Request): The request, its body must be read
+            response(httpx.Response): The response, its body must be read
+            elapsed(float): Seconds the ECJTU system took to answer
+
+        Returns:
+            Interaction: The recorded exchange
+        """
+        headers: List[Tuple[str, str]] = []
+        for name, value in response.headers.multi_items():
+            if name in _TRANSFER_HEADERS:
+                continue
+            if name == "set-cookie":
+                value = _SET_COOKIE_PATTERN.sub(rf"\g<1>{REDACTED}", value)
+            headers.append((name, value))
+
+        method, url, body = _request_key(request)
+        return cls(
+            method,
+            url,
+            body,
+            response.status_code,
+            headers,
+            _redact_body(response.content),
+            elapsed,
+        )
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            self.status_code,
+            headers=self.headers,
+            content=self.content,
+            request=request,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request": {
+                "method": self.method,
+                "url": self.url,
+                "body": _dump_content(self.body),
+            },
+            "response": {
+                "status_code": self.status_code,
+                "headers": [list(header) for header in self.headers],
+                "body": _dump_content(self.content),
+                "elapsed": self.elapsed,
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Interaction":
+        request, response = data["request"], data["response"]
+        return cls(
+            request["method"],
+            request["url"],
+            _load_content(request["body"]),
+            response["status_code"],
+            [(name, value) for name, value in response["headers"]],
+            _load_content(response["body"]),
+            response.get("elapsed", 0.0),
+        )
+
+
+class Cassette:
+    """Interactions recorded to, or replayed from, a JSON file.
+
+    Args:
+        path(str): The cassette file
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.interactions: List[Interaction] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        """Read a cassette file.
+
+        Args:
+            path(str): The cassette file
+
+        Returns:
+            Cassette: The cassette
+
+        Raises:
+            CassetteError: if the file is not a cassette
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_FORMAT_VERSION:
+            raise CassetteError(f"Unsupported cassette file: {path}")
+
+        cassette = cls(path)
+        cassette.interactions = [
+            Interaction.from_dict(interaction) for interaction in data["interactions"]
+        ]
+        return cassette
+
+    def append(self, interaction: Interaction) -> None:
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def save(self) -> None:
+        """Write the cassette file atomically."""
+        with self._lock:
+            data = {
+                "version": CASSETTE_FORMAT_VERSION,
+                "interactions": [
+                    interaction.to_dict() for interaction in self.interactions
+                ],
+            }
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        # unique per save, so that concurrent saves never share a temporary file
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class _Player:
+    """Serve the interactions of a cassette in recorded order, per request.
+
+    The same request sent several times gets the recorded responses in turn,
+    then the last one again.
+    """
+
+    def __init__(self, cassette: Cassette, latency: float, realtime: bool) -> None:
+        self.latency = latency
+        self.realtime = realtime
+        self._queues: Dict[_Key, Deque[Interaction]] = defaultdict(deque)
+        self._last: Dict[_Key, Interaction] = {}
+        self._lock = threading.Lock()
+        for interaction in cassette.interactions:
+            self._queues[interaction.key].append(interaction)
+
+    def play(self, request: httpx.Request) -> Tuple[Interaction, float]:
+        """Find the recorded interaction of a request.
+
+        Returns:
+            Tuple[Interaction, float]: The interaction, and the seconds to wait
+            before answering
+
+        Raises:
+            CassetteError: if the request was not recorded
+        """
+        key = _request_key(request)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                self._last[key] = queue.popleft()
+            interaction = self._last.get(key)
+
+        if interaction is None:
+            raise CassetteError(
+                f"No recorded response to {request.method} {request.url}"
+            )
+
+        delay = self.latency + (interaction.elapsed if self.realtime else 0.0)
+        return interaction, delay
+
+
+class RecordTransport(httpx.BaseTransport):
+    """Send requests through a real transport and record the exchanges, the
+    cassette is written when the transport is closed.
+
+    Args:
+        path(str): The cassette file to write
+        transport(Optional[httpx.BaseTransport]): Transport sending the requests,
+            defaults to a new `httpx.HTTPTransport`
+    """
+
+    def __init__(
+        self, path: str, transport: Optional[httpx.BaseTransport] = None
+    ) -> None:
+        self.cassette = Cassette(path)
+        self._transport = transport or httpx.HTTPTransport(verify=False)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        start = time.monotonic()
+        response = self._transport.handle_request(request)
+        try:
+            response.read()
+        finally:
+            response.close()
+
+        interaction = Interaction.from_exchange(
+            request, response, time.monotonic() - start
+        )
+        self.cassette.append(interaction)
+        # only the cassette is redacted, the client needs the real secrets to
+        # log in
+        return _live_response(response, request)
+
+    def close(self) -> None:
+        self.cassette.save()
+        self._transport.close()
+
+
+class AsyncRecordTransport(httpx.AsyncBaseTransport):
+    """Async version of `RecordTransport`.
+
+    Args:
+        path(str): The cassette file to write
+        transport(Optional[httpx.AsyncBaseTransport]): Transport sending the
+            requests, defaults to a new `httpx.AsyncHTTPTransport`
+    """
+
+    def __init__(
+        self, path: str, transport: Optional[httpx.AsyncBaseTransport] = None
+    ) -> None:
+        self.cassette = Cassette(path)
+        self._transport = transport or httpx.AsyncHTTPTransport(verify=False)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        start = time.monotonic()
+        response = await self._transport.handle_async_request(request)
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+
+        interaction = Interaction.from_exchange(
+            request, response, time.monotonic() - start
+        )
+        self.cassette.append(interaction)
+        # only the cassette is redacted, the client needs the real secrets to
+        # log in
+        return _live_response(response, request)
+
+    async def aclose(self) -> None:
+        self.cassette.save()
+        await self._transport.aclose()
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """Answer requests with the responses recorded in a cassette, without any
+    network access.
+
+    Args:
+        path(str): The cassette file to read
+        latency(float): Seconds added before every response
+        realtime(bool): Also wait as long as the ECJTU system took to answer
+            when the cassette was recorded
+    """
+
+    def __init__(self, path: str, latency: float = 0.0, realtime: bool = False):
+        self.cassette = Cassette.load(path)
+        self._player = _Player(self.cassette, latency, realtime)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        interaction, delay = self._player.play(request)
+        if delay > 0:
+            time.sleep(delay)
+        return interaction.to_response(request)
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    """Async version of `ReplayTransport`.
+
+    Args:
+        path(str): The cassette file to read
+        latency(float): Seconds added before every response
+        realtime(bool): Also wait as long as the ECJTU system took to answer
+            when the cassette was recorded
+    """
+
+    def __init__(self, path: str, latency: float = 0.0, realtime: bool = False):
+        self.cassette = Cassette.load(path)
+        self._player = _Player(self.cassette, latency, realtime)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        interaction, delay = self._player.play(request)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return interaction.to_response(request)
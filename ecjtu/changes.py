@@ -0,0 +1,149 @@
+"""Change detection between two fetches of the same rows, eg: to notice new
+scores by polling.
+
+Every row is identified by a key made of some of its fields, eg: the semester and
+the name of a course, and compared by a hash of its content. A snapshot token
+keeps the key and the hash of every row only, so that it can be persisted
+between polls and the rows of the next poll compared to it:
+
+    changes = client.scores.changes_since(None)
+    ...
+    changes = client.scores.changes_since(changes.snapshot, force_refresh=True)
+    for score in changes.added:
+        notify(score)
+"""
+
+import base64
+import hashlib
+import json
+import zlib
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from pydantic import BaseModel
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+_ModelT = TypeVar("_ModelT", bound=BaseModel)
+_Key = Tuple[str, ...]
+
+
+def row_hash(row: BaseModel) -> str:
+    """Hash of the content of a row, 16 hex digits."""
+    content = "\x1f".join(str(value) for value in row.model_dump().values())
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _keyed(rows: Iterable[_ModelT], key_fields: Sequence[str]) -> Dict[_Key, _ModelT]:
+    keyed: Dict[_Key, _ModelT] = {}
+    for row in rows:
+        key = tuple(str(getattr(row, name)) for name in key_fields)
+        # rows with the same key, eg: a course taken twice, are told apart by
+        # their order
+        unique_key, n = key, 1
+        while unique_key in keyed:
+            n += 1
+            unique_key = key + (f"#{n}",)
+        keyed[unique_key] = row
+    return keyed
+
+
+def _dump_snapshot(hashes: Dict[_Key, str]) -> str:
+    data = {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "rows": [[*key, digest] for key, digest in hashes.items()],
+    }
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(zlib.compress(raw.encode("utf-8"))).decode()
+
+
+def _load_snapshot(snapshot: str) -> Dict[_Key, str]:
+    try:
+        raw = zlib.decompress(base64.urlsafe_b64decode(snapshot.encode()))
+        data = json.loads(raw)
+    except (ValueError, zlib.error) as e:
+        raise ValueError(f"Invalid snapshot: {e}") from e
+    if data.get("version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {data.get('version')}")
+    return {tuple(row[:-1]): row[-1] for row in data["rows"]}
+
+
+class Changes(Generic[_ModelT]):
+    """Rows changed since a snapshot.
+
+    Args:
+        added(List[_ModelT]): Rows not in the snapshot
+        removed(List[Tuple[str, ...]]): Keys of the rows of the snapshot that are
+            gone, the snapshot does not keep their content
+        modified(List[_ModelT]): Rows of the snapshot whose content changed, as
+            they are now
+        snapshot(str): Token of the current rows, to compare the next fetch to
+    """
+
+    def __init__(
+        self,
+        added: List[_ModelT],
+        removed: List[_Key],
+        modified: List[_ModelT],
+        snapshot: str,
+    ) -> None:
+        self.added = added
+        self.removed = removed
+        self.modified = modified
+        self.snapshot = snapshot
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    def __repr__(self) -> str:
+        return (
+            f"Changes(added={len(self.added)}, removed={len(self.removed)}, "
+            f"modified={len(self.modified)})"
+        )
+
+
+def take_snapshot(rows: Iterable[BaseModel], key_fields: Sequence[str]) -> str:
+    """Make the snapshot token of rows.
+
+    Args:
+        rows(Iterable[BaseModel]): The rows
+        key_fields(Sequence[str]): Fields identifying a row
+
+    Returns:
+        str: The snapshot token
+    """
+    keyed = _keyed(rows, key_fields)
+    return _dump_snapshot({key: row_hash(row) for key, row in keyed.items()})
+
+
+def diff(
+    rows: Iterable[_ModelT], snapshot: Optional[str], key_fields: Sequence[str]
+) -> Changes[_ModelT]:
+    """Compare rows to a snapshot.
+
+    Args:
+        rows(Iterable[_ModelT]): The current rows
+        snapshot(Optional[str]): Token of the previous rows, every row is added
+            if missing
+        key_fields(Sequence[str]): Fields identifying a row
+
+    Returns:
+        Changes[_ModelT]: The changed rows and the snapshot of the current rows
+
+    Raises:
+        ValueError: if the snapshot is not a valid token
+    """
+    previous = _load_snapshot(snapshot) if snapshot else {}
+    keyed = _keyed(rows, key_fields)
+
+    hashes: Dict[_Key, str] = {}
+    added: List[_ModelT] = []
+    modified: List[_ModelT] = []
+    for key, row in keyed.items():
+        hashes[key] = digest = row_hash(row)
+        if key not in previous:
+            added.append(row)
+        elif previous[key] != digest:
+            modified.append(row)
+    removed = [key for key in previous if key not in hashes]
+
+    return Changes(added, removed, modified, _dump_snapshot(hashes))
@@ -1,10 +1,27 @@
-import json
+import asyncio
 import os
+import threading
+import time
 import typing
-from typing import Generic, Optional, TypeVar, Union
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    ContextManager,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+)
 
 import httpx
-from bs4 import BeautifulSoup
 from httpx import USE_CLIENT_DEFAULT, Response, Timeout
 from httpx._client import UseClientDefault  # noqa
 from httpx._types import (  # noqa
@@ -20,7 +37,8 @@ from httpx._types import (  # noqa
     URLTypes,
 )
 
-from ecjtu import crud
+from ecjtu import crud, protocol
+from ecjtu.breaker import AsyncBreakerTransport, BreakerTransport
 from ecjtu.constants import (
     CAS_ECJTU_DOMAIN,
     ECJTU2JWXT_URL,
@@ -29,37 +47,186 @@ from ecjtu.constants import (
     PORTAL_ECJTU_DOMAIN,
     PWD_ENC_URL,
 )
+from ecjtu.exceptions import SessionExpiredError
+from ecjtu.limiter import AsyncLimitedTransport, LimitedTransport, get_upstream_limiter
+from ecjtu.metrics import AsyncMetricsTransport, MetricsTransport, track_login
+from ecjtu.retry import RetryPolicy, is_session_expired
+from ecjtu.session import SessionStore, load_session, save_session
+from ecjtu.stats import ClientStats
+from ecjtu.transport import get_async_shared_transport, get_shared_transport
 from ecjtu.utils.logger import logger
 
 _HttpxClientT = TypeVar("_HttpxClientT", bound=Union[httpx.Client, httpx.AsyncClient])
+_ClientT = TypeVar("_ClientT", bound="BaseClient")
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+# keys of the cache_ttl argument of the clients
+CACHED_RESOURCES = ("scheduled_courses", "scores", "elective_courses")
+# threads of the worker pool shared by the batch queries of every sync client
+BATCH_WORKERS = 32
 
+_batch_lock = threading.Lock()
+_batch_executor: Optional[ThreadPoolExecutor] = None
 
-def _get_enc_password(original_pwd: str) -> str:
-    """Get encrypted password
 
-    Args:
-        original_pwd(str): Original password
+def get_batch_executor() -> ThreadPoolExecutor:
+    """Get the process-wide worker pool of the batch queries, such as
+    `scheduled_courses.this_week()`, creating it on first use.
 
-    Returns:
-        str: Encrypted password
+    Pools of thousands of clients then share `BATCH_WORKERS` threads instead of
+    each starting its own, `ECJTU(max_workers=...)` bounds the workers a single
+    query uses.
     """
-    enc_response = httpx.post(PWD_ENC_URL, data={"pwd": original_pwd})
+    global _batch_executor
+
+    with _batch_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(
+                max_workers=BATCH_WORKERS, thread_name_prefix="ecjtu"
+            )
+        return _batch_executor
+
+
+def _reset_batch_executor_in_child() -> None:
+    # the threads of the pool are not copied to a forked child
+    global _batch_executor, _batch_lock
+
+    _batch_lock = threading.Lock()
+    _batch_executor = None
+
 
-    _ = enc_response.content.decode("utf8").replace("'", '"')
-    return json.loads(_)["passwordEnc"]
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_batch_executor_in_child)
 
 
 class BaseClient(Generic[_HttpxClientT]):
     _version: str
-    max_retries: int = 5
+    retry_policy: RetryPolicy = RetryPolicy()
     timeout: Union[float, Timeout, None]
     _limits: httpx.Limits
+    _transport: Any
+    _mounts: Dict[Any, Any]
     cookies: httpx.Cookies
+    stud_id: Optional[str]
+    password: Optional[str]
+    stats: Optional[ClientStats]
+    session_store: Optional[SessionStore]
+    _enc_password: Optional[str]
 
     @property
     def has_login(self) -> bool:
         return "CASTGC" in self.cookies
 
+    @property
+    def enc_password(self) -> Optional[str]:
+        """Encrypted password, fetched from the CAS system by the first login, so
+        that clients restored from a session do not pay for it."""
+        return self._enc_password
+
+    def _timed(self, phase: str) -> ContextManager[None]:
+        """Time the block as a run of phase in `stats`, if stats are collected."""
+        if self.stats is None:
+            return nullcontext()
+        return self.stats.timed(phase)
+
+    def _get_password(self) -> str:
+        if not self.password:
+            raise ValueError("Password is required to login")
+        return self.password
+
+    def save_session(self, path: str) -> None:
+        """Save the cookies of the client to path, see `from_session`.
+
+        Args:
+            path(str): File to write
+        """
+        save_session(path, self.stud_id, self.cookies)
+
+    def _wrap_transports(self, wrap: Callable[[Any], Any]) -> None:
+        """Wrap the transports httpx built from the arguments of the client, so
+        that its proxies, mounts, certificates and limits are kept."""
+        self._transport = wrap(self._transport)
+        self._mounts = {
+            pattern: None if transport is None else wrap(transport)
+            for pattern, transport in self._mounts.items()
+        }
+
+    def invalidate_cache(self) -> None:
+        """Drop the cached resources of every CRUD client."""
+        # the GPA is read from the score sheet cached by `scores`
+        for crud_client in (
+            self.scheduled_courses,
+            self.scores,
+            self.elective_courses,
+        ):
+            crud_client.invalidate()
+
+    @staticmethod
+    def _check_cache_ttl(
+        cache_ttl: Optional[Dict[str, float]],
+    ) -> Dict[str, float]:
+        """Check the resources of the cache_ttl argument of the clients.
+
+        Raises:
+            ValueError: if a resource has no cache of its own, eg: "gpa", which is
+                read from the score sheet cached with "scores"
+        """
+        unknown = set(cache_ttl or {}) - set(CACHED_RESOURCES)
+        if unknown:
+            raise ValueError(
+                f"No cache for {', '.join(sorted(unknown))}, the resources cached "
+                f"are {', '.join(CACHED_RESOURCES)}; the GPA is cached with the "
+                "scores"
+            )
+        return cache_ttl or {}
+
+    @classmethod
+    def from_session(
+        cls: Type[_ClientT], path: str, password: Optional[str] = None, **kwargs
+    ) -> _ClientT:
+        """Create a client with the session saved by `save_session`, skipping the
+        login while the session is alive.
+
+        Args:
+            path(str): File written by `save_session`
+            password(Optional[str]): Password, used to login again once the saved
+                session expires
+
+        Returns:
+            The client
+        """
+        stud_id, cookies = load_session(path)
+        return cls(stud_id=stud_id, password=password, cookie=cookies, **kwargs)
+
+    def _init_session(
+        self,
+        stud_id: Optional[str],
+        password: Optional[str],
+        cookie: Optional[CookieTypes],
+        session_store: Optional[SessionStore],
+        credentials_from_env: bool = False,
+    ) -> None:
+        # a client created from the cookie of a session, eg: by the API server,
+        # must not login again with the credentials of whoever runs it
+        if cookie and not credentials_from_env:
+            self.stud_id = stud_id
+            self.password = password
+        else:
+            self.stud_id = stud_id or os.environ.get("ECJTU_STUDENT_ID")
+            self.password = password or os.environ.get("ECJTU_PASSWORD")
+        self._enc_password = None
+        self.session_store = session_store
+
+        if cookie:
+            self.cookies = cookie
+        elif session_store and self.stud_id:
+            saved_cookies = session_store.load(self.stud_id)
+            if saved_cookies:
+                logger.info(f"Restore the saved session of {self.stud_id}")
+                self.cookies = saved_cookies
+
 
 class ECJTU(BaseClient[httpx.Client], httpx.Client):
     def __init__(
@@ -67,6 +234,17 @@ class ECJTU(BaseClient[httpx.Client], httpx.Client):
         stud_id: Optional[str] = None,
         password: Optional[str] = None,
         cookie: Optional[CookieTypes] = None,
+        max_workers: int = 7,
+        retry_policy: Optional[RetryPolicy] = None,
+        session_store: Optional[SessionStore] = None,
+        shared_transport: bool = False,
+        limit_upstream: bool = False,
+        circuit_breaker: bool = False,
+        serve_stale: bool = False,
+        collect_metrics: bool = False,
+        collect_stats: bool = False,
+        cache_ttl: Optional[Dict[str, float]] = None,
+        credentials_from_env: bool = False,
         **kwargs,
     ) -> None:
         """Initialize ECJTU client.
@@ -74,20 +252,75 @@ class ECJTU(BaseClient[httpx.Client], httpx.Client):
         Args:
             stud_id(str): Student ID
             password(str): Password
+            cookie(Optional[CookieTypes]): Cookies of a logged in session
+            max_workers(int): Max workers of the shared worker pool a batch query
+                such as `scheduled_courses.this_week()` uses at once, 1 means
+                running them serially, see `get_batch_executor`
+            retry_policy(Optional[RetryPolicy]): How to retry failed requests,
+                defaults to `RetryPolicy()`
+            session_store(Optional[SessionStore]): Where to restore the session of
+                the student from and save it to after login
+            shared_transport(bool): Send requests through the process-wide
+                connection pool of `ecjtu.transport` instead of a pool of its own
+            limit_upstream(bool): Send requests within the process-wide budgets
+                of `ecjtu.limiter`, shared with the other clients
+            circuit_breaker(bool): Fail fast with `CircuitOpenError` while the
+                upstream is down, see `ecjtu.breaker`
+            serve_stale(bool): Answer with the last resource fetched successfully
+                when the upstream fails, see `ecjtu.breaker.track_staleness`
+            collect_metrics(bool): Record the latency of the requests, the logins
+                and the cache lookups in the metrics of `ecjtu.metrics`
+            collect_stats(bool): Time the network, parsing and validation of
+                every call in `client.stats`, see `ecjtu.stats`
+            cache_ttl(Optional[Dict[str, float]]): Seconds the fetched resources
+                stay cached, keyed by resource, eg: {"scores": 600}, 0 disables
+                the cache of a resource; the GPA is cached with the scores
+            credentials_from_env(bool): Read the missing student ID and password
+                from `ECJTU_STUDENT_ID` and `ECJTU_PASSWORD` even if the client
+                is created from a cookie, they are only read without one otherwise
         """
+        if shared_transport and "transport" not in kwargs:
+            kwargs["transport"] = get_shared_transport()
         super().__init__(verify=False, **kwargs)
+        if limit_upstream or circuit_breaker or collect_metrics:
+
+            def wrap(transport: httpx.BaseTransport) -> httpx.BaseTransport:
+                if collect_metrics:
+                    # innermost, so that the time waiting for the limiter is left out
+                    transport = MetricsTransport(transport)
+                if limit_upstream:
+                    transport = LimitedTransport(transport, get_upstream_limiter())
+                if circuit_breaker:
+                    # outermost, so that rejected requests do not take a token
+                    transport = BreakerTransport(transport)
+                return transport
+
+            self._wrap_transports(wrap)
+
+        if retry_policy is not None:
+            self.retry_policy = retry_policy
+
+        self.max_workers: int = max_workers
+        self._login_lock = threading.Lock()
+        self._login_generation: int = 0
+        self._login_error: Optional[Exception] = None
+
+        self._init_session(
+            stud_id, password, cookie, session_store, credentials_from_env
+        )
 
-        if cookie:
-            self.cookies = cookie
-        else:
-            self.stud_id: str = stud_id or os.environ.get("ECJTU_STUDENT_ID")
-            self.password: str = password or os.environ.get("ECJTU_PASSWORD")
-            self.enc_password: str = _get_enc_password(self.password)
-
-        self.scheduled_courses = crud.ScheduledCourseCRUD(self)
-        self.scores = crud.ScoreCRUD(self)
+        self.serve_stale: bool = serve_stale
+        self.collect_metrics: bool = collect_metrics
+        self.stats: Optional[ClientStats] = ClientStats() if collect_stats else None
+        cache_ttl = self._check_cache_ttl(cache_ttl)
+        self.scheduled_courses = crud.ScheduledCourseCRUD(
+            self, cache_ttl.get("scheduled_courses")
+        )
+        self.scores = crud.ScoreCRUD(self, cache_ttl.get("scores"))
         self.gpa = crud.GPACRUD(self)
-        self.elective_courses = crud.ElectiveCourseCRUD(self)
+        self.elective_courses = crud.ElectiveCourseCRUD(
+            self, cache_ttl.get("elective_courses")
+        )
 
     def post(
         self,
@@ -104,16 +337,8 @@ class ECJTU(BaseClient[httpx.Client], httpx.Client):
         follow_redirects: bool | UseClientDefault = USE_CLIENT_DEFAULT,
         timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
         extensions: RequestExtensions | None = None,
-        current_retries: int = 0,
     ) -> Response:
-        """Wrap the httpx post method to handle retries and check login status.
-
-        Addition Args:
-            current_retries(int): Current retries count
-        """
-        if not self.has_login:
-            self.login()
-
+        """Wrap the httpx post method to handle retries and check login status."""
         params = dict(
             content=content,
             data=data,
@@ -128,14 +353,7 @@ class ECJTU(BaseClient[httpx.Client], httpx.Client):
             extensions=extensions,
         )
 
-        try:
-            return super().post(url, **params)
-
-        except httpx.HTTPStatusError as e:
-            if current_retries >= self.max_retries:
-                raise e
-
-            return self.post(url, **params, current_retries=current_retries + 1)
+        return self._send_with_retry(partial(super().post, url, **params))
 
     def get(
         self,
@@ -148,16 +366,8 @@ class ECJTU(BaseClient[httpx.Client], httpx.Client):
         follow_redirects: bool | UseClientDefault = USE_CLIENT_DEFAULT,
         timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
         extensions: RequestExtensions | None = None,
-        current_retries: int = 0,
     ) -> Response:
-        """Wrap the httpx get method to handle retries and check login status.
-
-        Addition Args:
-            current_retries(int): Current retries count
-        """
-        if not self.has_login:
-            self.login()
-
+        """Wrap the httpx get method to handle retries and check login status."""
         _params = dict(
             params=params,
             headers=headers,
@@ -168,22 +378,192 @@ class ECJTU(BaseClient[httpx.Client], httpx.Client):
             extensions=extensions,
         )
 
+        return self._send_with_retry(partial(super().get, url, **_params))
+
+    def _send_with_retry(self, send: Callable[[], Response]) -> Response:
+        """Login if needed, then send a request, retrying it as the retry policy
+        of the client says.
+
+        Args:
+            send(Callable[[], Response]): Sends the request once
+
+        Returns:
+            Response: The first final response, or the last response if the retry
+            budget is spent
+
+        Raises:
+            SessionExpiredError: if the session is still expired after logging in
+                again, or the client has no password to login again
+        """
+        policy = self.retry_policy
+        start = time.monotonic()
+        attempt = 0
+        relogged = False
+
+        while True:
+            self._ensure_login()
+            generation = self._login_generation
+            try:
+                response = send()
+            except httpx.TransportError as e:
+                delay = policy.next_delay(attempt, time.monotonic() - start, exc=e)
+                if delay is None:
+                    raise
+                logger.warning(f"Request failed: {e!r}, retry in {delay:.2f}s")
+            else:
+                if is_session_expired(response):
+                    if relogged:
+                        raise SessionExpiredError(
+                            f"Session expired again when requesting {response.url}"
+                        )
+                    logger.info(f"Session expired when requesting {response.url}")
+                    response.close()
+                    self._relogin(generation)
+                    relogged = True
+                    continue
+
+                delay = policy.next_delay(
+                    attempt, time.monotonic() - start, response=response
+                )
+                if delay is None:
+                    return response
+                logger.warning(
+                    f"Request to {response.url} failed with status code "
+                    f"{response.status_code}, retry in {delay:.2f}s"
+                )
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _ensure_login(self) -> None:
+        """Login if the client has not logged in yet.
+
+        Login is single-flight: when several threads find the client logged out at
+        the same time, only one of them runs `login()`, the others wait for it and
+        share its result, including its exception if it fails.
+        """
+        if self.has_login:
+            return
+
+        # number of finished login attempts, if it changes while we wait for the
+        # lock, another caller has just tried to login on our behalf
+        generation = self._login_generation
+        with self._login_lock:
+            if self.has_login:
+                return
+            if generation != self._login_generation and self._login_error:
+                raise self._login_error
+
+            self._login_once()
+
+    def _relogin(self, generation: int) -> None:
+        """Login again after a request made with the session of the given login
+        generation found the session expired.
+
+        Like `_ensure_login`, this is single-flight: if another caller has logged
+        in again since that generation, its result is reused.
+
+        Args:
+            generation(int): Number of finished login attempts when the expired
+                request was sent
+        """
+        with self._login_lock:
+            if generation != self._login_generation:
+                if self._login_error:
+                    raise self._login_error
+                return
+
+            if not self.password:
+                raise SessionExpiredError(
+                    "Session expired and the client has no password to login again"
+                )
+
+            self.cookies.clear()
+            self._login_once()
+
+    def _login_once(self) -> None:
+        """Run `login()`, recording its outcome for the callers waiting on the
+        login lock. The lock must be held."""
         try:
-            return super().get(url, **_params)
+            self.login()
+            self._login_error = None
+        except Exception as e:
+            self._login_error = e
+            raise
+        finally:
+            self._login_generation += 1
+
+    def _parallel_map(self, func: Callable[[_T], _R], items: Iterable[_T]) -> List[_R]:
+        """Call func on every item on the shared worker pool, at most
+        `max_workers` at the same time.
+
+        Workers share the connection pool and cookies of the client. Results keep
+        the order of items, and if any call fails, the exception of the first
+        failed item is raised.
+
+        Args:
+            func(Callable[[_T], _R]): The function to call
+            items(Iterable[_T]): The arguments to call func with
 
-        except httpx.HTTPStatusError as e:
-            if current_retries >= self.max_retries:
-                raise e
+        Returns:
+            List[_R]: Results in the order of items
+        """
+        items = list(items)
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+
+        executor = get_batch_executor()
+        slots = threading.BoundedSemaphore(self.max_workers)
+        futures = []
+        for item in items:
+            slots.acquire()
+            try:
+                future = executor.submit(func, item)
+            except BaseException:
+                slots.release()
+                raise
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def _parse(self, func: Callable[..., _R], *args) -> _R:
+        """Run a parser of `ecjtu.protocol`, timing it.
 
-            return self.get(url, **_params, current_retries=current_retries + 1)
+        Args:
+            func(Callable[..., _R]): The parser
+            *args: Arguments of the parser
+
+        Returns:
+            _R: Result of the parser
+        """
+        with self._timed("parse"):
+            return func(*args)
+
+    def _encrypt_password(self) -> str:
+        """Get the encrypted password, encrypting it on first use."""
+        if self._enc_password is None:
+            enc_response = super().post(PWD_ENC_URL, data={"pwd": self._get_password()})
+            self._enc_password = self._parse(
+                protocol.parse_enc_password, enc_response.content
+            )
+        return self._enc_password
 
     def login(self) -> None:
         """Login to ECJTU system and update the client session."""
+        if not self.collect_metrics:
+            return self._login()
+        with track_login():
+            self._login()
+
+    def _login(self) -> None:
         logger.info("Logging in")
 
+        with self._timed("login.encrypt"):
+            enc_password = self._encrypt_password()
         login_payload = {
             "username": self.stud_id,
-            "password": self.enc_password,
+            "password": enc_password,
             "service": PORTAL_ECJTU_DOMAIN,
         }
 
@@ -192,30 +572,35 @@ class ECJTU(BaseClient[httpx.Client], httpx.Client):
                   (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
             "Host": CAS_ECJTU_DOMAIN,
         }
-        response = super().get(ECJTU_LOGIN_URL, headers=headers)
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        login_payload["lt"] = soup.find("input", {"name": "lt"})["value"]
+        with self._timed("login.ticket"):
+            response = super().get(ECJTU_LOGIN_URL, headers=headers)
+            login_payload["lt"] = self._parse(
+                protocol.parse_login_ticket, response.content, response.encoding
+            )
 
         headers_append = {
             "Content-Type": "application/x-www-form-urlencoded",
             "Referer": ECJTU_LOGIN_URL,
         }
         headers.update(headers_append)
-        response = super().post(
-            ECJTU_LOGIN_URL,
-            data=login_payload,
-            headers=headers,
-        )
+        with self._timed("login.cas"):
+            response = super().post(
+                ECJTU_LOGIN_URL,
+                data=login_payload,
+                headers=headers,
+            )
 
         if "CASTGC" not in response.cookies:
             raise ValueError("Error in account or password")
 
-        super().get(JWXT_LOGIN_URL, headers=headers)
+        with self._timed("login.jwxt"):
+            super().get(JWXT_LOGIN_URL, headers=headers)
+            response_url = super().get(ECJTU2JWXT_URL)
 
-        response_url = super().get(ECJTU2JWXT_URL)
-
-        result = super().get(response_url.headers["location"], follow_redirects=True)
+        with self._timed("login.redirect"):
+            result = super().get(
+                response_url.headers["location"], follow_redirects=True
+            )
 
         if result.status_code != 200:
             raise ValueError(
@@ -224,25 +609,117 @@ class ECJTU(BaseClient[httpx.Client], httpx.Client):
 
         logger.info("Login successful")
 
+        if self.session_store and self.stud_id:
+            self.session_store.save(self.stud_id, self.cookies)
+
 
 class AsyncECJTU(BaseClient[httpx.AsyncClient], httpx.AsyncClient):
-    def __init__(self, stud_id: str, password: str, **kwargs) -> None:
+    def __init__(
+        self,
+        stud_id: Optional[str] = None,
+        password: Optional[str] = None,
+        cookie: Optional[CookieTypes] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        session_store: Optional[SessionStore] = None,
+        shared_transport: bool = False,
+        limit_upstream: bool = False,
+        circuit_breaker: bool = False,
+        serve_stale: bool = False,
+        collect_metrics: bool = False,
+        collect_stats: bool = False,
+        cache_ttl: Optional[Dict[str, float]] = None,
+        credentials_from_env: bool = False,
+        parse_executor: Union[str, Executor] = "inline",
+        **kwargs,
+    ) -> None:
         """Initialize ECJTU client.
 
         Args:
             stud_id(str): Student ID
             password(str): Password
+            cookie(Optional[CookieTypes]): Cookies of a logged in session
+            retry_policy(Optional[RetryPolicy]): How to retry failed requests,
+                defaults to `RetryPolicy()`
+            session_store(Optional[SessionStore]): Where to restore the session of
+                the student from and save it to after login
+            shared_transport(bool): Send requests through the process-wide
+                connection pool of `ecjtu.transport` instead of a pool of its own
+            limit_upstream(bool): Send requests within the process-wide budgets
+                of `ecjtu.limiter`, shared with the other clients
+            circuit_breaker(bool): Fail fast with `CircuitOpenError` while the
+                upstream is down, see `ecjtu.breaker`
+            serve_stale(bool): Answer with the last resource fetched successfully
+                when the upstream fails, see `ecjtu.breaker.track_staleness`
+            collect_metrics(bool): Record the latency of the requests, the logins
+                and the cache lookups in the metrics of `ecjtu.metrics`
+            collect_stats(bool): Time the network, parsing and validation of
+                every call in `client.stats`, see `ecjtu.stats`
+            cache_ttl(Optional[Dict[str, float]]): Seconds the fetched resources
+                stay cached, keyed by resource, eg: {"scores": 600}, 0 disables
+                the cache of a resource; the GPA is cached with the scores
+            credentials_from_env(bool): Read the missing student ID and password
+                from `ECJTU_STUDENT_ID` and `ECJTU_PASSWORD` even if the client
+                is created from a cookie, they are only read without one otherwise
+            parse_executor(Union[str, Executor]): Where the pages are parsed,
+                "inline" on the event loop, "thread" on a thread pool, "process"
+                on a process pool using several cores, or an executor of the
+                caller, which is not shut down with the client
         """
+        if shared_transport and "transport" not in kwargs:
+            kwargs["transport"] = get_async_shared_transport()
         super().__init__(verify=False, **kwargs)
+        if limit_upstream or circuit_breaker or collect_metrics:
+
+            def wrap(transport: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+                if collect_metrics:
+                    # innermost, so that the time waiting for the limiter is left out
+                    transport = AsyncMetricsTransport(transport)
+                if limit_upstream:
+                    transport = AsyncLimitedTransport(transport, get_upstream_limiter())
+                if circuit_breaker:
+                    # outermost, so that rejected requests do not take a token
+                    transport = AsyncBreakerTransport(transport)
+                return transport
+
+            self._wrap_transports(wrap)
+
+        if retry_policy is not None:
+            self.retry_policy = retry_policy
+
+        self._init_session(
+            stud_id, password, cookie, session_store, credentials_from_env
+        )
 
-        self.stud_id: str = stud_id or os.environ.get("ECJTU_STUDENT_ID")
-        self.password: str = password or os.environ.get("ECJTU_PASSWORD")
-        self.enc_password: str = _get_enc_password(self.password)
-
-        self.scheduled_courses = crud.AsyncScheduledCourseCRUD(self)
-        self.scores = crud.AsyncScoreCRUD(self)
+        self.parse_executor: Optional[Executor] = None
+        self._owns_parse_executor = False
+        if parse_executor == "thread":
+            self.parse_executor = ThreadPoolExecutor(thread_name_prefix="ecjtu-parse")
+            self._owns_parse_executor = True
+        elif parse_executor == "process":
+            self.parse_executor = ProcessPoolExecutor()
+            self._owns_parse_executor = True
+        elif isinstance(parse_executor, Executor):
+            self.parse_executor = parse_executor
+        elif parse_executor != "inline":
+            raise ValueError(f"Unknown parse executor: {parse_executor}")
+
+        # created lazily, so that the lock binds to the running event loop
+        self._login_lock: Optional[asyncio.Lock] = None
+        self._login_generation: int = 0
+        self._login_error: Optional[Exception] = None
+
+        self.serve_stale: bool = serve_stale
+        self.collect_metrics: bool = collect_metrics
+        self.stats: Optional[ClientStats] = ClientStats() if collect_stats else None
+        cache_ttl = self._check_cache_ttl(cache_ttl)
+        self.scheduled_courses = crud.AsyncScheduledCourseCRUD(
+            self, cache_ttl.get("scheduled_courses")
+        )
+        self.scores = crud.AsyncScoreCRUD(self, cache_ttl.get("scores"))
         self.gpa = crud.AsyncGPACRUD(self)
-        self.elective_courses = crud.AsyncElectiveCourseCRUD(self)
+        self.elective_courses = crud.AsyncElectiveCourseCRUD(
+            self, cache_ttl.get("elective_courses")
+        )
 
     async def post(
         self,
@@ -259,16 +736,8 @@ class AsyncECJTU(BaseClient[httpx.AsyncClient], httpx.AsyncClient):
         follow_redirects: bool | UseClientDefault = USE_CLIENT_DEFAULT,
         timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
         extensions: RequestExtensions | None = None,
-        current_retries: int = 0,
     ) -> Response:
-        """Wrap the httpx post method to handle retries and check login status.
-
-        Addition Args:
-            current_retries(int): Current retries count
-        """
-        if not self.has_login:
-            await self.login()
-
+        """Wrap the httpx post method to handle retries and check login status."""
         params = dict(
             content=content,
             data=data,
@@ -283,14 +752,7 @@ class AsyncECJTU(BaseClient[httpx.AsyncClient], httpx.AsyncClient):
             extensions=extensions,
         )
 
-        try:
-            return await super().post(url, **params)
-
-        except httpx.HTTPStatusError as e:
-            if current_retries >= self.max_retries:
-                raise e
-
-            return await self.post(url, **params, current_retries=current_retries + 1)
+        return await self._send_with_retry(partial(super().post, url, **params))
 
     async def get(
         self,
@@ -303,16 +765,8 @@ class AsyncECJTU(BaseClient[httpx.AsyncClient], httpx.AsyncClient):
         follow_redirects: bool | UseClientDefault = USE_CLIENT_DEFAULT,
         timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
         extensions: RequestExtensions | None = None,
-        current_retries: int = 0,
     ) -> Response:
-        """Wrap the httpx get method to handle retries and check login status.
-
-        Addition Args:
-            current_retries(int): Current retries count
-        """
-        if not self.has_login:
-            await self.login()
-
+        """Wrap the httpx get method to handle retries and check login status."""
         _params = dict(
             params=params,
             headers=headers,
@@ -323,22 +777,187 @@ class AsyncECJTU(BaseClient[httpx.AsyncClient], httpx.AsyncClient):
             extensions=extensions,
         )
 
+        return await self._send_with_retry(partial(super().get, url, **_params))
+
+    async def _send_with_retry(
+        self, send: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        """Login if needed, then send a request, retrying it as the retry policy
+        of the client says.
+
+        Args:
+            send(Callable[[], Awaitable[Response]]): Sends the request once
+
+        Returns:
+            Response: The first final response, or the last response if the retry
+            budget is spent
+
+        Raises:
+            SessionExpiredError: if the session is still expired after logging in
+                again, or the client has no password to login again
+        """
+        policy = self.retry_policy
+        start = time.monotonic()
+        attempt = 0
+        relogged = False
+
+        while True:
+            await self._ensure_login()
+            generation = self._login_generation
+            try:
+                response = await send()
+            except httpx.TransportError as e:
+                delay = policy.next_delay(attempt, time.monotonic() - start, exc=e)
+                if delay is None:
+                    raise
+                logger.warning(f"Request failed: {e!r}, retry in {delay:.2f}s")
+            else:
+                if is_session_expired(response):
+                    if relogged:
+                        raise SessionExpiredError(
+                            f"Session expired again when requesting {response.url}"
+                        )
+                    logger.info(f"Session expired when requesting {response.url}")
+                    await response.aclose()
+                    await self._relogin(generation)
+                    relogged = True
+                    continue
+
+                delay = policy.next_delay(
+                    attempt, time.monotonic() - start, response=response
+                )
+                if delay is None:
+                    return response
+                logger.warning(
+                    f"Request to {response.url} failed with status code "
+                    f"{response.status_code}, retry in {delay:.2f}s"
+                )
+                await response.aclose()
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _ensure_login(self) -> None:
+        """Login if the client has not logged in yet.
+
+        Login is single-flight: when several coroutines find the client logged out
+        at the same time, only one of them runs `login()`, the others wait for it
+        and share its result, including its exception if it fails.
+        """
+        if self.has_login:
+            return
+
+        # number of finished login attempts, if it changes while we wait for the
+        # lock, another caller has just tried to login on our behalf
+        generation = self._login_generation
+        async with self._get_login_lock():
+            if self.has_login:
+                return
+            if generation != self._login_generation and self._login_error:
+                raise self._login_error
+
+            await self._login_once()
+
+    def _get_login_lock(self) -> asyncio.Lock:
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        return self._login_lock
+
+    async def _relogin(self, generation: int) -> None:
+        """Login again after a request made with the session of the given login
+        generation found the session expired.
+
+        Like `_ensure_login`, this is single-flight: if another caller has logged
+        in again since that generation, its result is reused.
+
+        Args:
+            generation(int): Number of finished login attempts when the expired
+                request was sent
+        """
+        async with self._get_login_lock():
+            if generation != self._login_generation:
+                if self._login_error:
+                    raise self._login_error
+                return
+
+            if not self.password:
+                raise SessionExpiredError(
+                    "Session expired and the client has no password to login again"
+                )
+
+            self.cookies.clear()
+            await self._login_once()
+
+    async def _login_once(self) -> None:
+        """Run `login()`, recording its outcome for the callers waiting on the
+        login lock. The lock must be held."""
         try:
-            return await super().get(url, **_params)
+            await self.login()
+            self._login_error = None
+        except Exception as e:
+            self._login_error = e
+            raise
+        finally:
+            self._login_generation += 1
 
-        except httpx.HTTPStatusError as e:
-            if current_retries >= self.max_retries:
-                raise e
+    async def _parse(self, func: Callable[..., _R], *args) -> _R:
+        """Run a parser of `ecjtu.protocol` on the parse executor.
 
-            return await self.get(url, **_params, current_retries=current_retries + 1)
+        Args:
+            func(Callable[..., _R]): The parser, picklable for a process pool
+            *args: Arguments of the parser
+
+        Returns:
+            _R: Result of the parser
+        """
+        with self._timed("parse"):
+            if self.parse_executor is None:
+                return func(*args)
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.parse_executor, partial(func, *args))
+
+    def _shutdown_parse_executor(self) -> None:
+        if self._owns_parse_executor and self.parse_executor is not None:
+            # do not block the event loop, pending parses finish in the background
+            self.parse_executor.shutdown(wait=False)
+            self.parse_executor = None
+
+    async def aclose(self) -> None:
+        """Close the parse executor, transport and proxies."""
+        self._shutdown_parse_executor()
+        await super().aclose()
+
+    async def __aexit__(self, exc_type=None, exc_value=None, traceback=None) -> None:
+        self._shutdown_parse_executor()
+        await super().__aexit__(exc_type, exc_value, traceback)
+
+    async def _encrypt_password(self) -> str:
+        """Get the encrypted password, encrypting it on first use."""
+        if self._enc_password is None:
+            enc_response = await super().post(
+                PWD_ENC_URL, data={"pwd": self._get_password()}
+            )
+            self._enc_password = await self._parse(
+                protocol.parse_enc_password, enc_response.content
+            )
+        return self._enc_password
 
     async def login(self) -> None:
         """Login to ECJTU system and update the client session."""
+        if not self.collect_metrics:
+            return await self._login()
+        with track_login():
+            await self._login()
+
+    async def _login(self) -> None:
         logger.info("Logging in")
 
+        with self._timed("login.encrypt"):
+            enc_password = await self._encrypt_password()
         login_payload = {
             "username": self.stud_id,
-            "password": self.enc_password,
+            "password": enc_password,
             "service": PORTAL_ECJTU_DOMAIN,
         }
 
@@ -347,32 +966,35 @@ class AsyncECJTU(BaseClient[httpx.AsyncClient], httpx.AsyncClient):
                   (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
             "Host": CAS_ECJTU_DOMAIN,
         }
-        response = await super().get(ECJTU_LOGIN_URL, headers=headers)
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        login_payload["lt"] = soup.find("input", {"name": "lt"})["value"]
+        with self._timed("login.ticket"):
+            response = await super().get(ECJTU_LOGIN_URL, headers=headers)
+            login_payload["lt"] = await self._parse(
+                protocol.parse_login_ticket, response.content, response.encoding
+            )
 
         headers_append = {
             "Content-Type": "application/x-www-form-urlencoded",
             "Referer": ECJTU_LOGIN_URL,
         }
         headers.update(headers_append)
-        response = await super().post(
-            ECJTU_LOGIN_URL,
-            data=login_payload,
-            headers=headers,
-        )
+        with self._timed("login.cas"):
+            response = await super().post(
+                ECJTU_LOGIN_URL,
+                data=login_payload,
+                headers=headers,
+            )
 
         if "CASTGC" not in response.cookies:
             raise ValueError("Error in account or password")
 
-        await super().get(JWXT_LOGIN_URL, headers=headers)
-
-        response_url = await super().get(ECJTU2JWXT_URL)
+        with self._timed("login.jwxt"):
+            await super().get(JWXT_LOGIN_URL, headers=headers)
+            response_url = await super().get(ECJTU2JWXT_URL)
 
-        result = await super().get(
-            response_url.headers["location"], follow_redirects=True
-        )
+        with self._timed("login.redirect"):
+            result = await super().get(
+                response_url.headers["location"], follow_redirects=True
+            )
 
         if result.status_code != 200:
             raise ValueError(
@@ -380,3 +1002,8 @@ class AsyncECJTU(BaseClient[httpx.AsyncClient], httpx.AsyncClient):
             )
 
         logger.info("Login successful")
+
+        if self.session_store and self.stud_id:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.session_store.save, self.stud_id, self.cookies
+            )
@@ -0,0 +1,233 @@
+"""Columnar containers of the models, for holding the courses and scores of many
+students or semesters at once.
+
+A `ColumnarResult` keeps one array per field instead of one model per row: the
+float and int fields are packed in `array.array`, and repeated strings such as
+semesters, course names or teachers are interned so that every row shares them.
+Rows are turned back into models only when they are read.
+
+    scores = client.scores.columns().filter(credit=lambda credit: credit >= 2)
+    for semester, result in scores.group_by("semester").items():
+        print(semester, sum(result.column("credit")))
+"""
+
+import sys
+from array import array
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    MutableSequence,
+    Optional,
+    Type,
+    TypeVar,
+)
+
+from pydantic import BaseModel
+
+_ModelT = TypeVar("_ModelT", bound=BaseModel)
+
+
+def _new_column(annotation: Any) -> MutableSequence:
+    if annotation is float:
+        return array("d")
+    if annotation is int:
+        return array("q")
+    return []
+
+
+def _store(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class ColumnarResult(Generic[_ModelT]):
+    """Rows of a model stored column by column.
+
+    Args:
+        model(Type[_ModelT]): The model of the rows
+        columns(Dict[str, MutableSequence]): Values of every field, all of the
+            same length. Columns which are not fields of the model, such as the
+            date of a course, are kept but left out of the models
+    """
+
+    def __init__(
+        self, model: Type[_ModelT], columns: Dict[str, MutableSequence]
+    ) -> None:
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns of different lengths: {sorted(lengths)}")
+
+        self.model = model
+        self.columns = columns
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def empty(
+        cls, model: Type[_ModelT], extra_columns: Iterable[str] = ()
+    ) -> "ColumnarResult[_ModelT]":
+        columns = {
+            name: _new_column(field.annotation)
+            for name, field in model.model_fields.items()
+        }
+        for name in extra_columns:
+            columns[name] = []
+        return cls(model, columns)
+
+    @classmethod
+    def from_models(
+        cls, model: Type[_ModelT], models: Iterable[_ModelT], **extra: Any
+    ) -> "ColumnarResult[_ModelT]":
+        """Store models column by column.
+
+        Args:
+            model(Type[_ModelT]): The model of the rows
+            models(Iterable[_ModelT]): The rows
+            **extra: Columns to add, a list with a value per row or a single value
+                for every row, eg: stud_id="2021000000"
+
+        Returns:
+            ColumnarResult[_ModelT]: The rows
+        """
+        result = cls.empty(model, extra)
+        fields = list(model.model_fields)
+        columns = [result.columns[name] for name in fields]
+        for row in models:
+            for name, values in zip(fields, columns):
+                values.append(_store(getattr(row, name)))
+            result._length += 1
+
+        for name, value in extra.items():
+            if isinstance(value, (list, tuple)):
+                result.columns[name].extend(_store(v) for v in value)
+            else:
+                result.columns[name].extend([_store(value)] * result._length)
+            if len(result.columns[name]) != result._length:
+                raise ValueError(f"Column {name} does not have a value per row")
+        return result
+
+    @classmethod
+    def concat(
+        cls, results: Iterable["ColumnarResult[_ModelT]"]
+    ) -> "ColumnarResult[_ModelT]":
+        """Join results of the same model and columns, eg: of several students.
+
+        Args:
+            results(Iterable[ColumnarResult[_ModelT]]): The results to join
+
+        Returns:
+            ColumnarResult[_ModelT]: The rows of every result, in order
+        """
+        results = list(results)
+        if not results:
+            raise ValueError("No result to concat")
+
+        first = results[0]
+        columns = {name: values[:0] for name, values in first.columns.items()}
+        for result in results:
+            if result.columns.keys() != columns.keys():
+                raise ValueError("Results with different columns can not be joined")
+            for name, values in result.columns.items():
+                columns[name].extend(values)
+        return cls(first.model, columns)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> _ModelT:
+        return self.model.model_construct(
+            **{
+                name: self.columns[name][index]
+                for name in self.model.model_fields
+                if name in self.columns
+            }
+        )
+
+    def __iter__(self) -> Iterator[_ModelT]:
+        for index in range(self._length):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return (
+            f"ColumnarResult({self.model.__name__}, rows={self._length}, "
+            f"columns={list(self.columns)})"
+        )
+
+    def column(self, name: str) -> MutableSequence:
+        """Get the values of a column, not a copy"""
+        return self.columns[name]
+
+    def to_models(self) -> List[_ModelT]:
+        """Build the model of every row."""
+        return list(self)
+
+    def take(self, indexes: Iterable[int]) -> "ColumnarResult[_ModelT]":
+        """Get the rows at indexes, in the order of indexes."""
+        indexes = list(indexes)
+        columns = {}
+        for name, values in self.columns.items():
+            column = values[:0]
+            column.extend(values[index] for index in indexes)
+            columns[name] = column
+        return type(self)(self.model, columns)
+
+    def filter(self, **conditions: Any) -> "ColumnarResult[_ModelT]":
+        """Get the rows matching every condition, column by column without
+        building the models.
+
+        Args:
+            **conditions: A value the column must equal, or a predicate taking
+                the value of the column, eg: semester="2023.1",
+                credit=lambda credit: credit >= 2
+
+        Returns:
+            ColumnarResult[_ModelT]: The matching rows
+        """
+        indexes = range(self._length)
+        for name, condition in conditions.items():
+            values = self.columns[name]
+            if callable(condition):
+                indexes = [i for i in indexes if condition(values[i])]
+            else:
+                indexes = [i for i in indexes if values[i] == condition]
+        return self.take(indexes)
+
+    def sort(
+        self,
+        by: str,
+        *,
+        key: Optional[Callable[[Any], Any]] = None,
+        reverse: bool = False,
+    ) -> "ColumnarResult[_ModelT]":
+        """Get the rows sorted by a column, rows with equal values keep their
+        order.
+
+        Args:
+            by(str): The column to sort by
+            key(Optional[Callable[[Any], Any]]): Maps the values before comparing
+            reverse(bool): Sort in descending order
+
+        Returns:
+            ColumnarResult[_ModelT]: The sorted rows
+        """
+        values = self.columns[by]
+        get = values.__getitem__ if key is None else lambda i: key(values[i])
+        return self.take(sorted(range(self._length), key=get, reverse=reverse))
+
+    def group_by(self, by: str) -> Dict[Any, "ColumnarResult[_ModelT]"]:
+        """Split the rows by the values of a column, eg: by semester.
+
+        Args:
+            by(str): The column to group by
+
+        Returns:
+            Dict[Any, ColumnarResult[_ModelT]]: The rows of every value, in the
+            order the values first appear
+        """
+        groups: Dict[Any, List[int]] = {}
+        for index, value in enumerate(self.columns[by]):
+            groups.setdefault(value, []).append(index)
+        return {value: self.take(indexes) for value, indexes in groups.items()}
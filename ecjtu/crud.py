@@ -1,19 +1,39 @@
-import re
+import asyncio
+import time
 from abc import abstractmethod
-from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, List, Optional
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
-from bs4 import BeautifulSoup
+from httpx import HTTPStatusError, Response
+from pydantic import BaseModel
 
-from ecjtu.constants import (
-    GET_CLASSES_URL,
-    GET_ELERTIVE_COURSE_URL_TEMPLATE,
-    GET_GPA_URL,
-)
-from ecjtu.models import GPA, ElectiveCourse, ScheduledCourse, Score
+from ecjtu import protocol
+from ecjtu.breaker import is_upstream_failure, record_stale
+from ecjtu.cache import MISSING, TTLCache
+from ecjtu.changes import Changes, diff
+from ecjtu.columnar import ColumnarResult
+from ecjtu.metrics import record_cache_lookup
+from ecjtu.models import GPA, ElectiveCourse, ScheduledCourse, Score, ScoreSheet
 from ecjtu.utils import (
+    format_date,
     get_cur_semester,
     get_cur_week_datetime,
+    get_date_range,
     get_last_semester,
     get_today_date,
 )
@@ -22,15 +42,174 @@ from ecjtu.utils.logger import logger
 if TYPE_CHECKING:
     from ecjtu.client import ECJTU, AsyncECJTU
 
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+async def _gather_bounded(
+    func: Callable[[_T], Awaitable[_R]], items: List[_T], max_concurrency: int
+) -> List[_R]:
+    """Await func on every item concurrently, with at most max_concurrency calls
+    in flight at the same time.
+
+    Like `ECJTU._parallel_map`, if any call fails, the exception of the first
+    failed item is raised, whichever call failed first in time.
+
+    Returns:
+        List[_R]: Results in the order of items
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _call(item: _T) -> _R:
+        async with semaphore:
+            return await func(item)
+
+    results = await asyncio.gather(
+        *(_call(item) for item in items), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return list(results)
+
+
+def _copy(value: _R) -> _R:
+    # hand out copies of cached lists and models, eg: the score sheet, so that
+    # callers can not modify the cache or the last good value kept for stale data
+    if isinstance(value, BaseModel):
+        return value.model_copy(deep=True)
+    return list(value) if isinstance(value, list) else value
+
+
+def _courses_to_columns(
+    courses: Dict[str, List[ScheduledCourse]],
+) -> ColumnarResult[ScheduledCourse]:
+    return ColumnarResult.from_models(
+        ScheduledCourse,
+        (course for day_courses in courses.values() for course in day_courses),
+        date=[day for day, day_courses in courses.items() for _ in day_courses],
+    )
+
+
+def _first_date_of_each_week(dates: List[str]) -> List[str]:
+    # one date per ISO week, the response to it may cover the other ones
+    weeks = {}
+    for day in dates:
+        weeks.setdefault(datetime.strptime(day, "%Y-%m-%d").isocalendar()[:2], day)
+    return list(weeks.values())
+
+
+class _CRUDCacheMixin:
+    """Cache of the CRUD clients, shared by the sync and the async ones, which
+    only differ by how they send requests and fetch resources on a cache miss.
+    """
+
+    # seconds the fetched resources stay in the cache, 0 disables the cache
+    cache_ttl: float = 300.0
+    cache_size: int = 128
+    # seconds the last good resources are kept to be served when upstream fails
+    stale_ttl: float = 86400.0
+
+    client: Union["ECJTU", "AsyncECJTU"]
+
+    def __init__(
+        self,
+        client: Union["ECJTU", "AsyncECJTU"],
+        cache_ttl: Optional[float] = None,
+    ):
+        self.client = client
+        self.cache = TTLCache(
+            maxsize=self.cache_size,
+            ttl=self.cache_ttl if cache_ttl is None else cache_ttl,
+        )
+        # last resources fetched successfully, served if `client.serve_stale`
+        self.last_good = TTLCache(maxsize=self.cache_size, ttl=self.stale_ttl)
+
+    def invalidate(self) -> None:
+        """Drop every cached resource, the next call fetches them again."""
+        self.cache.clear()
+
+    def _lookup(self, key: Hashable) -> Any:
+        """Get a resource from the cache, MISSING if it is not cached."""
+        value = self.cache.get(key)
+        if self.client.collect_metrics:
+            resource = key[0] if isinstance(key, tuple) else key
+            record_cache_lookup(str(resource), value is not MISSING)
+        return value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self.cache.set(key, value)
+        if self.client.serve_stale:
+            self.last_good.set(key, (value, time.time()))
+
+    @staticmethod
+    def _check_status(resp: Response, resource: str) -> Response:
+        """Raise `httpx.HTTPStatusError` unless the response is a 200, so that a
+        5xx counts as an upstream failure, see `ecjtu.breaker`."""
+        if resp.status_code != 200:
+            raise HTTPStatusError(
+                f"Failed to get {resource}, status code: {resp.status_code}",
+                request=resp.request,
+                response=resp,
+            )
+        return resp
+
+    def _stale(self, key: Hashable, error: Exception) -> Any:
+        """Get the last good resource after fetching it failed.
+
+        Raises:
+            Exception: error, if it is not an upstream failure, stale resources
+                are not served or there is none
+        """
+        if not self.client.serve_stale or not is_upstream_failure(error):
+            raise error
+        entry = self.last_good.get(key)
+        if entry is MISSING:
+            raise error
+
+        value, fetched_at = entry
+        logger.warning(f"Serving stale {key} fetched at {fetched_at:.0f}: {error!r}")
+        record_stale(fetched_at)
+        return value
+
 
-class CRUDClient:
+class CRUDClient(_CRUDCacheMixin):
     """
     CRUD mixin for resources. This class provides basic CRUD operations for resources.
     """
 
-    def __init__(self, client: "ECJTU"):
-        self.client: "ECJTU" = client
-        self.cache: dict = {}
+    client: "ECJTU"
+
+    def _send(self, request: protocol.RequestSpec) -> Response:
+        with self.client._timed("network"):
+            if request.method == "POST":
+                return self.client.post(request.url, data=request.data)
+            return self.client.get(request.url)
+
+    def _cached(
+        self, key: Hashable, fetch: Callable[[], _R], force_refresh: bool = False
+    ) -> _R:
+        """Get a resource from the cache, fetching and caching it on miss.
+
+        Args:
+            key(Hashable): Key of the resource in the cache
+            fetch(Callable[[], _R]): Fetches the resource
+            force_refresh(bool): Fetch the resource even if it is cached
+
+        Returns:
+            _R: The resource
+        """
+        if not force_refresh:
+            value = self._lookup(key)
+            if value is not MISSING:
+                return _copy(value)
+
+        try:
+            value = fetch()
+        except Exception as e:
+            return _copy(self._stale(key, e))
+        self._store(key, value)
+        return _copy(value)
 
     @abstractmethod
     def today(self, *args, **kwargs):
@@ -41,14 +220,49 @@ class CRUDClient:
         raise NotImplementedError
 
 
-class AsyncCRUDClient:
+class AsyncCRUDClient(_CRUDCacheMixin):
     """
     CRUD mixin for resources. This class provides basic CRUD operations for resources.
     """
 
-    def __init__(self, client: "AsyncECJTU"):
-        self.client: AsyncECJTU = client
-        self.cache: dict = {}
+    # default max requests in flight for batch queries such as `this_week`
+    max_concurrency: int = 7
+
+    client: "AsyncECJTU"
+
+    async def _send(self, request: protocol.RequestSpec) -> Response:
+        with self.client._timed("network"):
+            if request.method == "POST":
+                return await self.client.post(request.url, data=request.data)
+            return await self.client.get(request.url)
+
+    async def _cached(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[_R]],
+        force_refresh: bool = False,
+    ) -> _R:
+        """Get a resource from the cache, fetching and caching it on miss.
+
+        Args:
+            key(Hashable): Key of the resource in the cache
+            fetch(Callable[[], Awaitable[_R]]): Fetches the resource
+            force_refresh(bool): Fetch the resource even if it is cached
+
+        Returns:
+            _R: The resource
+        """
+        if not force_refresh:
+            value = self._lookup(key)
+            if value is not MISSING:
+                return _copy(value)
+
+        try:
+            value = await fetch()
+        except Exception as e:
+            return _copy(self._stale(key, e))
+        self._store(key, value)
+        return _copy(value)
 
     @abstractmethod
     async def today(self, *args, **kwargs):
@@ -60,398 +274,1061 @@ class AsyncCRUDClient:
 
 
 class ScheduledCourseCRUD(CRUDClient):
-    def _fetch_courses(self, date: str) -> List[ScheduledCourse]:
+    """Courses of the timetable. The response to a date may cover its whole ISO
+    week, then the other days of the week are cached from the same response and,
+    once such a response has been seen, batch queries send one request per week.
+    """
+
+    # the timetable of a date rarely changes, but today's may be adjusted
+    cache_ttl: float = 3600.0
+
+    def __init__(self, client: "ECJTU", cache_ttl: Optional[float] = None):
+        super().__init__(client, cache_ttl)
+        # set once a response covering a whole week has been seen, or by the
+        # caller if the endpoint is known to answer with whole weeks
+        self.covers_week = False
+
+    def _request_courses(self, date: str) -> Dict[str, List[ScheduledCourse]]:
+        resp = self._send(protocol.build_scheduled_courses_request(date))
+        self._check_status(resp, "scheduled courses")
+        courses = self.client._parse(
+            protocol.parse_week_calendar, resp.content, date, self.covers_week
+        )
+        if len(courses) > 1:
+            self.covers_week = True
+        for day, day_courses in courses.items():
+            self._store(("courses", day), day_courses)
+        return courses
+
+    def _fetch_courses(
+        self, date: str, force_refresh: bool = False
+    ) -> List[ScheduledCourse]:
         """Fetch courses by date
 
         Args:
             date(str): The date to fetch, eg: 2023-01-01
+            force_refresh(bool): Fetch the courses even if they are cached
 
         Returns:
             List[ScheduledCourse]: List of courses
         """
-        resp = self.client.post(GET_CLASSES_URL, data={"date": date})
+        courses = MISSING if force_refresh else self._lookup(("courses", date))
+        if courses is MISSING:
+            try:
+                courses = self._request_courses(date)[date]
+            except Exception as e:
+                courses = self._stale(("courses", date), e)
+        return _copy(courses)
+
+    def _fetch_dates(
+        self, dates: List[str], force_refresh: bool = False
+    ) -> Dict[str, List[ScheduledCourse]]:
+        """Fetch courses of several dates on the worker pool of the client, in a
+        single round. Once the responses are known to cover whole weeks, one
+        date of every ISO week is fetched first, then the dates not covered
 
-        _ = resp.json().get("weekcalendarpojoList", [])
-        return list(ScheduledCourse.model_validate(cls) for cls in _)
+        Args:
+            dates(List[str]): The dates to fetch, eg: ["2023-01-01"]
+            force_refresh(bool): Fetch the courses even if they are cached
 
-    def filter(self, *, date: str) -> List[ScheduledCourse]:
+        Returns:
+            Dict[str, List[ScheduledCourse]]: Courses keyed by date, in the order
+            of dates
+        """
+        dates = [format_date(day) for day in dates]
+        courses: Dict[str, List[ScheduledCourse]] = {}
+        if not force_refresh:
+            for day in dates:
+                cached = self._lookup(("courses", day))
+                if cached is not MISSING:
+                    courses[day] = cached
+
+        try:
+            if self.covers_week:
+                missing = [day for day in dates if day not in courses]
+                for week in self.client._parallel_map(
+                    self._request_courses, _first_date_of_each_week(missing)
+                ):
+                    courses.update(week)
+
+            missing = [day for day in dates if day not in courses]
+            for day, week in zip(
+                missing, self.client._parallel_map(self._request_courses, missing)
+            ):
+                courses[day] = week[day]
+        except Exception as e:
+            for day in dates:
+                if day not in courses:
+                    courses[day] = self._stale(("courses", day), e)
+        return {day: _copy(courses[day]) for day in dates}
+
+    def filter(
+        self, *, date: Union[str, date], force_refresh: bool = False
+    ) -> List[ScheduledCourse]:
         """Filter courses by date
 
         Args:
-            date(str): The date to filter, eg: 2023-01-01
+            date(Union[str, date]): The date to filter, eg: 2023-01-01
+            force_refresh(bool): Fetch the courses even if they are cached
 
         Returns:
             List[ElectiveCourse]: List of courses
         """
-        return self._fetch_courses(date)
+        return self._fetch_courses(format_date(date), force_refresh)
 
-    def today(self) -> List[ScheduledCourse]:
+    def today(self, *, force_refresh: bool = False) -> List[ScheduledCourse]:
         """Get today's classes
 
+        Args:
+            force_refresh(bool): Fetch the courses even if they are cached
+
         Returns:
             List[ElectiveCourse]: List of courses
         """
         date: str = get_today_date()
-        return self._fetch_courses(date)
+        return self._fetch_courses(date, force_refresh)
 
-    def this_week(self) -> List[List[ScheduledCourse]]:
-        """Get this week's classes
+    def this_week(self, *, force_refresh: bool = False) -> List[List[ScheduledCourse]]:
+        """Get this week's classes, in a single request if the response covers
+        the week, otherwise the seven days are fetched on the worker pool of the
+        client
+
+        Args:
+            force_refresh(bool): Fetch the courses even if they are cached
 
         Returns:
             List[List[ElectiveCourse]]: List of courses
         """
         start_datetime: datetime = get_cur_week_datetime()
-        week_classes: List[List[ScheduledCourse]] = []
+        dates: List[str] = get_date_range(
+            start_datetime, start_datetime + timedelta(days=6)
+        )
+        return list(self._fetch_dates(dates, force_refresh).values())
+
+    def range(
+        self,
+        start: Union[str, date],
+        end: Union[str, date],
+        *,
+        force_refresh: bool = False,
+    ) -> Dict[str, List[ScheduledCourse]]:
+        """Get classes of every date between start and end (both inclusive),
+        the weeks or dates are fetched on the worker pool of the client
 
-        for i in range(7):
-            date: str = (start_datetime + timedelta(days=i)).strftime("%Y-%m-%d")
-            week_classes.append(self._fetch_courses(date))
+        Args:
+            start(Union[str, date]): The first date, eg: 2023-01-01
+            end(Union[str, date]): The last date, eg: 2023-01-31
+            force_refresh(bool): Fetch the courses even if they are cached
+
+        Returns:
+            Dict[str, List[ScheduledCourse]]: Courses keyed by date, in date order
+        """
+        return self._fetch_dates(get_date_range(start, end), force_refresh)
+
+    def columns(
+        self,
+        start: Union[str, date],
+        end: Union[str, date],
+        *,
+        force_refresh: bool = False,
+    ) -> ColumnarResult[ScheduledCourse]:
+        """Get classes of every date between start and end (both inclusive) as a
+        columnar result with a `date` column, see `ecjtu.columnar`.
 
-        return week_classes
+        Args:
+            start(Union[str, date]): The first date, eg: 2023-01-01
+            end(Union[str, date]): The last date, eg: 2023-01-31
+            force_refresh(bool): Fetch the courses even if they are cached
+
+        Returns:
+            ColumnarResult[ScheduledCourse]: Courses in date order
+        """
+        courses = self.range(start, end, force_refresh=force_refresh)
+        return _courses_to_columns(courses)
 
 
 class AsyncScheduledCourseCRUD(AsyncCRUDClient):
-    async def _fetch_courses(self, date: str) -> List[ScheduledCourse]:
+    """Async version of `ScheduledCourseCRUD`."""
+
+    # the timetable of a date rarely changes, but today's may be adjusted
+    cache_ttl: float = 3600.0
+
+    def __init__(self, client: "AsyncECJTU", cache_ttl: Optional[float] = None):
+        super().__init__(client, cache_ttl)
+        # set once a response covering a whole week has been seen, or by the
+        # caller if the endpoint is known to answer with whole weeks
+        self.covers_week = False
+
+    async def _request_courses(self, date: str) -> Dict[str, List[ScheduledCourse]]:
+        resp = await self._send(protocol.build_scheduled_courses_request(date))
+        self._check_status(resp, "scheduled courses")
+        courses = await self.client._parse(
+            protocol.parse_week_calendar, resp.content, date, self.covers_week
+        )
+        if len(courses) > 1:
+            self.covers_week = True
+        for day, day_courses in courses.items():
+            self._store(("courses", day), day_courses)
+        return courses
+
+    async def _fetch_courses(
+        self, date: str, force_refresh: bool = False
+    ) -> List[ScheduledCourse]:
         """Fetch courses by date
 
         Args:
             date(str): The date to fetch, eg: 2023-01-01
+            force_refresh(bool): Fetch the courses even if they are cached
 
         Returns:
             List[ScheduledCourse]: List of courses
         """
-        resp = await self.client.post(GET_CLASSES_URL, data={"date": date})
+        courses = MISSING if force_refresh else self._lookup(("courses", date))
+        if courses is MISSING:
+            try:
+                courses = (await self._request_courses(date))[date]
+            except Exception as e:
+                courses = self._stale(("courses", date), e)
+        return _copy(courses)
+
+    async def _fetch_dates(
+        self,
+        dates: List[str],
+        max_concurrency: Optional[int] = None,
+        force_refresh: bool = False,
+    ) -> Dict[str, List[ScheduledCourse]]:
+        """Fetch courses of several dates concurrently, in a single round. Once
+        the responses are known to cover whole weeks, one date of every ISO week
+        is fetched first, then the dates not covered
 
-        _ = resp.json().get("weekcalendarpojoList", [])
-        return list(ScheduledCourse.model_validate(cls) for cls in _)
+        Args:
+            dates(List[str]): The dates to fetch, eg: ["2023-01-01"]
+            max_concurrency(Optional[int]): Max requests in flight at the same time,
+                defaults to `self.max_concurrency`
+            force_refresh(bool): Fetch the courses even if they are cached
 
-    async def filter(self, *, date: str) -> List[ScheduledCourse]:
+        Returns:
+            Dict[str, List[ScheduledCourse]]: Courses keyed by date, in the order
+            of dates
+        """
+        max_concurrency = max_concurrency or self.max_concurrency
+        dates = [format_date(day) for day in dates]
+        courses: Dict[str, List[ScheduledCourse]] = {}
+        if not force_refresh:
+            for day in dates:
+                cached = self._lookup(("courses", day))
+                if cached is not MISSING:
+                    courses[day] = cached
+
+        try:
+            if self.covers_week:
+                missing = [day for day in dates if day not in courses]
+                for week in await _gather_bounded(
+                    self._request_courses,
+                    _first_date_of_each_week(missing),
+                    max_concurrency,
+                ):
+                    courses.update(week)
+
+            missing = [day for day in dates if day not in courses]
+            weeks = await _gather_bounded(
+                self._request_courses, missing, max_concurrency
+            )
+            for day, week in zip(missing, weeks):
+                courses[day] = week[day]
+        except Exception as e:
+            for day in dates:
+                if day not in courses:
+                    courses[day] = self._stale(("courses", day), e)
+        return {day: _copy(courses[day]) for day in dates}
+
+    async def filter(
+        self, *, date: Union[str, date], force_refresh: bool = False
+    ) -> List[ScheduledCourse]:
         """Filter courses by date
 
         Args:
-            date(str): The date to filter, eg: 2023-01-01
+            date(Union[str, date]): The date to filter, eg: 2023-01-01
+            force_refresh(bool): Fetch the courses even if they are cached
 
         Returns:
             List[ElectiveCourse]: List of courses
         """
-        return await self._fetch_courses(date)
+        return await self._fetch_courses(format_date(date), force_refresh)
 
-    async def today(self) -> List[ScheduledCourse]:
+    async def today(self, *, force_refresh: bool = False) -> List[ScheduledCourse]:
         """Get today's classes
 
+        Args:
+            force_refresh(bool): Fetch the courses even if they are cached
+
         Returns:
             List[ElectiveCourse]: List of courses
         """
         date: str = get_today_date()
-        return await self._fetch_courses(date)
+        return await self._fetch_courses(date, force_refresh)
 
-    async def this_week(self) -> List[List[ScheduledCourse]]:
-        """Get this week's classes
+    async def this_week(
+        self, *, max_concurrency: Optional[int] = None, force_refresh: bool = False
+    ) -> List[List[ScheduledCourse]]:
+        """Get this week's classes, in a single request if the response covers
+        the week, otherwise the seven days are fetched concurrently
+
+        Args:
+            max_concurrency(Optional[int]): Max requests in flight at the same time,
+                defaults to `self.max_concurrency`
+            force_refresh(bool): Fetch the courses even if they are cached
 
         Returns:
             List[List[ElectiveCourse]]: List of courses
         """
         start_datetime: datetime = get_cur_week_datetime()
-        week_classes: List[List[ScheduledCourse]] = []
+        dates: List[str] = get_date_range(
+            start_datetime, start_datetime + timedelta(days=6)
+        )
+        courses = await self._fetch_dates(dates, max_concurrency, force_refresh)
+        return list(courses.values())
+
+    async def range(
+        self,
+        start: Union[str, date],
+        end: Union[str, date],
+        *,
+        max_concurrency: Optional[int] = None,
+        force_refresh: bool = False,
+    ) -> Dict[str, List[ScheduledCourse]]:
+        """Get classes of every date between start and end (both inclusive),
+        the weeks or dates are fetched concurrently
 
-        for i in range(7):
-            date: str = (start_datetime + timedelta(days=i)).strftime("%Y-%m-%d")
-            week_classes.append(await self._fetch_courses(date))
+        Args:
+            start(Union[str, date]): The first date, eg: 2023-01-01
+            end(Union[str, date]): The last date, eg: 2023-01-31
+            max_concurrency(Optional[int]): Max requests in flight at the same time,
+                defaults to `self.max_concurrency`
+            force_refresh(bool): Fetch the courses even if they are cached
 
-        return week_classes
+        Returns:
+            Dict[str, List[ScheduledCourse]]: Courses keyed by date, in date order
+        """
+        return await self._fetch_dates(
+            get_date_range(start, end), max_concurrency, force_refresh
+        )
 
+    async def columns(
+        self,
+        start: Union[str, date],
+        end: Union[str, date],
+        *,
+        max_concurrency: Optional[int] = None,
+        force_refresh: bool = False,
+    ) -> ColumnarResult[ScheduledCourse]:
+        """Get classes of every date between start and end (both inclusive) as a
+        columnar result with a `date` column, see `ecjtu.columnar`.
 
-class GPACRUD(CRUDClient):
-    def today(self) -> GPA:
-        """Get current GPA
+        Args:
+            start(Union[str, date]): The first date, eg: 2023-01-01
+            end(Union[str, date]): The last date, eg: 2023-01-31
+            max_concurrency(Optional[int]): Max requests in flight at the same time,
+                defaults to `self.max_concurrency`
+            force_refresh(bool): Fetch the courses even if they are cached
 
         Returns:
-            GPA: GPA model
+            ColumnarResult[ScheduledCourse]: Courses in date order
         """
-        resp_html = self.client.get(GET_GPA_URL)
+        courses = await self.range(
+            start, end, max_concurrency=max_concurrency, force_refresh=force_refresh
+        )
+        return _courses_to_columns(courses)
 
-        if resp_html.status_code != 200:
-            raise Exception(f"Failed to get GPA, status code: {resp_html.status_code}")
 
-        soup = BeautifulSoup(resp_html.text, "html.parser")
-        data = [td.text for td in soup.find_all("tr")[3].find_all("td")]
-        return GPA.model_validate(
-            {"student_name": data[1], "gpa": data[6], "status": data[2]}
-        )
+class GPACRUD(CRUDClient):
+    """GPA, read from the score sheet cached by `client.scores`, it has no cache
+    of its own."""
+
+    def invalidate(self) -> None:
+        """Drop the cached score sheet of `client.scores`."""
+        self.client.scores.invalidate()
+
+    def today(self, *, force_refresh: bool = False) -> GPA:
+        """Get current GPA, read from the score sheet cached by `client.scores`
+
+        Args:
+            force_refresh(bool): Fetch the score page even if it is cached
+
+        Returns:
+            GPA: GPA model
+        """
+        sheet = self.client.scores.sheet(force_refresh=force_refresh)
+        if sheet.gpa is None:
+            raise Exception("Failed to get GPA, no GPA on the score page")
+        return sheet.gpa
 
     def filter(self, **kwargs) -> List[GPA]:
         raise Exception("GAP can't be filtered")
 
 
 class AsyncGPACRUD(AsyncCRUDClient):
-    async def today(self) -> GPA:
-        """Get current GPA
+    """GPA, read from the score sheet cached by `client.scores`, it has no cache
+    of its own."""
+
+    def invalidate(self) -> None:
+        """Drop the cached score sheet of `client.scores`."""
+        self.client.scores.invalidate()
+
+    async def today(self, *, force_refresh: bool = False) -> GPA:
+        """Get current GPA, read from the score sheet cached by `client.scores`
+
+        Args:
+            force_refresh(bool): Fetch the score page even if it is cached
 
         Returns:
             GPA: GPA model
         """
-        resp_html = await self.client.get(GET_GPA_URL)
-
-        if resp_html.status_code != 200:
-            raise Exception(f"Failed to get GPA, status code: {resp_html.status_code}")
-
-        soup = BeautifulSoup(resp_html.text, "html.parser")
-        data = [td.text for td in soup.find_all("tr")[3].find_all("td")]
-        return GPA.model_validate(
-            {"student_name": data[1], "gpa": data[6], "status": data[2]}
-        )
+        sheet = await self.client.scores.sheet(force_refresh=force_refresh)
+        if sheet.gpa is None:
+            raise Exception("Failed to get GPA, no GPA on the score page")
+        return sheet.gpa
 
     async def filter(self, **kwargs) -> List[GPA]:
         raise Exception("GAP can't be filtered")
 
 
 class ScoreCRUD(CRUDClient):
-    def _fetch_scores(self, semester: str) -> List[Score]:
-        """Fetch scores by semester
+    # scores are published a few times a semester
+    cache_ttl: float = 1800.0
+    # fields identifying a score in `changes_since`
+    change_key: Tuple[str, ...] = ("semester", "course_name")
+
+    def sheet(self, *, force_refresh: bool = False) -> ScoreSheet:
+        """Get the score sheet, the GPA and the scores of every semester parsed
+        from a single fetch of the score page
 
         Args:
-            semester(str): The semester to fetch, eg: 2023.1
+            force_refresh(bool): Fetch the score page even if it is cached
 
         Returns:
-            List[Score]: List of scores
+            ScoreSheet: The score sheet
         """
-        resp_html = self.client.get(GET_GPA_URL)
+        return self._cached(("sheet",), self._request_sheet, force_refresh)
+
+    def _request_sheet(self) -> ScoreSheet:
+        resp = self._get_score_page()
+        return self.client._parse(
+            protocol.parse_score_sheet, resp.content, resp.encoding
+        )
 
-        if resp_html.status_code != 200:
-            raise Exception(f"Failed to get GPA, status code: {resp_html.status_code}")
+    def _get_score_page(self) -> Response:
+        resp_html = self._send(protocol.build_score_page_request())
+        return self._check_status(resp_html, "GPA")
 
-        scores: List[Score] = []
-        soup = BeautifulSoup(resp_html.text, "html.parser")
+    def iter(
+        self, *, semester: Optional[str] = None, force_refresh: bool = False
+    ) -> Iterator[Score]:
+        """Iterate scores of the score sheet, see `sheet`. The score page is
+        fetched, parsed and validated whole before the first score, with the same
+        cache, stale data and stats as the other queries of scores.
 
-        pattern = re.compile(r"\b{}\b".format(semester.replace(".", "_")))
-        ul_tags = soup.find_all("ul", class_=pattern)
-        for ul_tag in ul_tags:
-            li_list = ul_tag.find_all("li")
-            li_values = [li.text for li in li_list]
+        Args:
+            semester(Optional[str]): The semester to iterate, eg: 2023.1, every
+                semester if missing
+            force_refresh(bool): Fetch the score page even if it is cached
 
-            score = Score(
-                semester=semester,
-                course_name=li_values[1],
-                course_nature=li_values[2],
-                credit=float(li_values[4]),
-                grade=li_values[5],
-            )
-            scores.append(score)
+        Yields:
+            Score: The scores, in the order of the score page
+        """
+        yield from self.sheet(force_refresh=force_refresh).iter(semester)
 
-        return scores
+    def _fetch_scores(self, semester: str, force_refresh: bool = False) -> List[Score]:
+        """Fetch scores by semester
+
+        Args:
+            semester(str): The semester to fetch, eg: 2023.1
+            force_refresh(bool): Fetch the scores even if they are cached
+
+        Returns:
+            List[Score]: List of scores
+        """
+        return self.sheet(force_refresh=force_refresh).get(semester)
 
-    def today(self) -> List[Score]:
+    def today(self, *, force_refresh: bool = False) -> List[Score]:
         """Get last semester's scores.
 
         The scores of this semester are not available until the semester ends.
 
+        Args:
+            force_refresh(bool): Fetch the scores even if they are cached
+
         Returns:
             List[Score]: List of scores
         """
         semester = get_last_semester()
-        return self._fetch_scores(semester)
+        return self._fetch_scores(semester, force_refresh)
+
+    def all(self, *, force_refresh: bool = False) -> Dict[str, List[Score]]:
+        """Get the scores of every semester.
+
+        Args:
+            force_refresh(bool): Fetch the scores even if they are cached
+
+        Returns:
+            Dict[str, List[Score]]: Scores keyed by semester, in the order of the
+            score page
+        """
+        sheet = self.sheet(force_refresh=force_refresh)
+        return {semester: sheet.get(semester) for semester in sheet.semesters}
+
+    def columns(self, *, force_refresh: bool = False) -> ColumnarResult[Score]:
+        """Get the scores of every semester as a columnar result, see
+        `ecjtu.columnar`.
+
+        Args:
+            force_refresh(bool): Fetch the scores even if they are cached
+
+        Returns:
+            ColumnarResult[Score]: The scores, in the order of the score page
+        """
+        sheet = self.sheet(force_refresh=force_refresh)
+        return ColumnarResult.from_models(Score, sheet.iter())
 
-    def filter(self, *, semester: Optional[str] = None, **kwargs) -> List[Score]:
+    def changes_since(
+        self, snapshot: Optional[str] = None, *, force_refresh: bool = False
+    ) -> Changes[Score]:
+        """Get the scores added, removed or modified since a snapshot, the
+        snapshot of the current scores is returned along with them.
+
+        Args:
+            snapshot(Optional[str]): `Changes.snapshot` of a previous call, every
+                score is added if missing
+            force_refresh(bool): Fetch the scores even if they are cached, to
+                poll for new scores
+
+        Returns:
+            Changes[Score]: The changed scores
+        """
+        sheet = self.sheet(force_refresh=force_refresh)
+        return diff(sheet.iter(), snapshot, self.change_key)
+
+    def filter(
+        self,
+        *,
+        semester: Optional[str] = None,
+        force_refresh: bool = False,
+        **kwargs,
+    ) -> List[Score]:
         """Filter scores by specified conditions.
 
         Args:
             semester(Optional[str]): The semester to filter, eg: 2023.1, 2023.2
+            force_refresh(bool): Fetch the scores even if they are cached
 
         Returns:
             List[Score]: List of scores
         """
-        return self._fetch_scores(semester)
+        return self._fetch_scores(semester, force_refresh)
+
+    def filter_semesters(
+        self, semesters: List[str], *, force_refresh: bool = False
+    ) -> Dict[str, List[Score]]:
+        """Get scores of several semesters, all of them are read from one fetch of
+        the score page.
+
+        Args:
+            semesters(List[str]): The semesters to fetch, eg: ["2022.1", "2022.2"]
+            force_refresh(bool): Fetch the scores even if they are cached
+
+        Returns:
+            Dict[str, List[Score]]: Scores keyed by semester, in the given order
+        """
+        sheet = self.sheet(force_refresh=force_refresh)
+        return {semester: sheet.get(semester) for semester in semesters}
 
 
 class AsyncScoreCRUD(AsyncCRUDClient):
-    async def _fetch_scores(self, semester: str) -> List[Score]:
-        """Fetch scores by semester
+    # scores are published a few times a semester
+    cache_ttl: float = 1800.0
+    # fields identifying a score in `changes_since`
+    change_key: Tuple[str, ...] = ("semester", "course_name")
+
+    async def sheet(self, *, force_refresh: bool = False) -> ScoreSheet:
+        """Get the score sheet, the GPA and the scores of every semester parsed
+        from a single fetch of the score page
 
         Args:
-            semester(str): The semester to fetch, eg: 2023.1
+            force_refresh(bool): Fetch the score page even if it is cached
 
         Returns:
-            List[Score]: List of scores
+            ScoreSheet: The score sheet
         """
-        resp_html = await self.client.get(GET_GPA_URL)
+        return await self._cached(("sheet",), self._request_sheet, force_refresh)
 
-        if resp_html.status_code != 200:
-            raise Exception(f"Failed to get GPA, status code: {resp_html.status_code}")
+    async def _request_sheet(self) -> ScoreSheet:
+        resp = await self._get_score_page()
+        return await self.client._parse(
+            protocol.parse_score_sheet, resp.content, resp.encoding
+        )
 
-        scores: List[Score] = []
-        soup = BeautifulSoup(resp_html.text, "html.parser")
+    async def _get_score_page(self) -> Response:
+        resp_html = await self._send(protocol.build_score_page_request())
+        return self._check_status(resp_html, "GPA")
 
-        pattern = re.compile(r"\b{}\b".format(semester.replace(".", "_")))
-        ul_tags = soup.find_all("ul", class_=pattern)
-        for ul_tag in ul_tags:
-            li_list = ul_tag.find_all("li")
-            li_values = [li.text for li in li_list]
+    async def iter(
+        self, *, semester: Optional[str] = None, force_refresh: bool = False
+    ) -> AsyncIterator[Score]:
+        """Iterate scores of the score sheet, see `sheet`. The score page is
+        fetched, parsed and validated whole before the first score, with the same
+        cache, stale data and stats as the other queries of scores.
 
-            score = Score(
-                semester=semester,
-                course_name=li_values[1],
-                course_nature=li_values[2],
-                credit=float(li_values[4]),
-                grade=li_values[5],
-            )
-            scores.append(score)
+        Args:
+            semester(Optional[str]): The semester to iterate, eg: 2023.1, every
+                semester if missing
+            force_refresh(bool): Fetch the score page even if it is cached
 
-        return scores
+        Yields:
+            Score: The scores, in the order of the score page
+        """
+        sheet = await self.sheet(force_refresh=force_refresh)
+        for score in sheet.iter(semester):
+            yield score
+
+    async def _fetch_scores(
+        self, semester: str, force_refresh: bool = False
+    ) -> List[Score]:
+        """Fetch scores by semester
 
-    async def today(self) -> List[Score]:
+        Args:
+            semester(str): The semester to fetch, eg: 2023.1
+            force_refresh(bool): Fetch the scores even if they are cached
+
+        Returns:
+            List[Score]: List of scores
+        """
+        return (await self.sheet(force_refresh=force_refresh)).get(semester)
+
+    async def today(self, *, force_refresh: bool = False) -> List[Score]:
         """Get last semester's scores.
 
         The scores of this semester are not available until the semester ends.
 
+        Args:
+            force_refresh(bool): Fetch the scores even if they are cached
+
         Returns:
             List[Score]: List of scores
         """
         semester = get_last_semester()
-        return await self._fetch_scores(semester)
+        return await self._fetch_scores(semester, force_refresh)
+
+    async def all(self, *, force_refresh: bool = False) -> Dict[str, List[Score]]:
+        """Get the scores of every semester.
+
+        Args:
+            force_refresh(bool): Fetch the scores even if they are cached
+
+        Returns:
+            Dict[str, List[Score]]: Scores keyed by semester, in the order of the
+            score page
+        """
+        sheet = await self.sheet(force_refresh=force_refresh)
+        return {semester: sheet.get(semester) for semester in sheet.semesters}
+
+    async def columns(self, *, force_refresh: bool = False) -> ColumnarResult[Score]:
+        """Get the scores of every semester as a columnar result, see
+        `ecjtu.columnar`.
+
+        Args:
+            force_refresh(bool): Fetch the scores even if they are cached
+
+        Returns:
+            ColumnarResult[Score]: The scores, in the order of the score page
+        """
+        sheet = await self.sheet(force_refresh=force_refresh)
+        return ColumnarResult.from_models(Score, sheet.iter())
+
+    async def changes_since(
+        self, snapshot: Optional[str] = None, *, force_refresh: bool = False
+    ) -> Changes[Score]:
+        """Get the scores added, removed or modified since a snapshot, the
+        snapshot of the current scores is returned along with them.
+
+        Args:
+            snapshot(Optional[str]): `Changes.snapshot` of a previous call, every
+                score is added if missing
+            force_refresh(bool): Fetch the scores even if they are cached, to
+                poll for new scores
+
+        Returns:
+            Changes[Score]: The changed scores
+        """
+        sheet = await self.sheet(force_refresh=force_refresh)
+        return diff(sheet.iter(), snapshot, self.change_key)
 
-    async def filter(self, *, semester: Optional[str] = None, **kwargs) -> List[Score]:
+    async def filter(
+        self,
+        *,
+        semester: Optional[str] = None,
+        force_refresh: bool = False,
+        **kwargs,
+    ) -> List[Score]:
         """Filter scores by specified conditions.
 
         Args:
             semester(Optional[str]): The semester to filter, eg: 2023.1, 2023.2
+            force_refresh(bool): Fetch the scores even if they are cached
 
         Returns:
             List[Score]: List of scores
         """
-        return await self._fetch_scores(semester)
+        return await self._fetch_scores(semester, force_refresh)
+
+    async def filter_semesters(
+        self, semesters: List[str], *, force_refresh: bool = False
+    ) -> Dict[str, List[Score]]:
+        """Get scores of several semesters, all of them are read from one fetch of
+        the score page.
+
+        Args:
+            semesters(List[str]): The semesters to fetch, eg: ["2022.1", "2022.2"]
+            force_refresh(bool): Fetch the scores even if they are cached
+
+        Returns:
+            Dict[str, List[Score]]: Scores keyed by semester, in the given order
+        """
+        sheet = await self.sheet(force_refresh=force_refresh)
+        return {semester: sheet.get(semester) for semester in semesters}
 
 
 class ElectiveCourseCRUD(CRUDClient):
-    def _fetch_elecourses(self, semester: str) -> List[ElectiveCourse]:
-        """Fetch elecourses by date
+    # elective courses only change during the selection period
+    cache_ttl: float = 1800.0
+    # fields identifying a course in `changes_since`
+    change_key: Tuple[str, ...] = ("semester", "class_name")
+
+    def _fetch_elecourses(
+        self, semester: str, force_refresh: bool = False
+    ) -> List[ElectiveCourse]:
+        """Fetch elecourses by semester
 
         Args:
             semester(str): The semester to fetch, eg: 2023.1
+            force_refresh(bool): Fetch the courses even if they are cached
 
         Returns:
             List[ElectiveCourse]: List of courses
         """
+        return self._cached(
+            ("elecourses", semester),
+            partial(self._request_elecourses, semester),
+            force_refresh,
+        )
 
-        get_elertive_course_url = GET_ELERTIVE_COURSE_URL_TEMPLATE + "?term=" + semester
+    def _request_elecourses(self, semester: str) -> List[ElectiveCourse]:
+        resp = self._get_elective_page(semester)
+        return self.client._parse(
+            protocol.parse_elective_courses, resp.content, resp.encoding
+        )
 
-        resp_html = self.client.get(get_elertive_course_url)
+    def _get_elective_page(self, semester: str) -> Response:
+        request = protocol.build_elective_courses_request(semester)
+        resp_html = self._send(request)
+        return self._check_status(resp_html, "elective courses")
 
-        if resp_html.status_code != 200:
-            raise Exception(
-                f"Failed to get elective courses, status code: {resp_html.status_code}"
-            )
+    def iter(
+        self, *, semester: Optional[str] = None, force_refresh: bool = False
+    ) -> Iterator[ElectiveCourse]:
+        """Iterate elective courses row by row, so that callers can stop early.
+        The table is fetched and parsed whole before the first course, only
+        building the models is done row by row. The courses are cached once
+        fully iterated.
 
-        ele_courses: List[ElectiveCourse] = []
-        soup = BeautifulSoup(resp_html.text, "html.parser")
-
-        tbody_tag = soup.find("tbody")
-        tr_list = tbody_tag.find_all("tr")
-
-        for tr_tag in tr_list:
-            td_tags = tr_tag.find_all("td")
-            td = [td.text for td in td_tags]
-            ele_course = ElectiveCourse(
-                semester=td[0],
-                class_name=td[11],
-                class_type=td[4],
-                class_assessment_method=td[5],
-                class_info=td[8],
-                class_number=td[12],
-                credit=float(td[7]),
-                teacher=td[9],
-            )
-            ele_courses.append(ele_course)
+        Args:
+            semester(Optional[str]): The semester to iterate, eg: 2023.1, defaults
+                to the current semester
+            force_refresh(bool): Fetch the courses even if they are cached
 
-        return ele_courses
+        Yields:
+            ElectiveCourse: The elective courses, in the order of the table
+        """
+        semester = semester or get_cur_semester()
+        ele_courses = (
+            MISSING if force_refresh else self._lookup(("elecourses", semester))
+        )
+        if ele_courses is not MISSING:
+            yield from ele_courses
+            return
 
-    def today(self, *args, **kwargs):
+        ele_courses = []
+        resp = self._get_elective_page(semester)
+        for ele_course in protocol.iter_elective_courses(resp.content, resp.encoding):
+            ele_courses.append(ele_course)
+            yield ele_course
+        self._store(("elecourses", semester), ele_courses)
+
+    def today(self, *args, force_refresh: bool = False, **kwargs):
         """
         Get today's elective courses
 
+        Args:
+            force_refresh(bool): Fetch the courses even if they are cached
+
         Returns:
             List[ElectiveCourse]: List of elective courses
         """
         semester = get_cur_semester()
-        return self._fetch_elecourses(semester)
+        return self._fetch_elecourses(semester, force_refresh)
+
+    def columns(
+        self, *, semester: Optional[str] = None, force_refresh: bool = False
+    ) -> ColumnarResult[ElectiveCourse]:
+        """Get the elective courses of a semester as a columnar result, see
+        `ecjtu.columnar`.
+
+        Args:
+            semester(Optional[str]): The semester, eg: 2023.1, defaults to the
+                current semester
+            force_refresh(bool): Fetch the courses even if they are cached
+
+        Returns:
+            ColumnarResult[ElectiveCourse]: The courses, in the order of the table
+        """
+        semester = semester or get_cur_semester()
+        ele_courses = self._fetch_elecourses(semester, force_refresh)
+        return ColumnarResult.from_models(ElectiveCourse, ele_courses)
+
+    def changes_since(
+        self,
+        snapshot: Optional[str] = None,
+        *,
+        semester: Optional[str] = None,
+        force_refresh: bool = False,
+    ) -> Changes[ElectiveCourse]:
+        """Get the elective courses of a semester added, removed or modified
+        since a snapshot, the snapshot of the current courses is returned along
+        with them.
+
+        Args:
+            snapshot(Optional[str]): `Changes.snapshot` of a previous call for the
+                same semester, every course is added if missing
+            semester(Optional[str]): The semester, eg: 2023.1, defaults to the
+                current semester
+            force_refresh(bool): Fetch the courses even if they are cached, to
+                poll for changes
+
+        Returns:
+            Changes[ElectiveCourse]: The changed courses
+        """
+        semester = semester or get_cur_semester()
+        ele_courses = self._fetch_elecourses(semester, force_refresh)
+        return diff(ele_courses, snapshot, self.change_key)
 
     def filter(
-        self, *, semester: Optional[str] = None, **kwargs
+        self,
+        *,
+        semester: Optional[str] = None,
+        force_refresh: bool = False,
+        **kwargs,
     ) -> List[ElectiveCourse]:
         """
         Filter elective courses by specified conditions.
 
         Args:
             semester(Optional[str]): The semester to filter, eg: 2023.1, 2023.2
+            force_refresh(bool): Fetch the courses even if they are cached
 
         Returns:
             List[ElectiveCourse]: List of elective courses
         """
-        return self._fetch_elecourses(semester)
+        return self._fetch_elecourses(semester, force_refresh)
+
+    def filter_semesters(
+        self, semesters: List[str], *, force_refresh: bool = False
+    ) -> Dict[str, List[ElectiveCourse]]:
+        """
+        Get elective courses of several semesters, the semesters are fetched on the
+        worker pool of the client.
+
+        Args:
+            semesters(List[str]): The semesters to fetch, eg: ["2022.1", "2022.2"]
+            force_refresh(bool): Fetch the courses even if they are cached
+
+        Returns:
+            Dict[str, List[ElectiveCourse]]: Elective courses keyed by semester, in
+            the given order
+        """
+        fetch = partial(self._fetch_elecourses, force_refresh=force_refresh)
+        return dict(zip(semesters, self.client._parallel_map(fetch, semesters)))
 
 
 class AsyncElectiveCourseCRUD(AsyncCRUDClient):
-    async def _fetch_elecourses(self, semester: str) -> List[ElectiveCourse]:
-        """Fetch elecourses by date
+    # elective courses only change during the selection period
+    cache_ttl: float = 1800.0
+    # fields identifying a course in `changes_since`
+    change_key: Tuple[str, ...] = ("semester", "class_name")
+
+    async def _fetch_elecourses(
+        self, semester: str, force_refresh: bool = False
+    ) -> List[ElectiveCourse]:
+        """Fetch elecourses by semester
 
         Args:
             semester(str): The semester to fetch, eg: 2023.1
+            force_refresh(bool): Fetch the courses even if they are cached
 
         Returns:
             List[ElectiveCourse]: List of courses
         """
+        return await self._cached(
+            ("elecourses", semester),
+            partial(self._request_elecourses, semester),
+            force_refresh,
+        )
 
-        get_elertive_course_url = GET_ELERTIVE_COURSE_URL_TEMPLATE + "?term=" + semester
+    async def _request_elecourses(self, semester: str) -> List[ElectiveCourse]:
+        resp = await self._get_elective_page(semester)
+        return await self.client._parse(
+            protocol.parse_elective_courses, resp.content, resp.encoding
+        )
 
-        resp_html = await self.client.get(get_elertive_course_url)
+    async def _get_elective_page(self, semester: str) -> Response:
+        request = protocol.build_elective_courses_request(semester)
+        resp_html = await self._send(request)
+        return self._check_status(resp_html, "elective courses")
+
+    async def iter(
+        self, *, semester: Optional[str] = None, force_refresh: bool = False
+    ) -> AsyncIterator[ElectiveCourse]:
+        """Iterate elective courses row by row, so that callers can stop early.
+        The table is fetched and parsed whole before the first course, only
+        building the models is done row by row. The courses are cached once
+        fully iterated.
+        With a parse executor, the models are built at once too, off the event
+        loop.
 
-        if resp_html.status_code != 200:
-            raise Exception(
-                f"Failed to get elective courses, status code: {resp_html.status_code}"
-            )
+        Args:
+            semester(Optional[str]): The semester to iterate, eg: 2023.1, defaults
+                to the current semester
+            force_refresh(bool): Fetch the courses even if they are cached
 
-        ele_courses: List[ElectiveCourse] = []
-        soup = BeautifulSoup(resp_html.text, "html.parser")
-
-        tbody_tag = soup.find("tbody")
-        tr_list = tbody_tag.find_all("tr")
-
-        for tr_tag in tr_list:
-            td_tags = tr_tag.find_all("td")
-            td = [td.text for td in td_tags]
-            ele_course = ElectiveCourse(
-                semester=td[0],
-                class_name=td[11],
-                class_type=td[4],
-                class_assessment_method=td[5],
-                class_info=td[8],
-                class_number=td[12],
-                credit=float(td[7]),
-                teacher=td[9],
-            )
+        Yields:
+            ElectiveCourse: The elective courses, in the order of the table
+        """
+        semester = semester or get_cur_semester()
+        ele_courses = (
+            MISSING if force_refresh else self._lookup(("elecourses", semester))
+        )
+        if ele_courses is MISSING and self.client.parse_executor is not None:
+            ele_courses = await self._request_elecourses(semester)
+            self._store(("elecourses", semester), ele_courses)
+        if ele_courses is not MISSING:
+            for ele_course in ele_courses:
+                yield ele_course
+            return
+
+        ele_courses = []
+        resp = await self._get_elective_page(semester)
+        for ele_course in protocol.iter_elective_courses(resp.content, resp.encoding):
             ele_courses.append(ele_course)
+            yield ele_course
+        self._store(("elecourses", semester), ele_courses)
 
-        return ele_courses
-
-    async def today(self, *args, **kwargs):
+    async def today(self, *args, force_refresh: bool = False, **kwargs):
         """
         Get today's elective courses
 
+        Args:
+            force_refresh(bool): Fetch the courses even if they are cached
+
         Returns:
             List[ElectiveCourse]: List of elective courses
         """
         semester = get_cur_semester()
-        return await self._fetch_elecourses(semester)
+        return await self._fetch_elecourses(semester, force_refresh)
+
+    async def columns(
+        self, *, semester: Optional[str] = None, force_refresh: bool = False
+    ) -> ColumnarResult[ElectiveCourse]:
+        """Get the elective courses of a semester as a columnar result, see
+        `ecjtu.columnar`.
+
+        Args:
+            semester(Optional[str]): The semester, eg: 2023.1, defaults to the
+                current semester
+            force_refresh(bool): Fetch the courses even if they are cached
+
+        Returns:
+            ColumnarResult[ElectiveCourse]: The courses, in the order of the table
+        """
+        semester = semester or get_cur_semester()
+        ele_courses = await self._fetch_elecourses(semester, force_refresh)
+        return ColumnarResult.from_models(ElectiveCourse, ele_courses)
+
+    async def changes_since(
+        self,
+        snapshot: Optional[str] = None,
+        *,
+        semester: Optional[str] = None,
+        force_refresh: bool = False,
+    ) -> Changes[ElectiveCourse]:
+        """Get the elective courses of a semester added, removed or modified
+        since a snapshot, the snapshot of the current courses is returned along
+        with them.
+
+        Args:
+            snapshot(Optional[str]): `Changes.snapshot` of a previous call for the
+                same semester, every course is added if missing
+            semester(Optional[str]): The semester, eg: 2023.1, defaults to the
+                current semester
+            force_refresh(bool): Fetch the courses even if they are cached, to
+                poll for changes
+
+        Returns:
+            Changes[ElectiveCourse]: The changed courses
+        """
+        semester = semester or get_cur_semester()
+        ele_courses = await self._fetch_elecourses(semester, force_refresh)
+        return diff(ele_courses, snapshot, self.change_key)
 
     async def filter(
-        self, *, semester: Optional[str] = None, **kwargs
+        self,
+        *,
+        semester: Optional[str] = None,
+        force_refresh: bool = False,
+        **kwargs,
     ) -> List[ElectiveCourse]:
         """
         Filter elective courses by specified conditions.
 
         Args:
             semester(Optional[str]): The semester to filter, eg: 2023.1, 2023.2
+            force_refresh(bool): Fetch the courses even if they are cached
 
         Returns:
             List[ElectiveCourse]: List of elective courses
         """
-        return await self._fetch_elecourses(semester)
+        return await self._fetch_elecourses(semester, force_refresh)
+
+    async def filter_semesters(
+        self,
+        semesters: List[str],
+        *,
+        max_concurrency: Optional[int] = None,
+        force_refresh: bool = False,
+    ) -> Dict[str, List[ElectiveCourse]]:
+        """
+        Get elective courses of several semesters, the semesters are fetched
+        concurrently.
+
+        Args:
+            semesters(List[str]): The semesters to fetch, eg: ["2022.1", "2022.2"]
+            max_concurrency(Optional[int]): Max requests in flight at the same time,
+                defaults to `self.max_concurrency`
+            force_refresh(bool): Fetch the courses even if they are cached
+
+        Returns:
+            Dict[str, List[ElectiveCourse]]: Elective courses keyed by semester, in
+            the given order
+        """
+        fetch = partial(self._fetch_elecourses, force_refresh=force_refresh)
+        ele_courses = await _gather_bounded(
+            fetch, semesters, max_concurrency or self.max_concurrency
+        )
+        return dict(zip(semesters, ele_courses))
@@ -0,0 +1,17 @@
+class ECJTUError(Exception):
+    """Base class of the errors raised by the ECJTU client."""
+
+
+class SessionExpiredError(ECJTUError):
+    """The ECJTU system answered with its login page instead of the requested
+    resource, the session of the client is no longer valid."""
+
+
+class CassetteError(ECJTUError):
+    """A cassette file is invalid, or has no recorded response to a request
+    that is replayed from it."""
+
+
+class CircuitOpenError(ECJTUError):
+    """The circuit breaker of an ECJTU system is open after repeated failures,
+    the request was rejected without being sent."""
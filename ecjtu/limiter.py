@@ -0,0 +1,407 @@
+"""Process-wide limiter of the requests sent to the ECJTU systems.
+
+Every client created with `limit_upstream=True` sends its requests through the
+limiter of this module, which keeps a budget for the CAS login server and another
+one for the JWXT data endpoints. A budget combines:
+
+- a token bucket, capping the rate of requests with room for short bursts
+- an adaptive concurrency limit (AIMD): it grows by about one request in flight
+  per round of successful requests, and is cut by `backoff` when a request fails,
+  is answered with 429 or 5xx, or is slower than `target_latency`
+
+so that the clients slow down as soon as the campus servers do, and recover when
+they are fine again. A request holds its slot until its response is closed, so
+that streamed bodies count as in flight while they are read.
+
+    configure_upstream_limits(jwxt=Budget("jwxt", rate=30, max_concurrency=64))
+    client = ECJTU(stud_id, password, limit_upstream=True)
+"""
+
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+import httpx
+
+from ecjtu.constants import CAS_ECJTU_DOMAIN
+from ecjtu.utils.logger import logger
+
+# status codes telling that the server is overloaded
+OVERLOAD_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class Budget:
+    """Rate and concurrency budget of the requests to one upstream system.
+
+    Args:
+        name(str): Name of the budget, used in logs
+        rate(float): Requests per second refilled into the token bucket
+        burst(int): Size of the token bucket, requests that can be sent at once
+        initial_concurrency(int): Requests in flight allowed at first
+        min_concurrency(int): The concurrency limit never goes below this
+        max_concurrency(int): The concurrency limit never goes above this
+        target_latency(float): Seconds above which a response counts as a sign
+            of overload
+        backoff(float): Factor the concurrency limit is multiplied by on overload
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = 10.0,
+        burst: int = 20,
+        initial_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_concurrency: int = 32,
+        target_latency: float = 2.0,
+        backoff: float = 0.7,
+    ) -> None:
+        if not 1 <= min_concurrency <= initial_concurrency <= max_concurrency:
+            raise ValueError(
+                "Expected 1 <= min_concurrency <= initial_concurrency <= "
+                "max_concurrency"
+            )
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.backoff = backoff
+
+        self._lock = threading.Lock()
+        # notified by `release`, for the threads waiting for a free slot
+        self._slot_freed = threading.Condition(self._lock)
+        # futures of the tasks waiting for a free slot, an asyncio.Condition
+        # would bind the budget to one event loop, the limiter is process-wide
+        self._async_waiters: List[
+            Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]
+        ] = []
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._limit = float(initial_concurrency)
+        self._in_flight = 0
+        # the limit is cut once per round trip, not once per failed request
+        self._decreased_at = 0.0
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Requests in flight currently allowed."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _has_free_slot(self) -> bool:
+        return self._in_flight < int(self._limit)
+
+    def try_acquire(self) -> float:
+        """Take a token and a slot for a request, if both are free.
+
+        Returns:
+            float: 0 if the request can be sent, inf if no slot is free, see
+            `wait_for_slot`, otherwise seconds to wait for a token
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._refilled_at) * self.rate
+            )
+            self._refilled_at = now
+
+            if not self._has_free_slot():
+                return float("inf")
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+
+            self._tokens -= 1
+            self._in_flight += 1
+            return 0.0
+
+    def release(self, latency: float, overloaded: bool) -> None:
+        """Give back the slot of a finished request and adapt the limit.
+
+        Args:
+            latency(float): Seconds the request took
+            overloaded(bool): The request failed or the server answered that it
+                is overloaded
+        """
+        with self._lock:
+            self._in_flight -= 1
+            self._notify_waiters()
+
+            now = time.monotonic()
+            if overloaded or latency > self.target_latency:
+                if now - self._decreased_at < latency:
+                    return
+                self._decreased_at = now
+                self._limit = max(self.min_concurrency, self._limit * self.backoff)
+                logger.warning(
+                    f"Upstream {self.name} overloaded, latency {latency:.2f}s, "
+                    f"concurrency limit lowered to {int(self._limit)}"
+                )
+            elif self._in_flight + 1 >= int(self._limit):
+                # only grow when the limit is actually what holds requests back
+                self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+
+    def wait_for_slot(self) -> None:
+        """Block until a slot is free, it may be taken again before the caller
+        tries to acquire it."""
+        with self._slot_freed:
+            self._slot_freed.wait_for(self._has_free_slot)
+
+    async def await_slot(self) -> None:
+        """Async version of `wait_for_slot`."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._has_free_slot():
+                return
+            future: "asyncio.Future[None]" = loop.create_future()
+            self._async_waiters.append((loop, future))
+        try:
+            await future
+        finally:
+            with self._lock:
+                if (loop, future) in self._async_waiters:
+                    self._async_waiters.remove((loop, future))
+
+    def _notify_waiters(self) -> None:
+        # called with the lock held, the waiters check again for a free slot
+        self._slot_freed.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # the event loop of the waiter is closed
+                pass
+
+
+def _wake(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class UpstreamLimiter:
+    """Budgets of the CAS login server and the JWXT data endpoints.
+
+    Args:
+        cas(Optional[Budget]): Budget of the CAS requests, a conservative one if
+            missing, logins are expensive for the server
+        jwxt(Optional[Budget]): Budget of the other requests
+    """
+
+    def __init__(
+        self, cas: Optional[Budget] = None, jwxt: Optional[Budget] = None
+    ) -> None:
+        self.cas = cas or Budget(
+            "cas", rate=2.0, burst=5, initial_concurrency=2, max_concurrency=8
+        )
+        self.jwxt = jwxt or Budget("jwxt")
+
+    def budget_for(self, request: httpx.Request) -> Budget:
+        if request.url.host == CAS_ECJTU_DOMAIN:
+            return self.cas
+        return self.jwxt
+
+    def acquire(self, request: httpx.Request) -> Budget:
+        """Wait until the request can be sent.
+
+        Returns:
+            Budget: The budget to release once the request is done
+        """
+        budget = self.budget_for(request)
+        while True:
+            wait = budget.try_acquire()
+            if not wait:
+                return budget
+            if wait == float("inf"):
+                budget.wait_for_slot()
+            else:
+                time.sleep(wait)
+
+    async def aacquire(self, request: httpx.Request) -> Budget:
+        """Async version of `acquire`."""
+        budget = self.budget_for(request)
+        while True:
+            wait = budget.try_acquire()
+            if not wait:
+                return budget
+            if wait == float("inf"):
+                await budget.await_slot()
+            else:
+                await asyncio.sleep(wait)
+
+
+class _Slot:
+    """A slot taken from a budget, released once."""
+
+    def __init__(self, budget: Budget) -> None:
+        self.budget = budget
+        self.start = time.monotonic()
+        self.latency: Optional[float] = None
+        self.overloaded = False
+        self._released = False
+
+    def answered(self, status_code: int) -> None:
+        # the latency of a request is the time to its response headers
+        self.latency = time.monotonic() - self.start
+        self.overloaded = status_code in OVERLOAD_STATUS_CODES
+
+    def release(self, overloaded: bool = False) -> None:
+        if self._released:
+            return
+        self._released = True
+        latency = self.latency
+        if latency is None:
+            latency = time.monotonic() - self.start
+        self.budget.release(latency, overloaded=self.overloaded or overloaded)
+
+
+class _SlotStream(httpx.SyncByteStream):
+    """Body of a response, releasing the slot of its request when closed."""
+
+    def __init__(self, stream: httpx.SyncByteStream, slot: _Slot) -> None:
+        self._stream = stream
+        self._slot = slot
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            yield from self._stream
+        except httpx.TransportError:
+            self._slot.release(overloaded=True)
+            raise
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._slot.release()
+
+
+class _AsyncSlotStream(httpx.AsyncByteStream):
+    """Async version of `_SlotStream`."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, slot: _Slot) -> None:
+        self._stream = stream
+        self._slot = slot
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except httpx.TransportError:
+            self._slot.release(overloaded=True)
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._slot.release()
+
+
+class LimitedTransport(httpx.BaseTransport):
+    """Send requests through another transport within the budgets of a limiter.
+
+    The slot of a request is released when its response is closed, once its
+    body is read for the responses that are not streamed.
+
+    Args:
+        transport(httpx.BaseTransport): Transport sending the requests
+        limiter(UpstreamLimiter): The limiter
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, limiter: UpstreamLimiter):
+        self._transport = transport
+        self.limiter = limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        slot = _Slot(self.limiter.acquire(request))
+        try:
+            response = self._transport.handle_request(request)
+        except httpx.TransportError:
+            slot.release(overloaded=True)
+            raise
+        except BaseException:
+            slot.release()
+            raise
+        slot.answered(response.status_code)
+        if response.is_closed:
+            # a body already read in memory, eg: by `httpx.MockTransport`
+            slot.release()
+        else:
+            response.stream = _SlotStream(response.stream, slot)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncLimitedTransport(httpx.AsyncBaseTransport):
+    """Async version of `LimitedTransport`.
+
+    Args:
+        transport(httpx.AsyncBaseTransport): Transport sending the requests
+        limiter(UpstreamLimiter): The limiter
+    """
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, limiter: UpstreamLimiter
+    ) -> None:
+        self._transport = transport
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        slot = _Slot(await self.limiter.aacquire(request))
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TransportError:
+            slot.release(overloaded=True)
+            raise
+        except BaseException:
+            slot.release()
+            raise
+        slot.answered(response.status_code)
+        if response.is_closed:
+            # a body already read in memory, eg: by `httpx.MockTransport`
+            slot.release()
+        else:
+            response.stream = _AsyncSlotStream(response.stream, slot)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+_lock = threading.Lock()
+_limiter: Optional[UpstreamLimiter] = None
+
+
+def configure_upstream_limits(
+    cas: Optional[Budget] = None, jwxt: Optional[Budget] = None
+) -> None:
+    """Replace the process-wide limiter, clients created afterwards use the new
+    budgets.
+
+    Args:
+        cas(Optional[Budget]): Budget of the CAS requests
+        jwxt(Optional[Budget]): Budget of the JWXT requests
+    """
+    global _limiter
+
+    with _lock:
+        _limiter = UpstreamLimiter(cas, jwxt)
+
+
+def get_upstream_limiter() -> UpstreamLimiter:
+    """Get the process-wide limiter, creating it with the default budgets on first
+    use."""
+    global _limiter
+
+    with _lock:
+        if _limiter is None:
+            _limiter = UpstreamLimiter()
+        return _limiter
@@ -0,0 +1,352 @@
+"""Process-wide metrics in the Prometheus text format, without extra dependencies.
+
+Clients created with `collect_metrics=True` record the latency of every request
+to the ECJTU systems by endpoint, the count and duration of their logins, and
+the hits and misses of their caches. The API server adds its own metrics and
+serves all of them at `/metrics`; any other application can serve `render()`.
+
+Recording a value takes a lock and a few dict and list operations, rendering
+happens only when the metrics are scraped.
+
+    client = ECJTU(stud_id, password, collect_metrics=True)
+    client.scores.today()
+    print(render())
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import httpx
+
+# seconds, from a cached answer to a login on a slow day
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+_Labels = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Registry:
+    """Metrics rendered together."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def unregister(self, metric: "_Metric") -> None:
+        with self._lock:
+            self._metrics.pop(metric.name, None)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Registry = REGISTRY,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A value that only goes up, per combination of label values.
+
+    Args:
+        name(str): Name of the metric, eg: ecjtu_logins_total
+        documentation(str): What the metric counts
+        labelnames(Sequence[str]): Names of the labels
+        registry(Registry): Where the metric is rendered
+    """
+
+    type = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[_Labels, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} "
+            f"{_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, or is read from a function when rendered.
+
+    Args:
+        name(str): Name of the metric
+        documentation(str): What the metric measures
+        labelnames(Sequence[str]): Names of the labels
+        registry(Registry): Where the metric is rendered
+        func(Optional[Callable]): Reads the value, or a dict of the values by
+            label values, each time the metric is rendered
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        *args,
+        func: Optional[Callable[[], Union[float, Dict[_Labels, float]]]] = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.func = func
+        self._values: Dict[_Labels, float] = {}
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def get(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def samples(self) -> List[str]:
+        if self.func is not None:
+            value = self.func()
+            values = list(value.items()) if isinstance(value, dict) else [((), value)]
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} "
+            f"{_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values, eg: latencies, per combination of label
+    values.
+
+    Args:
+        name(str): Name of the metric, eg: ecjtu_login_duration_seconds
+        documentation(str): What the metric observes
+        labelnames(Sequence[str]): Names of the labels
+        registry(Registry): Where the metric is rendered
+        buckets(Sequence[float]): Upper bounds of the buckets, increasing
+    """
+
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # per label values: count of each bucket, not cumulative, then +Inf, sum
+        self._values: Dict[_Labels, List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labelvalues)
+            if counts is None:
+                counts = self._values[labelvalues] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        counts = self._values.get(labelvalues)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(counts)) for labels, counts in self._values.items()]
+        names = self.labelnames + ("le",)
+        lines = []
+        for labels, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = _format_labels(names, labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+UPSTREAM_REQUESTS = Counter(
+    "ecjtu_upstream_requests_total",
+    "Requests sent to the ECJTU systems, by endpoint and status code",
+    ("endpoint", "status"),
+)
+UPSTREAM_LATENCY = Histogram(
+    "ecjtu_upstream_request_duration_seconds",
+    "Latency of the requests sent to the ECJTU systems, by endpoint",
+    ("endpoint",),
+)
+LOGINS = Counter(
+    "ecjtu_logins_total", "Logins to the ECJTU systems, by result", ("result",)
+)
+LOGIN_DURATION = Histogram(
+    "ecjtu_login_duration_seconds", "Duration of the logins to the ECJTU systems"
+)
+CACHE_LOOKUPS = Counter(
+    "ecjtu_cache_lookups_total",
+    "Lookups in the caches of the clients, by resource and result (hit or miss)",
+    ("resource", "result"),
+)
+
+
+def _endpoint(request: httpx.Request) -> str:
+    # the path only, the query strings carry tickets and dates
+    return request.url.host + request.url.path
+
+
+def _record_upstream(request: httpx.Request, status: str, start: float) -> None:
+    endpoint = _endpoint(request)
+    UPSTREAM_LATENCY.observe(time.perf_counter() - start, endpoint)
+    UPSTREAM_REQUESTS.inc(endpoint, status)
+
+
+class MetricsTransport(httpx.BaseTransport):
+    """Send requests through another transport, recording their latency.
+
+    Args:
+        transport(httpx.BaseTransport): Transport sending the requests
+    """
+
+    def __init__(self, transport: httpx.BaseTransport) -> None:
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+        except httpx.TransportError:
+            _record_upstream(request, "error", start)
+            raise
+        _record_upstream(request, str(response.status_code), start)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncMetricsTransport(httpx.AsyncBaseTransport):
+    """Async version of `MetricsTransport`.
+
+    Args:
+        transport(httpx.AsyncBaseTransport): Transport sending the requests
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TransportError:
+            _record_upstream(request, "error", start)
+            raise
+        _record_upstream(request, str(response.status_code), start)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+@contextmanager
+def track_login() -> Iterator[None]:
+    """Record the duration and the result of the login run in the block."""
+    start = time.perf_counter()
+    result = "failure"
+    try:
+        yield
+        result = "success"
+    finally:
+        LOGIN_DURATION.observe(time.perf_counter() - start)
+        LOGINS.inc(result)
+
+
+def record_cache_lookup(resource: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(resource, "hit" if hit else "miss")
+
+
+def render() -> str:
+    """Render the process-wide metrics in the Prometheus text exposition format."""
+    return REGISTRY.render()
@@ -1,3 +1,5 @@
+from typing import Dict, Iterator, List, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -40,3 +42,38 @@ class Score(BaseModel):
     course_nature: str = Field(..., description="课程性质", examples=["必修"])
     credit: float = Field(..., description="学分", examples=[3.0])
     grade: str = Field(..., description="成绩", examples=["合格", "94"])
+
+
+class ScoreSheet(BaseModel):
+    gpa: Optional[GPA] = Field(None, description="绩点")
+    scores: Dict[str, List[Score]] = Field(
+        default_factory=dict, description="各学期的成绩，按学期索引"
+    )
+
+    @property
+    def semesters(self) -> List[str]:
+        """Semesters with scores, in the order of the score page."""
+        return list(self.scores)
+
+    def add(self, score: Score) -> None:
+        """Append a score to its semester."""
+        self.scores.setdefault(score.semester, []).append(score)
+
+    def iter(self, semester: Optional[str] = None) -> Iterator[Score]:
+        """Iterate the scores of a semester, or of every semester if missing."""
+        if semester is not None:
+            yield from self.scores.get(semester, [])
+            return
+        for scores in self.scores.values():
+            yield from scores
+
+    def get(self, semester: str) -> List[Score]:
+        """Get the scores of a semester.
+
+        Args:
+            semester(str): The semester, eg: 2023.1
+
+        Returns:
+            List[Score]: List of scores, empty if the semester has no scores
+        """
+        return list(self.scores.get(semester, []))
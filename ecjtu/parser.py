@@ -0,0 +1,83 @@
+"""HTML parser backend of the CRUD scrapers.
+
+BeautifulSoup builds the same tree with every backend for the pages of the ECJTU
+systems, but the pure-Python `html.parser` is slower than lxml, which is used
+whenever it is installed. The backend can be forced with the `ECJTU_HTML_PARSER`
+environment variable or `set_parser_backend`.
+"""
+
+import os
+from typing import Optional, Tuple, Union
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+PARSER_BACKENDS: Tuple[str, ...] = ("lxml", "html.parser")
+
+
+def _is_available(backend: str) -> bool:
+    if backend == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            return False
+    return backend in PARSER_BACKENDS
+
+
+def _detect_backend() -> str:
+    return "lxml" if _is_available("lxml") else "html.parser"
+
+
+_backend: str = os.environ.get("ECJTU_HTML_PARSER") or _detect_backend()
+
+
+def get_parser_backend() -> str:
+    """Get the name of the backend used by `make_soup`, eg: lxml"""
+    return _backend
+
+
+def set_parser_backend(backend: Optional[str] = None) -> None:
+    """Set the backend used by `make_soup`.
+
+    Args:
+        backend(Optional[str]): One of `PARSER_BACKENDS`, None picks the fastest
+            one installed
+
+    Raises:
+        ValueError: if the backend is unknown or not installed
+    """
+    global _backend
+
+    if backend is None:
+        _backend = _detect_backend()
+        return
+    if not _is_available(backend):
+        raise ValueError(
+            f"Unavailable HTML parser backend: {backend}, "
+            f"choose one of {PARSER_BACKENDS} that is installed"
+        )
+    _backend = backend
+
+
+def make_soup(
+    markup: Union[str, bytes],
+    parse_only: Optional[SoupStrainer] = None,
+    encoding: Optional[str] = None,
+) -> BeautifulSoup:
+    """Parse markup with the current backend.
+
+    Args:
+        markup(Union[str, bytes]): The document, bytes are decoded by the parser
+            without building an intermediate str
+        parse_only(Optional[SoupStrainer]): Only keep the matching elements and
+            their descendants in the tree
+        encoding(Optional[str]): Encoding of markup if it is bytes, detected by
+            the parser if missing
+
+    Returns:
+        BeautifulSoup: The parsed document
+    """
+    if isinstance(markup, str):
+        encoding = None
+    return BeautifulSoup(
+        markup, _backend, parse_only=parse_only, from_encoding=encoding
+    )
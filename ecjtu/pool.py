@@ -0,0 +1,415 @@
+"""Pools of logged in clients keyed by student ID, for services that query the
+ECJTU systems on behalf of many students."""
+
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    AsyncIterator,
+    Callable,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from ecjtu.client import ECJTU, AsyncECJTU
+from ecjtu.utils.logger import logger
+
+_ClientT = TypeVar("_ClientT", bound=Union[ECJTU, AsyncECJTU])
+
+
+class _PoolEntry(Generic[_ClientT]):
+    __slots__ = ("client", "last_used", "leases", "evicted")
+
+    def __init__(self, client: _ClientT) -> None:
+        self.client = client
+        self.last_used = time.monotonic()
+        # callers using the client through `lease`, it is closed once they
+        # are all done if it was evicted meanwhile
+        self.leases = 0
+        self.evicted = False
+
+
+class _BaseClientPool(Generic[_ClientT]):
+    """Bookkeeping shared by the sync and async pools.
+
+    Clients are kept in least recently used order. A client is evicted once it
+    has not been used for `idle_ttl` seconds, or when the pool is full and it is
+    the least recently used one.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str, Optional[str]], _ClientT],
+        max_size: int,
+        idle_ttl: Optional[float],
+    ) -> None:
+        if max_size < 1:
+            raise ValueError(f"max_size should be at least 1, got {max_size}")
+
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._entries: "OrderedDict[str, _PoolEntry[_ClientT]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, stud_id: str) -> bool:
+        return stud_id in self._entries
+
+    def _checkout(
+        self, stud_id: str, password: Optional[str], lease: bool = False
+    ) -> Tuple[_PoolEntry[_ClientT], List[_ClientT]]:
+        """Get the entry of a student, creating its client if needed.
+
+        The client is created outside the lock of the pool, so that creating the
+        clients of several students does not run one at a time. If another
+        caller created the client of the same student meanwhile, theirs is kept.
+
+        Args:
+            stud_id(str): Student ID
+            password(Optional[str]): Password
+            lease(bool): Count the caller as a user of the client until it calls
+                `_release`
+
+        Returns:
+            Tuple[_PoolEntry[_ClientT], List[_ClientT]]: The entry, and the
+            clients the caller should close
+        """
+        with self._lock:
+            entry = self._touch(stud_id, lease)
+
+        created: Optional[_ClientT] = None
+        if entry is None:
+            created = self.factory(stud_id, password)
+
+        with self._lock:
+            if entry is None:
+                entry = self._touch(stud_id, lease)
+                if entry is None:
+                    entry = _PoolEntry(created)
+                    entry.leases = int(lease)
+                    self._entries[stud_id] = entry
+                    created = None
+
+            evicted = self._pop_idle(time.monotonic())
+            while len(self._entries) > self.max_size:
+                _, lru_entry = self._entries.popitem(last=False)
+                evicted.append(lru_entry)
+            to_close = self._detach(evicted)
+
+        if created is not None:
+            to_close.append(created)
+        return entry, to_close
+
+    def _touch(self, stud_id: str, lease: bool) -> Optional[_PoolEntry[_ClientT]]:
+        """Mark the entry of a student as used, the lock must be held."""
+        entry = self._entries.get(stud_id)
+        if entry is None:
+            return None
+
+        self._entries.move_to_end(stud_id)
+        entry.last_used = time.monotonic()
+        if lease:
+            entry.leases += 1
+        return entry
+
+    @staticmethod
+    def _check_password(
+        stud_id: str, client: _ClientT, password: Optional[str]
+    ) -> None:
+        """Check that the password given for a student is the one its pooled
+        client logged in with, so that a logged in session is never handed out
+        for a wrong password.
+
+        Raises:
+            ValueError: if the password does not match, `remove` the client of
+                the student first to login with a new password
+        """
+        if password and not hmac.compare_digest(
+            password.encode(), (client.password or "").encode()
+        ):
+            raise ValueError(f"Password does not match the pooled client of {stud_id}")
+
+    def _release(self, entry: _PoolEntry[_ClientT]) -> bool:
+        """End a lease of `_checkout`.
+
+        Returns:
+            bool: Whether the caller should close the client, evicted while it
+            was in use
+        """
+        with self._lock:
+            entry.leases -= 1
+            return entry.evicted and entry.leases == 0
+
+    @staticmethod
+    def _detach(entries: List[_PoolEntry[_ClientT]]) -> List[_ClientT]:
+        """Mark popped entries as evicted, the lock must be held.
+
+        Returns:
+            List[_ClientT]: The clients to close now, the leased ones are closed
+            when their last lease ends
+        """
+        clients = []
+        for entry in entries:
+            entry.evicted = True
+            if entry.leases == 0:
+                clients.append(entry.client)
+        return clients
+
+    def _pop_idle(self, now: float) -> List[_PoolEntry[_ClientT]]:
+        """Pop the entries idle for longer than `idle_ttl`, the lock must be held."""
+        evicted: List[_PoolEntry[_ClientT]] = []
+        if self.idle_ttl is None:
+            return evicted
+
+        while self._entries:
+            stud_id, entry = next(iter(self._entries.items()))
+            if now - entry.last_used <= self.idle_ttl:
+                break
+            del self._entries[stud_id]
+            evicted.append(entry)
+        return evicted
+
+    def _pop(self, stud_id: str) -> List[_ClientT]:
+        with self._lock:
+            entry = self._entries.pop(stud_id, None)
+            return self._detach([entry] if entry else [])
+
+    def _pop_all(self) -> List[_ClientT]:
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            return self._detach(entries)
+
+    def _pop_expired(self) -> List[_ClientT]:
+        with self._lock:
+            return self._detach(self._pop_idle(time.monotonic()))
+
+
+def _default_factory(stud_id: str, password: Optional[str]) -> ECJTU:
+    return ECJTU(stud_id, password, shared_transport=True)
+
+
+def _default_async_factory(stud_id: str, password: Optional[str]) -> AsyncECJTU:
+    return AsyncECJTU(stud_id, password, shared_transport=True)
+
+
+class ClientPool(_BaseClientPool[ECJTU]):
+    """A bounded pool of `ECJTU` clients keyed by student ID.
+
+    Args:
+        factory(Callable[[str, Optional[str]], ECJTU]): Creates the client of a
+            student from the student ID and password, defaults to an `ECJTU` on
+            the shared transport
+        max_size(int): Max clients kept in the pool
+        idle_ttl(Optional[float]): Seconds a client may stay unused before it is
+            evicted, None keeps clients until the pool is full
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str, Optional[str]], ECJTU] = _default_factory,
+        max_size: int = 1024,
+        idle_ttl: Optional[float] = 1800.0,
+    ) -> None:
+        super().__init__(factory, max_size, idle_ttl)
+
+    def get(self, stud_id: str, password: Optional[str] = None) -> ECJTU:
+        """Get the logged in client of a student, creating it if needed.
+
+        The client is closed as soon as it is evicted, use `lease` to keep it
+        open while a request runs.
+
+        Args:
+            stud_id(str): Student ID
+            password(Optional[str]): Password, needed unless the factory can
+                create a logged in client by itself, checked against the
+                password of the pooled client
+
+        Returns:
+            ECJTU: The client
+
+        Raises:
+            ValueError: if password is not the one the pooled client uses
+        """
+        entry, to_close = self._checkout(stud_id, password)
+        self._close(to_close)
+
+        client = entry.client
+        self._check_password(stud_id, client, password)
+        if client.password:
+            client._ensure_login()
+        return client
+
+    @contextmanager
+    def lease(self, stud_id: str, password: Optional[str] = None) -> Iterator[ECJTU]:
+        """Use the logged in client of a student in the block, creating it if
+        needed. If the client is evicted meanwhile, it is closed once every
+        block using it is done.
+
+        Args:
+            stud_id(str): Student ID
+            password(Optional[str]): Password, needed unless the factory can
+                create a logged in client by itself, checked against the
+                password of the pooled client
+
+        Yields:
+            ECJTU: The client
+
+        Raises:
+            ValueError: if password is not the one the pooled client uses
+        """
+        entry, to_close = self._checkout(stud_id, password, lease=True)
+        self._close(to_close)
+        try:
+            self._check_password(stud_id, entry.client, password)
+            if entry.client.password:
+                entry.client._ensure_login()
+            yield entry.client
+        finally:
+            if self._release(entry):
+                self._close([entry.client])
+
+    def remove(self, stud_id: str) -> None:
+        """Evict the client of a student and close it, once it is not leased
+        anymore.
+
+        Args:
+            stud_id(str): Student ID
+        """
+        self._close(self._pop(stud_id))
+
+    def prune(self) -> None:
+        """Evict and close the clients idle for longer than `idle_ttl`."""
+        self._close(self._pop_expired())
+
+    def close(self) -> None:
+        """Close every client of the pool."""
+        self._close(self._pop_all())
+
+    def _close(self, clients: List[ECJTU]) -> None:
+        for client in clients:
+            logger.debug(f"Close pooled client of {client.stud_id}")
+            client.close()
+
+    def __enter__(self) -> "ClientPool":
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None) -> None:
+        self.close()
+
+
+class AsyncClientPool(_BaseClientPool[AsyncECJTU]):
+    """A bounded pool of `AsyncECJTU` clients keyed by student ID.
+
+    Args:
+        factory(Callable[[str, Optional[str]], AsyncECJTU]): Creates the client of
+            a student from the student ID and password, defaults to an
+            `AsyncECJTU` on the shared transport
+        max_size(int): Max clients kept in the pool
+        idle_ttl(Optional[float]): Seconds a client may stay unused before it is
+            evicted, None keeps clients until the pool is full
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str, Optional[str]], AsyncECJTU] = _default_async_factory,
+        max_size: int = 1024,
+        idle_ttl: Optional[float] = 1800.0,
+    ) -> None:
+        super().__init__(factory, max_size, idle_ttl)
+
+    async def get(self, stud_id: str, password: Optional[str] = None) -> AsyncECJTU:
+        """Get the logged in client of a student, creating it if needed.
+
+        The client is closed as soon as it is evicted, use `lease` to keep it
+        open while a request runs.
+
+        Args:
+            stud_id(str): Student ID
+            password(Optional[str]): Password, needed unless the factory can
+                create a logged in client by itself, checked against the
+                password of the pooled client
+
+        Returns:
+            AsyncECJTU: The client
+
+        Raises:
+            ValueError: if password is not the one the pooled client uses
+        """
+        entry, to_close = self._checkout(stud_id, password)
+        await self._aclose(to_close)
+
+        client = entry.client
+        self._check_password(stud_id, client, password)
+        if client.password:
+            await client._ensure_login()
+        return client
+
+    @asynccontextmanager
+    async def lease(
+        self, stud_id: str, password: Optional[str] = None
+    ) -> AsyncIterator[AsyncECJTU]:
+        """Use the logged in client of a student in the block, creating it if
+        needed. If the client is evicted meanwhile, it is closed once every
+        block using it is done.
+
+        Args:
+            stud_id(str): Student ID
+            password(Optional[str]): Password, needed unless the factory can
+                create a logged in client by itself, checked against the
+                password of the pooled client
+
+        Yields:
+            AsyncECJTU: The client
+
+        Raises:
+            ValueError: if password is not the one the pooled client uses
+        """
+        entry, to_close = self._checkout(stud_id, password, lease=True)
+        await self._aclose(to_close)
+        try:
+            self._check_password(stud_id, entry.client, password)
+            if entry.client.password:
+                await entry.client._ensure_login()
+            yield entry.client
+        finally:
+            if self._release(entry):
+                await self._aclose([entry.client])
+
+    async def remove(self, stud_id: str) -> None:
+        """Evict the client of a student and close it, once it is not leased
+        anymore.
+
+        Args:
+            stud_id(str): Student ID
+        """
+        await self._aclose(self._pop(stud_id))
+
+    async def prune(self) -> None:
+        """Evict and close the clients idle for longer than `idle_ttl`."""
+        await self._aclose(self._pop_expired())
+
+    async def aclose(self) -> None:
+        """Close every client of the pool."""
+        await self._aclose(self._pop_all())
+
+    async def _aclose(self, clients: List[AsyncECJTU]) -> None:
+        for client in clients:
+            logger.debug(f"Close pooled client of {client.stud_id}")
+            await client.aclose()
+
+    async def __aenter__(self) -> "AsyncClientPool":
+        return self
+
+    async def __aexit__(self, exc_type=None, exc_value=None, traceback=None) -> None:
+        await self.aclose()
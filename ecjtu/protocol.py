@@ -0,0 +1,293 @@
+"""Sans-IO core of the ECJTU clients: the requests of every resource and the
+parsers of their responses.
+
+Nothing in this module sends a request or awaits anything, the parsers take the
+body of a response as bytes and return models. The sync and async CRUD clients
+only do the I/O around them, and the parsers can run in any executor or process.
+"""
+
+import datetime
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type, TypeVar, Union
+
+from bs4 import BeautifulSoup, SoupStrainer
+from pydantic import BaseModel, TypeAdapter
+
+from ecjtu.constants import (
+    GET_CLASSES_URL,
+    GET_ELERTIVE_COURSE_URL_TEMPLATE,
+    GET_GPA_URL,
+)
+from ecjtu.models import GPA, ElectiveCourse, ScheduledCourse, Score, ScoreSheet
+from ecjtu.parser import make_soup
+from ecjtu.stats import timed_phase
+from ecjtu.utils import format_date, get_week_dates
+
+# the GPA is in a `<tr>` of the score page and every score is an `<ul>`
+SCORE_PAGE_STRAINER = SoupStrainer(["tr", "ul"])
+ELECTIVE_PAGE_STRAINER = SoupStrainer("tbody")
+# the login form only needs the hidden `lt` token
+LOGIN_FORM_STRAINER = SoupStrainer("input", attrs={"name": "lt"})
+# class of the `<ul>` rows of the score page, eg: "2023_1" for semester 2023.1
+_SEMESTER_CLASS_PATTERN = re.compile(r"\b(\d{4})_(\d)\b")
+
+_ModelT = TypeVar("_ModelT", bound=BaseModel)
+
+
+class RequestSpec:
+    """A request to send to the ECJTU systems.
+
+    Args:
+        method(str): HTTP method, GET or POST
+        url(str): URL of the request
+        data(Optional[Dict[str, Any]]): Form data of a POST request
+    """
+
+    __slots__ = ("method", "url", "data")
+
+    def __init__(
+        self, method: str, url: str, data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.method = method
+        self.url = url
+        self.data = data
+
+    def __repr__(self) -> str:
+        return f"RequestSpec({self.method!r}, {self.url!r}, data={self.data!r})"
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[_ModelT]) -> TypeAdapter:
+    # building an adapter compiles a validator, so build one per model only
+    return TypeAdapter(List[model])
+
+
+def _validate_many(model: Type[_ModelT], rows: List[Dict[str, Any]]) -> List[_ModelT]:
+    """Validate rows into models with a single call of the validator of the list,
+    about twice as fast as validating them one by one.
+
+    Args:
+        model(Type[_ModelT]): The model of the rows
+        rows(List[Dict[str, Any]]): Fields of every model, by name or alias
+
+    Returns:
+        List[_ModelT]: The models, in the order of rows
+    """
+    adapter = _list_adapter(model)
+    with timed_phase("validate"):
+        return adapter.validate_python(rows)
+
+
+def build_scheduled_courses_request(date: str) -> RequestSpec:
+    """Request of the courses of a date, eg: 2023-01-01"""
+    return RequestSpec("POST", GET_CLASSES_URL, data={"date": date})
+
+
+def build_score_page_request() -> RequestSpec:
+    """Request of the score page, which carries the GPA and every score"""
+    return RequestSpec("GET", GET_GPA_URL)
+
+
+def build_elective_courses_request(semester: str) -> RequestSpec:
+    """Request of the elective courses of a semester, eg: 2023.1"""
+    return RequestSpec("GET", GET_ELERTIVE_COURSE_URL_TEMPLATE + "?term=" + semester)
+
+
+def parse_scheduled_courses(content: bytes) -> List[ScheduledCourse]:
+    """Parse the courses of a date.
+
+    Args:
+        content(bytes): Body of the response to `build_scheduled_courses_request`
+
+    Returns:
+        List[ScheduledCourse]: List of courses
+    """
+    _ = json.loads(content).get("weekcalendarpojoList", [])
+    return _validate_many(ScheduledCourse, _)
+
+
+def parse_week_calendar(
+    content: bytes, date: Union[str, datetime.date], covers_week: bool = False
+) -> Dict[str, List[ScheduledCourse]]:
+    """Parse the courses of a date, and of the other days of its ISO week when
+    the response covers the whole week.
+
+    A response covers the week if it has courses on another weekday than the one
+    of date. A response with courses on date only can not be told apart from a
+    response of a single day, unless covers_week says the endpoint answers with
+    whole weeks.
+
+    Args:
+        content(bytes): Body of the response to `build_scheduled_courses_request`
+        date(Union[str, datetime.date]): The requested date, eg: 2023-01-01
+        covers_week(bool): The endpoint is known to answer with whole weeks
+
+    Returns:
+        Dict[str, List[ScheduledCourse]]: Courses keyed by date, every day of the
+        week if the response covers it, only date otherwise
+
+    Raises:
+        ValueError: if a course is not on a weekday from 1 (Monday) to 7 (Sunday)
+    """
+    date = format_date(date)
+    courses = parse_scheduled_courses(content)
+    for course in courses:
+        if not 1 <= course.week_day <= 7:
+            raise ValueError(
+                f"Invalid weekDay {course.week_day} of {course.course} in the "
+                f"courses of {date}, expected 1 (Monday) to 7 (Sunday)"
+            )
+    week_dates = get_week_dates(date)
+    weekday = week_dates.index(date) + 1
+
+    if not covers_week and all(course.week_day == weekday for course in courses):
+        return {date: courses}
+
+    week: Dict[str, List[ScheduledCourse]] = {day: [] for day in week_dates}
+    for course in courses:
+        week[week_dates[course.week_day - 1]].append(course)
+    return week
+
+
+def _parse_gpa(soup: BeautifulSoup) -> Optional[GPA]:
+    tr_tags = soup.find_all("tr")
+    if len(tr_tags) <= 3:
+        return None
+
+    data = [td.text for td in tr_tags[3].find_all("td")]
+    return GPA.model_validate(
+        {"student_name": data[1], "gpa": data[6], "status": data[2]}
+    )
+
+
+def _iter_score_rows(soup: BeautifulSoup) -> Iterator[Dict[str, Any]]:
+    for ul_tag in soup.find_all("ul", class_=_SEMESTER_CLASS_PATTERN):
+        match = _SEMESTER_CLASS_PATTERN.search(" ".join(ul_tag["class"]))
+        li_values = [li.text for li in ul_tag.find_all("li")]
+
+        yield {
+            "semester": f"{match.group(1)}.{match.group(2)}",
+            "course_name": li_values[1],
+            "course_nature": li_values[2],
+            "credit": float(li_values[4]),
+            "grade": li_values[5],
+        }
+
+
+def parse_score_page(
+    content: bytes, encoding: Optional[str] = None
+) -> Tuple[Optional[GPA], Iterator[Score]]:
+    """Parse the score page, the scores are validated row by row as they are
+    iterated.
+
+    The whole page is parsed into a tree before this returns, only the rows are
+    extracted and validated lazily.
+
+    Args:
+        content(bytes): Body of the response to `build_score_page_request`
+        encoding(Optional[str]): Encoding of content, detected if missing
+
+    Returns:
+        Tuple[Optional[GPA], Iterator[Score]]: The GPA, None if the page has
+        none, and the scores in the order of the page
+    """
+    soup = make_soup(content, SCORE_PAGE_STRAINER, encoding)
+    scores = (Score.model_validate(row) for row in _iter_score_rows(soup))
+    return _parse_gpa(soup), scores
+
+
+def parse_score_sheet(content: bytes, encoding: Optional[str] = None) -> ScoreSheet:
+    """Parse the GPA and the scores of every semester from the score page, the
+    scores are validated at once.
+
+    Args:
+        content(bytes): Body of the response to `build_score_page_request`
+        encoding(Optional[str]): Encoding of content, detected if missing
+
+    Returns:
+        ScoreSheet: The score sheet
+    """
+    soup = make_soup(content, SCORE_PAGE_STRAINER, encoding)
+
+    sheet = ScoreSheet(gpa=_parse_gpa(soup))
+    for score in _validate_many(Score, list(_iter_score_rows(soup))):
+        sheet.add(score)
+    return sheet
+
+
+def _iter_elective_rows(
+    content: bytes, encoding: Optional[str]
+) -> Iterator[Dict[str, Any]]:
+    soup = make_soup(content, ELECTIVE_PAGE_STRAINER, encoding)
+
+    tbody_tag = soup.find("tbody")
+    for tr_tag in tbody_tag.find_all("tr"):
+        td = [td.text for td in tr_tag.find_all("td")]
+        yield {
+            "semester": td[0],
+            "class_name": td[11],
+            "class_type": td[4],
+            "class_assessment_method": td[5],
+            "class_info": td[8],
+            "class_number": td[12],
+            "credit": float(td[7]),
+            "teacher": td[9],
+        }
+
+
+def iter_elective_courses(
+    content: bytes, encoding: Optional[str] = None
+) -> Iterator[ElectiveCourse]:
+    """Parse the elective course page, yielding the courses row by row.
+
+    The whole page is parsed into a tree on the first row, the rows are then
+    extracted and validated one at a time.
+
+    Args:
+        content(bytes): Body of the response to `build_elective_courses_request`
+        encoding(Optional[str]): Encoding of content, detected if missing
+
+    Yields:
+        ElectiveCourse: The elective courses, in the order of the table
+    """
+    for row in _iter_elective_rows(content, encoding):
+        yield ElectiveCourse.model_validate(row)
+
+
+def parse_elective_courses(
+    content: bytes, encoding: Optional[str] = None
+) -> List[ElectiveCourse]:
+    """Parse the elective course page, the courses are validated at once, see
+    `iter_elective_courses`."""
+    rows = list(_iter_elective_rows(content, encoding))
+    return _validate_many(ElectiveCourse, rows)
+
+
+def parse_enc_password(content: bytes) -> str:
+    """Get the encrypted password from the response of the password encryption
+    API.
+
+    Args:
+        content(bytes): Body of the response of `PWD_ENC_URL`
+
+    Returns:
+        str: Encrypted password
+    """
+    _ = content.decode("utf8").replace("'", '"')
+    return json.loads(_)["passwordEnc"]
+
+
+def parse_login_ticket(content: bytes, encoding: Optional[str] = None) -> str:
+    """Get the `lt` token of the CAS login form.
+
+    Args:
+        content(bytes): Body of the response of `ECJTU_LOGIN_URL`
+        encoding(Optional[str]): Encoding of content, detected if missing
+
+    Returns:
+        str: The token
+    """
+    soup = make_soup(content, LOGIN_FORM_STRAINER, encoding)
+    return soup.find("input", {"name": "lt"})["value"]
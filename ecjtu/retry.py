@@ -0,0 +1,176 @@
+"""Retry policy shared by the sync and async ECJTU clients."""
+
+import random
+from typing import Iterable, Optional, Tuple, Type
+
+import httpx
+
+from ecjtu.constants import CAS_ECJTU_DOMAIN
+
+# Errors raised before or while the request is on the wire, the campus network
+# drops connections often enough that these are worth another try.
+RETRYABLE_EXCEPTIONS: Tuple[Type[Exception], ...] = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+    httpx.ReadError,
+    httpx.ReadTimeout,
+    httpx.WriteError,
+    httpx.WriteTimeout,
+    httpx.RemoteProtocolError,
+)
+RETRYABLE_STATUS_CODES: Tuple[int, ...] = (500, 502, 503, 504)
+
+_CAS_LOGIN_PATH = f"{CAS_ECJTU_DOMAIN}/cas/login"
+# the hidden `lt` token only appears in the CAS login form
+_LOGIN_FORM_MARKER = b'name="lt"'
+# words the JWXT JSON endpoints use when they refuse an unauthenticated request
+_AUTH_MARKERS = (b"login", "登录".encode())
+
+
+def is_login_redirect(response: httpx.Response) -> bool:
+    """Whether the response sends the client back to the CAS login page.
+
+    Args:
+        response(httpx.Response): The response to check
+
+    Returns:
+        bool: True if the response is, or redirects to, the CAS login page
+    """
+    if response.is_redirect:
+        return _CAS_LOGIN_PATH in response.headers.get("location", "")
+    return _CAS_LOGIN_PATH in str(response.url)
+
+
+def is_session_expired(response: httpx.Response) -> bool:
+    """Whether the response shows that the session of the client has expired.
+
+    The ECJTU systems do not answer an expired session with 401, they redirect to
+    the CAS login page, serve the login form in place of the requested page, or,
+    for the schedule endpoint, return an empty `weekcalendarpojoList` along with
+    a login hint.
+
+    Args:
+        response(httpx.Response): The response to check
+
+    Returns:
+        bool: True if the client should login again
+    """
+    if is_login_redirect(response):
+        return True
+
+    content = response.content
+    if _LOGIN_FORM_MARKER in content:
+        return True
+
+    if b"weekcalendarpojoList" in content:
+        lowered = content.lower()
+        if any(marker in lowered for marker in _AUTH_MARKERS):
+            try:
+                return not response.json().get("weekcalendarpojoList")
+            except ValueError:
+                return False
+    return False
+
+
+class RetryPolicy:
+    """Decide whether and when a failed request should be sent again.
+
+    The delay before the n-th retry is `backoff_factor * 2 ** n`, capped by
+    `max_backoff` and randomly shortened by up to `jitter` of itself, so that
+    clients hit by the same outage do not retry in lockstep. A request is not
+    retried past `max_retries` retries or once `max_elapsed` seconds have been
+    spent on it.
+
+    Args:
+        max_retries(int): Max retries of a request, 0 disables retrying
+        backoff_factor(float): Delay in seconds before the first retry
+        max_backoff(float): Max delay in seconds between two attempts
+        jitter(float): Fraction of the delay that is randomised, from 0 to 1
+        max_elapsed(Optional[float]): Max seconds spent on a request including
+            retries, None means no limit
+        retry_exceptions(Iterable[Type[Exception]]): Transport errors to retry
+        retry_status_codes(Iterable[int]): Response status codes to retry
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 8.0,
+        jitter: float = 0.5,
+        max_elapsed: Optional[float] = 30.0,
+        retry_exceptions: Iterable[Type[Exception]] = RETRYABLE_EXCEPTIONS,
+        retry_status_codes: Iterable[int] = RETRYABLE_STATUS_CODES,
+    ) -> None:
+        if not 0 <= jitter <= 1:
+            raise ValueError(f"jitter should be between 0 and 1, got {jitter}")
+
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.max_elapsed = max_elapsed
+        self.retry_exceptions = tuple(retry_exceptions)
+        self.retry_status_codes = frozenset(retry_status_codes)
+
+    def is_retryable_exception(self, exc: Exception) -> bool:
+        return isinstance(exc, self.retry_exceptions)
+
+    def is_retryable_response(self, response: httpx.Response) -> bool:
+        return response.status_code in self.retry_status_codes
+
+    def get_backoff(self, attempt: int) -> float:
+        """Get the delay in seconds before retrying the given attempt.
+
+        Args:
+            attempt(int): Number of retries done so far, starting from 0
+
+        Returns:
+            float: Delay in seconds
+        """
+        delay = min(self.max_backoff, self.backoff_factor * 2**attempt)
+        return delay * (1 - self.jitter * random.random())
+
+    def next_delay(
+        self,
+        attempt: int,
+        elapsed: float,
+        *,
+        exc: Optional[Exception] = None,
+        response: Optional[httpx.Response] = None,
+    ) -> Optional[float]:
+        """Classify the outcome of an attempt and get the delay before the next one.
+
+        Args:
+            attempt(int): Number of retries done so far, starting from 0
+            elapsed(float): Seconds spent on the request so far
+            exc(Optional[Exception]): The error raised by the attempt, if any
+            response(Optional[httpx.Response]): The response of the attempt, if any
+
+        Returns:
+            Optional[float]: Delay in seconds before retrying, None if the outcome
+            is final, either because it is not retryable or the retry budget is
+            spent
+        """
+        if exc is not None:
+            retryable = self.is_retryable_exception(exc)
+        else:
+            retryable = response is not None and self.is_retryable_response(response)
+
+        if not retryable or attempt >= self.max_retries:
+            return None
+
+        delay = self.get_backoff(attempt)
+        if response is not None:
+            delay = max(delay, self._get_retry_after(response))
+
+        if self.max_elapsed is not None and elapsed + delay > self.max_elapsed:
+            return None
+        return delay
+
+    def _get_retry_after(self, response: httpx.Response) -> float:
+        try:
+            return min(self.max_backoff, float(response.headers["retry-after"]))
+        except (KeyError, ValueError):
+            return 0.0
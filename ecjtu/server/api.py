@@ -1,16 +1,75 @@
 import datetime
 import re
+from typing import Any, Callable
 
+import anyio.to_thread
 from fastapi import FastAPI, Header
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from starlette.responses import JSONResponse
 
+from ecjtu.breaker import track_staleness
 from ecjtu.client import ECJTU
+from ecjtu.exceptions import CircuitOpenError, SessionExpiredError
+from ecjtu.metrics import Gauge, render
+from ecjtu.pool import ClientPool
 from ecjtu.server import auth, middle, respose_result, schema
 
 app = FastAPI(title="ECJTU API", description="API for ECJTU")
 
+# clients of the students served recently, created from the cookies saved by
+# the login api, so that their connections and sessions are reused
+client_pool = ClientPool(
+    factory=lambda stud_id, _: ECJTU(
+        stud_id,
+        cookie=auth.get_cookie(stud_id),
+        shared_transport=True,
+        # fail fast while jwxt is down, answering with the last good data
+        circuit_breaker=True,
+        serve_stale=True,
+        collect_metrics=True,
+    )
+)
+
 app.add_middleware(middle.MyMiddleware)
+app.add_middleware(middle.MetricsMiddleware)
+
+# read when /metrics is scraped, nothing is recorded in the request path
+Gauge(
+    "ecjtu_active_sessions",
+    "Students whose access_token has not expired in the auth store",
+    func=auth.count_active_sessions,
+)
+Gauge(
+    "ecjtu_client_pool_size",
+    "Clients of students kept in the client pool",
+    func=lambda: len(client_pool),
+)
+
+
+def _threadpool_tokens(attribute: str) -> Callable[[], float]:
+    """read an attribute of the limiter of the threads running the sync routes,
+    0 when the metrics are rendered outside of the event loop of the server"""
+
+    def read() -> float:
+        try:
+            limiter = anyio.to_thread.current_default_thread_limiter()
+        except RuntimeError:
+            return 0
+        return getattr(limiter, attribute)
+
+    return read
+
+
+Gauge(
+    "ecjtu_threadpool_busy_threads",
+    "Threads of the pool running the sync routes that are in use",
+    func=_threadpool_tokens("borrowed_tokens"),
+)
+Gauge(
+    "ecjtu_threadpool_max_threads",
+    "Size of the pool running the sync routes",
+    func=_threadpool_tokens("total_tokens"),
+)
 
 
 @app.get("/", include_in_schema=False)
@@ -40,6 +99,9 @@ def login(user: schema.UserLoginSchema) -> JSONResponse:
     except Exception as e:
         return respose_result.ResponseResult.error(str(e))
 
+    # drop the client made from the cookies of the previous login
+    client_pool.remove(user.stud_id)
+
     return respose_result.ResponseResult.success(
         {"access_token": access_token, "refresh_token": refresh_token}
     )
@@ -65,22 +127,47 @@ def refresh_token(data: str = None):
         access_token = auth.refresh_access_token(data)
     except Exception as e:
         return respose_result.ResponseResult.error(str(e))
+
+    # drop the client made from the cookies of the previous login
+    client_pool.remove(auth.get_stud_id(access_token))
+
     return respose_result.ResponseResult.success({"access_token": access_token})
 
 
-def create_client(token: str) -> ECJTU:
-    """create client
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Metrics in the Prometheus text format. Async, so that a scrape does not
+    wait for a thread of the saturated pool it reports on."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
+def query_upstream(token: str, query: Callable[[ECJTU], Any]) -> JSONResponse:
+    """run a query with the pooled client of the student of a token
 
     Args:
         token (str): access token
+        query (Callable[[ECJTU], Any]): gets the data of the response from the
+            client
 
     Returns:
-        ECJTU: client
+        JSONResponse: the data, or the error of the query
     """
     stud_id = auth.get_stud_id(token)
-    cookie = auth.get_cookie(stud_id)
-    client = ECJTU(cookie=cookie)
-    return client
+    try:
+        with client_pool.lease(stud_id) as client, track_staleness() as staleness:
+            data = query(client)
+    except SessionExpiredError as e:
+        # the pooled client only has the cookies of the last login, drop it so
+        # that the next request uses the cookies saved by a new login
+        client_pool.remove(stud_id)
+        return respose_result.ResponseResult.auth_error(
+            str(e), msg="session expired, please login again"
+        )
+    except CircuitOpenError as e:
+        return respose_result.ResponseResult.unavailable(str(e))
+    except Exception as e:
+        return respose_result.ResponseResult.error(str(e))
+    return respose_result.ResponseResult.success(data, stale_age=staleness.age)
 
 
 @app.get("/gpa", tags=["GPA"], summary="获取GPA", description="获取当学期GPA")
@@ -94,12 +181,7 @@ def gpa(token: str = Header(None)):
         JSONResponse: gpa
 
     """
-    client = create_client(token)
-    try:
-        gpa = client.gpa.today()
-    except Exception as e:
-        return respose_result.ResponseResult.error(str(e))
-    return respose_result.ResponseResult.success(dict(gpa))
+    return query_upstream(token, lambda client: dict(client.gpa.today()))
 
 
 @app.get("/schedule", tags=["课表"], summary="获取当天课表", description="获取当天课表")
@@ -113,15 +195,9 @@ def schedule(token: str = Header(None)):
         JSONResponse: schedule of today
 
     """
-    client = create_client(token)
-    try:
-        schedule = client.scheduled_courses.today()
-    except Exception as e:
-        return respose_result.ResponseResult.error(str(e))
-    schedule_list = []
-    for sublist in schedule:
-        schedule_list.append(dict(sublist))
-    return respose_result.ResponseResult.success(schedule_list)
+    return query_upstream(
+        token, lambda client: [dict(item) for item in client.scheduled_courses.today()]
+    )
 
 
 @app.get(
@@ -145,15 +221,12 @@ def schedule_date(token: str = Header(None), date: str = None):
         valid_date = datetime.datetime.strptime(date, "%Y-%m-%d").date()
     except ValueError:
         return respose_result.ResponseResult.param_error("日期格式错误")
-    client = create_client(token)
-    try:
-        scheduled_courses = client.scheduled_courses.filter(date=valid_date)
-    except Exception as e:
-        return respose_result.ResponseResult.error(str(e))
-    schedule_list = []
-    for sublist in scheduled_courses:
-        schedule_list.append(dict(sublist))
-    return respose_result.ResponseResult.success(schedule_list)
+    return query_upstream(
+        token,
+        lambda client: [
+            dict(item) for item in client.scheduled_courses.filter(date=valid_date)
+        ],
+    )
 
 
 @app.get(
@@ -169,18 +242,13 @@ def schedule_week(token: str = Header(None)):
         JSONResponse: schedule of this week
 
     """
-    client = create_client(token)
-    try:
-        schedule = client.scheduled_courses.this_week()
-    except Exception as e:
-        return respose_result.ResponseResult.error(str(e))
-    dict_list = []
-    for sublist in schedule:
-        dict_sublist = []
-        for item in sublist:
-            dict_sublist.append(dict(item))
-        dict_list.append(dict_sublist)
-    return respose_result.ResponseResult.success(dict_list)
+    return query_upstream(
+        token,
+        lambda client: [
+            [dict(course) for course in day]
+            for day in client.scheduled_courses.this_week()
+        ],
+    )
 
 
 @app.get("/score", tags=["成绩"], summary="获取当前成绩", description="获取当学期成绩")
@@ -194,15 +262,9 @@ def score(token: str = Header(None)):
         JSONResponse: score of this semester
 
     """
-    client = create_client(token)
-    try:
-        score = client.scores.today()
-    except Exception as e:
-        return respose_result.ResponseResult.error(str(e))
-    score_list = []
-    for sublist in score:
-        score_list.append(dict(sublist))
-    return respose_result.ResponseResult.success(score_list)
+    return query_upstream(
+        token, lambda client: [dict(item) for item in client.scores.today()]
+    )
 
 
 @app.get(
@@ -224,15 +286,10 @@ def score_semester(token: str = Header(None), semester: str = None):
     """
     if not re.match(r"\d{4}\.[12]", semester):
         return respose_result.ResponseResult.param_error("学期格式错误")
-    client = create_client(token)
-    try:
-        scores = client.scores.filter(semester=semester)
-    except Exception as e:
-        return respose_result.ResponseResult.error(str(e))
-    score_list = []
-    for sublist in scores:
-        score_list.append(dict(sublist))
-    return respose_result.ResponseResult.success(score_list)
+    return query_upstream(
+        token,
+        lambda client: [dict(item) for item in client.scores.filter(semester=semester)],
+    )
 
 
 @app.get(
@@ -251,15 +308,9 @@ def elective_courses(token: str = Header(None)):
         JSONResponse: elective courses
 
     """
-    client = create_client(token)
-    try:
-        elective_courses = client.elective_courses.today()
-    except Exception as e:
-        return respose_result.ResponseResult.error(str(e))
-    elective_courses_list = []
-    for sublist in elective_courses:
-        elective_courses_list.append(dict(sublist))
-    return respose_result.ResponseResult.success(elective_courses_list)
+    return query_upstream(
+        token, lambda client: [dict(item) for item in client.elective_courses.today()]
+    )
 
 
 @app.get(
@@ -280,15 +331,12 @@ def elective_courses_semester(token: str = Header(None), semester: str = None):
     """
     if not re.match(r"\d{4}\.[12]", semester):
         return respose_result.ResponseResult.param_error("学期格式错误")
-    client = create_client(token)
-    try:
-        elective_courses = client.elective_courses.filter(semester=semester)
-    except Exception as e:
-        return respose_result.ResponseResult.error(str(e))
-    elective_courses_list = []
-    for sublist in elective_courses:
-        elective_courses_list.append(dict(sublist))
-    return respose_result.ResponseResult.success(elective_courses_list)
+    return query_upstream(
+        token,
+        lambda client: [
+            dict(item) for item in client.elective_courses.filter(semester=semester)
+        ],
+    )
 
 
 def start_api_server(port: int = 8080) -> None:
@@ -302,4 +350,7 @@ def start_api_server(port: int = 8080) -> None:
     """
     import uvicorn
 
-    uvicorn.run(app, host="127.0.0.1", port=port)
+    try:
+        uvicorn.run(app, host="127.0.0.1", port=port)
+    finally:
+        client_pool.close()
@@ -55,7 +55,7 @@ def create_tokens(stud_id: str, pwd: str) -> tuple[str, str]:
 
     access_token = encode_data(access_data)
     refresh_token = encode_data(refresh_data)
-    client = ECJTU(stud_id, pwd)
+    client = ECJTU(stud_id, pwd, shared_transport=True, collect_metrics=True)
     try:
         client.login()
     except Exception as e:
@@ -151,3 +151,23 @@ def get_cookie(stud_id: str) -> httpx.Cookies:
     stud = stud_file.query("FileAuth").filter(stud_id=stud_id).first()
     cookies = list_tocookie(stud.cookie)
     return cookies
+
+
+def count_active_sessions() -> int:
+    """count the students whose access_token has not expired
+
+    Returns:
+        int: number of active sessions
+    """
+    stud_file = CushyOrmCache(get_path())
+    current_time = datetime.datetime.now(datetime.timezone.utc)
+    count = 0
+    for stud in stud_file.query("FileAuth").all():
+        try:
+            token_time = decode_data(stud.token).split(":", 2)[2]
+            expire_time = datetime.datetime.fromisoformat(token_time)
+        except Exception:
+            continue
+        if expire_time.replace(tzinfo=datetime.timezone.utc) > current_time:
+            count += 1
+    return count
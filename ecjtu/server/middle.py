@@ -1,7 +1,26 @@
+import time
+
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from ecjtu.metrics import Counter, Gauge, Histogram
 from ecjtu.server import auth, respose_result
 
+HTTP_REQUESTS = Counter(
+    "ecjtu_http_requests_total",
+    "Requests served by the API, by route, method and status code",
+    ("route", "method", "status"),
+)
+HTTP_LATENCY = Histogram(
+    "ecjtu_http_request_duration_seconds",
+    "Latency of the requests served by the API, by route",
+    ("route",),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "ecjtu_http_requests_in_flight", "Requests being served by the API"
+)
+
 
 class MyMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request, call_next):
@@ -14,6 +33,7 @@ class MyMiddleware(BaseHTTPMiddleware):
             "/docs/",
             "/openapi.json",
             "/favicon.ico",
+            "/metrics",
         ]
 
         response = respose_result.ResponseResult.auth_error()
@@ -37,3 +57,52 @@ class MyMiddleware(BaseHTTPMiddleware):
         response = await call_next(request)
 
         return response
+
+
+class MetricsMiddleware:
+    """Record the count and the latency of the requests by route.
+
+    A plain ASGI middleware, so that the request is not wrapped again on its
+    way to the app.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = _route_path(scope)
+            HTTP_LATENCY.observe(time.perf_counter() - start, route)
+            HTTP_REQUESTS.inc(route, scope["method"], status)
+            HTTP_IN_FLIGHT.dec()
+
+
+def _route_path(scope: Scope) -> str:
+    """Path template of the route of a request, so that path parameters do not
+    make a label value each."""
+    route = scope.get("route")
+    if route is None:
+        # rejected before routing, eg: by the auth middleware
+        for candidate in scope["app"].routes:
+            if candidate.matches(scope)[0] == Match.FULL:
+                route = candidate
+                break
+        else:
+            return "unmatched"
+    return route.path
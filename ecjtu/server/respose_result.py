@@ -1,12 +1,18 @@
-from typing import Any
+from typing import Any, Optional
 
 from fastapi.responses import JSONResponse
 
 
 class ResponseResult:
     @staticmethod
-    def success(data: Any = None, msg: str = "success") -> JSONResponse:
-        return JSONResponse(content={"code": 200, "msg": msg, "data": data})
+    def success(
+        data: Any = None, msg: str = "success", stale_age: Optional[float] = None
+    ) -> JSONResponse:
+        content = {"code": 200, "msg": msg, "data": data}
+        if stale_age is not None:
+            # the upstream is down, data is the last good result, this old
+            content["stale_age"] = round(stale_age, 1)
+        return JSONResponse(content=content)
 
     @staticmethod
     def success_no_data(msg: str = "success") -> JSONResponse:
@@ -35,3 +41,11 @@ class ResponseResult:
         return JSONResponse(
             status_code=500, content={"code": 500, "msg": msg, "data": data}
         )
+
+    @staticmethod
+    def unavailable(
+        data: str = None, msg: str = "upstream unavailable"
+    ) -> JSONResponse:
+        return JSONResponse(
+            status_code=503, content={"code": 503, "msg": msg, "data": data}
+        )
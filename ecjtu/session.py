@@ -0,0 +1,133 @@
+"""Save client sessions to disk, so that a new process can reuse the cookies of a
+logged in client instead of going through the CAS login again."""
+
+import datetime
+import json
+import os
+import re
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from ecjtu.utils import get_default_storage_path
+from ecjtu.utils.cookie import dump_cookies, load_cookies
+from ecjtu.utils.logger import logger
+
+SESSION_FORMAT_VERSION = 1
+
+
+def save_session(path: str, stud_id: Optional[str], cookies: httpx.Cookies) -> None:
+    """Write a session snapshot to path.
+
+    The file is written atomically and is only readable by the current user,
+    since the cookies grant access to the student's account.
+
+    Args:
+        path(str): File to write
+        stud_id(Optional[str]): Student ID the session belongs to
+        cookies(httpx.Cookies): Cookies of the session
+    """
+    snapshot: Dict[str, Any] = {
+        "version": SESSION_FORMAT_VERSION,
+        "stud_id": stud_id,
+        "saved_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "cookies": dump_cookies(cookies),
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    # a unique name per writer, threads of a process save concurrently too, and
+    # mkstemp creates it readable by the current user only
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_session(path: str) -> Tuple[Optional[str], httpx.Cookies]:
+    """Read a session snapshot written by `save_session`.
+
+    Args:
+        path(str): File to read
+
+    Returns:
+        Tuple[Optional[str], httpx.Cookies]: Student ID and cookies of the session,
+        expired cookies are dropped
+
+    Raises:
+        ValueError: if the file is not a session snapshot
+    """
+    with open(path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+
+    if snapshot.get("version") != SESSION_FORMAT_VERSION:
+        raise ValueError(f"Unsupported session file: {path}")
+
+    return snapshot.get("stud_id"), load_cookies(snapshot["cookies"])
+
+
+class SessionStore:
+    """On-disk store of client sessions keyed by student ID.
+
+    Args:
+        directory(Optional[str]): Where to keep the session files, defaults to
+            `~/.ecjtu/sessions`
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory: str = directory or get_default_storage_path("sessions")
+
+    def _get_path(self, stud_id: str) -> str:
+        if not re.fullmatch(r"[0-9A-Za-z_-]+", stud_id):
+            raise ValueError(f"Invalid student ID: {stud_id}")
+        return os.path.join(self.directory, f"{stud_id}.json")
+
+    def load(self, stud_id: str) -> Optional[httpx.Cookies]:
+        """Get the saved cookies of a student.
+
+        Args:
+            stud_id(str): Student ID
+
+        Returns:
+            Optional[httpx.Cookies]: Saved cookies, None if there is no usable
+            session of the student
+        """
+        path = self._get_path(stud_id)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            _, cookies = load_session(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignore broken session file {path}: {e!r}")
+            return None
+
+        return cookies if "CASTGC" in cookies else None
+
+    def save(self, stud_id: str, cookies: httpx.Cookies) -> None:
+        """Save the cookies of a student, replacing the previous session.
+
+        Args:
+            stud_id(str): Student ID
+            cookies(httpx.Cookies): Cookies to save
+        """
+        save_session(self._get_path(stud_id), stud_id, cookies)
+
+    def delete(self, stud_id: str) -> None:
+        """Forget the saved session of a student.
+
+        Args:
+            stud_id(str): Student ID
+        """
+        try:
+            os.remove(self._get_path(stud_id))
+        except FileNotFoundError:
+            pass
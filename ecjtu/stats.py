@@ -0,0 +1,144 @@
+"""Per-phase timing of the clients, to tell where the time of a call goes.
+
+Clients created with `collect_stats=True` time every phase of their calls and
+add it to `client.stats`:
+
+- network: sending a request and reading its response, retries included
+- parse: extracting the rows from the HTML or JSON pages
+- validate: building the models from the rows
+- login.encrypt, login.ticket, login.cas, login.jwxt, login.redirect: the steps
+  of a login, see `ECJTU.login`
+
+A phase running inside another one, eg: a login when a request finds the
+session expired, is left out of the time of the outer phase, so that the phases
+add up to the time of the call. Pages parsed on the thread or process pool of
+`AsyncECJTU(parse_executor=...)` count their validation as parsing.
+
+    client = ECJTU(stud_id, password, collect_stats=True)
+    client.stats.add_hook(lambda phase, seconds: print(phase, seconds))
+    client.scores.today()
+    print(client.stats.snapshot())
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+PhaseHook = Callable[[str, float], None]
+
+
+class PhaseStats:
+    """Number of runs and seconds spent in a phase."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"PhaseStats(count={self.count}, total={self.total:.4f}, "
+            f"max={self.max:.4f})"
+        )
+
+
+class _Frame:
+    """A running phase, collecting the time of the phases nested in it."""
+
+    __slots__ = ("stats", "nested")
+
+    def __init__(self, stats: "ClientStats") -> None:
+        self.stats = stats
+        self.nested = 0.0
+
+
+_frame: contextvars.ContextVar[Optional[_Frame]] = contextvars.ContextVar(
+    "ecjtu_stats_frame", default=None
+)
+
+
+class ClientStats:
+    """Time spent in every phase of the calls of a client.
+
+    Args:
+        hooks(Optional[List[PhaseHook]]): Called with the phase and its seconds
+            every time a phase ends, eg: to trace a single call
+    """
+
+    def __init__(self, hooks: Optional[List[PhaseHook]] = None) -> None:
+        self.hooks: List[PhaseHook] = list(hooks or [])
+        self._phases: Dict[str, PhaseStats] = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: PhaseHook) -> None:
+        self.hooks.append(hook)
+
+    def __getitem__(self, phase: str) -> PhaseStats:
+        return self._phases.get(phase) or PhaseStats()
+
+    def __contains__(self, phase: str) -> bool:
+        return phase in self._phases
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Add a run of a phase and call the hooks."""
+        with self._lock:
+            stats = self._phases.get(phase)
+            if stats is None:
+                stats = self._phases[phase] = PhaseStats()
+            stats.count += 1
+            stats.total += seconds
+            if seconds > stats.max:
+                stats.max = seconds
+        for hook in self.hooks:
+            hook(phase, seconds)
+
+    @contextmanager
+    def timed(self, phase: str) -> Iterator[None]:
+        """Time the block as a run of phase, less the phases nested in it."""
+        parent = _frame.get()
+        frame = _Frame(self)
+        token = _frame.set(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _frame.reset(token)
+            if parent is not None:
+                parent.nested += elapsed
+            self.record(phase, elapsed - frame.nested)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Get the count, total, mean and max seconds of every phase."""
+        with self._lock:
+            phases: List[Tuple[str, PhaseStats]] = list(self._phases.items())
+            return {
+                phase: {
+                    "count": stats.count,
+                    "total": stats.total,
+                    "mean": stats.mean,
+                    "max": stats.max,
+                }
+                for phase, stats in phases
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._phases.clear()
+
+
+def timed_phase(phase: str) -> ContextManager[None]:
+    """Time the block as a run of phase, for the stats of the client running the
+    current phase, if any. Used by the sans-IO parsers, which know no client."""
+    frame = _frame.get()
+    if frame is None:
+        return nullcontext()
+    return frame.stats.timed(phase)
@@ -0,0 +1,123 @@
+"""Process-wide transports, so that many clients reuse the same connection pool.
+
+Every `ECJTU` instance is an `httpx.Client` and owns a connection pool by default.
+Clients created with `shared_transport=True` send their requests through the
+transport of this module instead, each of them keeps its own cookies.
+"""
+
+import threading
+from typing import Optional
+
+import httpx
+
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0
+)
+
+_lock = threading.Lock()
+_limits: httpx.Limits = DEFAULT_LIMITS
+_transport: Optional[httpx.HTTPTransport] = None
+_async_transport: Optional[httpx.AsyncHTTPTransport] = None
+
+
+class SharedTransport(httpx.BaseTransport):
+    """Forward requests to a transport shared with other clients.
+
+    Closing the client does not close the shared transport, it belongs to the
+    process, see `close_shared_transports`.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport) -> None:
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._transport.handle_request(request)
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncSharedTransport(httpx.AsyncBaseTransport):
+    """Forward requests to an async transport shared with other clients.
+
+    The connections of an async transport belong to the event loop that opened
+    them, so the clients sharing it should run on the same event loop.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+def configure_shared_transport(limits: httpx.Limits) -> None:
+    """Set the pool limits of the shared transports.
+
+    Args:
+        limits(httpx.Limits): Limits of the connection pool
+
+    Raises:
+        RuntimeError: if a shared transport is already in use
+    """
+    global _limits
+
+    with _lock:
+        if _transport is not None or _async_transport is not None:
+            raise RuntimeError(
+                "Shared transport is already in use, configure it before creating "
+                "clients or call close_shared_transports() first"
+            )
+        _limits = limits
+
+
+def get_shared_transport() -> SharedTransport:
+    """Get a handle of the process-wide sync transport, creating it on first use."""
+    global _transport
+
+    with _lock:
+        if _transport is None:
+            _transport = httpx.HTTPTransport(verify=False, limits=_limits)
+        return SharedTransport(_transport)
+
+
+def get_async_shared_transport() -> AsyncSharedTransport:
+    """Get a handle of the process-wide async transport, creating it on first use."""
+    global _async_transport
+
+    with _lock:
+        if _async_transport is None:
+            _async_transport = httpx.AsyncHTTPTransport(verify=False, limits=_limits)
+        return AsyncSharedTransport(_async_transport)
+
+
+def close_shared_transports() -> None:
+    """Close the sync shared transport and forget the async one.
+
+    The async transport is dropped without being closed, since it can only be
+    closed from its event loop, use `aclose_shared_transports` there instead.
+    """
+    global _transport, _async_transport
+
+    with _lock:
+        transport, _transport, _async_transport = _transport, None, None
+
+    if transport is not None:
+        transport.close()
+
+
+async def aclose_shared_transports() -> None:
+    """Close both shared transports, from the event loop of the async one."""
+    global _transport, _async_transport
+
+    with _lock:
+        transport, _transport = _transport, None
+        async_transport, _async_transport = _async_transport, None
+
+    if transport is not None:
+        transport.close()
+    if async_transport is not None:
+        await async_transport.aclose()
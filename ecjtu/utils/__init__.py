@@ -1,6 +1,7 @@
 import os
 import tempfile
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import List, Union
 
 
 def convert_backslashes(path: str):
@@ -40,6 +41,67 @@ def get_cur_week_datetime() -> datetime:
     return today - timedelta(days=today.weekday())
 
 
+def _to_date(value: Union[str, date]) -> date:
+    if isinstance(value, str):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def format_date(value: Union[str, date]) -> str:
+    """Format a date in the format of "YYYY-MM-DD", strings are kept as is.
+
+    Args:
+        value(Union[str, date]): A date, eg: date(2023, 1, 1) or "2023-01-01"
+
+    Returns:
+        str: The date, eg: "2023-01-01"
+    """
+    if isinstance(value, str):
+        return value
+    return _to_date(value).strftime("%Y-%m-%d")
+
+
+def get_date_range(start: Union[str, date], end: Union[str, date]) -> List[str]:
+    """Get every date between start and end (both inclusive) in the format of
+    "YYYY-MM-DD".
+
+    Args:
+        start(Union[str, date]): The first date, eg: 2023-01-01
+        end(Union[str, date]): The last date, eg: 2023-01-07
+
+    Returns:
+        List[str]: Dates in ascending order
+
+    Raises:
+        ValueError: if end is earlier than start
+    """
+    start, end = _to_date(start), _to_date(end)
+
+    if end < start:
+        raise ValueError(f"End date {end} is earlier than start date {start}")
+
+    return [
+        (start + timedelta(days=i)).strftime("%Y-%m-%d")
+        for i in range((end - start).days + 1)
+    ]
+
+
+def get_week_dates(value: Union[str, date]) -> List[str]:
+    """Get the seven dates of the ISO week of a date, from Monday to Sunday.
+
+    Args:
+        value(Union[str, date]): A date of the week, eg: 2023-01-04
+
+    Returns:
+        List[str]: Dates in ascending order, eg: ["2023-01-02", ..., "2023-01-08"]
+    """
+    day = _to_date(value)
+    monday = day - timedelta(days=day.weekday())
+    return get_date_range(monday, monday + timedelta(days=6))
+
+
 def get_cur_semester() -> str:
     """Get the current semester, eg: 2023.1 or 2022.2
 
@@ -1,4 +1,6 @@
-from typing import Optional
+import time
+from http.cookiejar import Cookie
+from typing import Any, Dict, List, Optional
 
 import httpx
 from httpx._types import CookieTypes
@@ -21,3 +23,71 @@ def list_tocookie(cookies_list: list) -> httpx.Cookies:
     for cookie in cookies_list:
         cookies.set(**cookie)
     return cookies
+
+
+def dump_cookies(cookies: httpx.Cookies) -> List[Dict[str, Any]]:
+    """Dump every cookie of the jar with its domain, path and expiry, so that
+    `load_cookies` can rebuild the same jar.
+
+    Args:
+        cookies(httpx.Cookies): Cookies to dump
+
+    Returns:
+        List[Dict[str, Any]]: JSON serializable cookies
+    """
+    return [
+        {
+            "name": cookie.name,
+            "value": cookie.value,
+            "domain": cookie.domain,
+            "path": cookie.path,
+            "expires": cookie.expires,
+            "secure": cookie.secure,
+            "discard": cookie.discard,
+            "rest": cookie._rest,  # noqa
+        }
+        for cookie in cookies.jar
+    ]
+
+
+def load_cookies(cookies_list: List[Dict[str, Any]]) -> httpx.Cookies:
+    """Rebuild cookies dumped by `dump_cookies`, dropping the expired ones.
+
+    Cookies saved by `cookies_tolist` are accepted too, they are treated as
+    session cookies of the root path.
+
+    Args:
+        cookies_list(List[Dict[str, Any]]): Dumped cookies
+
+    Returns:
+        httpx.Cookies: Cookies
+    """
+    cookies = httpx.Cookies()
+    now = time.time()
+    for item in cookies_list:
+        expires = item.get("expires")
+        if expires is not None and expires <= now:
+            continue
+
+        domain = item.get("domain", "")
+        path = item.get("path", "/")
+        cookie = Cookie(
+            version=0,
+            name=item["name"],
+            value=item["value"],
+            port=None,
+            port_specified=False,
+            domain=domain,
+            domain_specified=bool(domain),
+            domain_initial_dot=domain.startswith("."),
+            path=path,
+            path_specified=bool(path),
+            secure=item.get("secure", False),
+            expires=expires,
+            discard=item.get("discard", expires is None),
+            comment=None,
+            comment_url=None,
+            rest=item.get("rest") or {},
+        )
+        cookies.jar.set_cookie(cookie)
+    return cookies
@@ -1,16 +1,37 @@
+"""Logger of the package, writing to a file per day off the calling thread.
+
+Records are put on a queue by the logger and written by a background thread, so
+that logging never waits for the disk, in the threads of the sync client or on
+the event loop of the async one. The log file and the thread are only set up
+when the first record is logged.
+
+Several processes, eg: the workers of the API server, can log to the same
+directory: the file of a day is never renamed, every process appends to it and
+switches to the file of the next day after midnight.
+
+The level is read from the `ECJTU_LOG_LEVEL` environment variable, DEBUG by
+default or when it is not a level, or set with `set_log_level`.
+"""
+
+import atexit
 import datetime
 import logging
+import os
+import queue
 import sys
+import threading
 import traceback
-from logging.handlers import TimedRotatingFileHandler
+import warnings
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Union
 
 from ecjtu.utils import get_default_storage_path
 from ecjtu.utils.singleton import Singleton
 
 
-def get_log_path() -> str:
+def get_log_path(date: Optional[datetime.date] = None) -> str:
     log_directory = get_default_storage_path("logs")
-    current_time = datetime.datetime.now().strftime("%Y%m%d")
+    current_time = (date or datetime.date.today()).strftime("%Y%m%d")
     return f"{log_directory}/{current_time}.log"
 
 
@@ -19,23 +40,109 @@ def get_path() -> str:
     return f"{log_directory}"
 
 
+def _level_from_env() -> int:
+    """The level set in the `ECJTU_LOG_LEVEL` environment variable, DEBUG when
+    it is not set or is not the name of a level, eg: "verbose"."""
+    name = os.environ.get("ECJTU_LOG_LEVEL", "DEBUG").upper()
+    level = logging.getLevelName(name)
+    if not isinstance(level, int):
+        warnings.warn(
+            f"Unknown ECJTU_LOG_LEVEL {name!r}, logging at DEBUG instead",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        return logging.DEBUG
+    return level
+
+
+class DailyFileHandler(logging.FileHandler):
+    """Append the records to the file of their day, eg: 20240101.log.
+
+    Unlike `TimedRotatingFileHandler`, the files are never renamed, so that
+    processes logging to the same directory do not rotate each other's files.
+    """
+
+    def __init__(self, encoding: str = "utf-8") -> None:
+        self._date = datetime.date.today()
+        super().__init__(get_log_path(self._date), encoding=encoding, delay=True)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        date = datetime.date.fromtimestamp(record.created)
+        if date != self._date:
+            self._date = date
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.path.abspath(get_log_path(date))
+        super().emit(record)
+
+
+class _LazyQueueHandler(QueueHandler):
+    """Queue the records, starting the writer thread on the first one."""
+
+    def __init__(self, manager: "LogManager") -> None:
+        super().__init__(manager.queue)
+        self.manager = manager
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.manager.listener is None:
+            self.manager.start()
+        super().emit(record)
+
+
 class LogManager(metaclass=Singleton):
     def __init__(self) -> None:
         self.logger = logging.getLogger("ecjtu")
-        self.logger.setLevel(logging.DEBUG)
+        self.logger.setLevel(_level_from_env())
+
+        self.queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self.listener: Optional[QueueListener] = None
+        self._lock = threading.Lock()
+        self._handler = _LazyQueueHandler(self)
+        self.logger.addHandler(self._handler)
+
+    def start(self) -> None:
+        """Open the log file and start the thread writing the queued records."""
+        with self._lock:
+            if self.listener is not None:
+                return
+
+            file_handler = DailyFileHandler()
+            formatter = logging.Formatter(
+                "%(asctime)s | %(levelname)s | %(name)s:%(funcName)s:%(lineno)d - %(message)s",  # noqa
+                "%Y-%m-%d %H:%M:%S",
+            )
+            file_handler.setFormatter(formatter)
+
+            listener = QueueListener(self.queue, file_handler)
+            listener.start()
+            self.listener = listener
+
+    def stop(self) -> None:
+        """Write the queued records and stop the writer thread, it starts again
+        with the next record."""
+        with self._lock:
+            listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+
+    def _after_fork_in_child(self) -> None:
+        # the writer thread is not copied to the child, and the queue may have
+        # been copied in the middle of a put
+        self._lock = threading.Lock()
+        self.listener = None
+        self.queue = self._handler.queue = queue.SimpleQueue()
+
+
+def set_log_level(level: Union[int, str]) -> None:
+    """Set the level of the records logged by the package.
 
-        file_handler = TimedRotatingFileHandler(
-            filename=get_log_path(), when="midnight", interval=1, encoding="utf-8"
-        )
-        file_handler.setLevel(logging.DEBUG)
-
-        formatter = logging.Formatter(
-            "%(asctime)s | %(levelname)s | %(name)s:%(funcName)s:%(lineno)d - %(message)s",  # noqa
-            "%Y-%m-%d %H:%M:%S",
-        )
-        file_handler.setFormatter(formatter)
-
-        self.logger.addHandler(file_handler)
+    Args:
+        level(Union[int, str]): eg: logging.INFO or "WARNING"
+    """
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
 
 
 def exception_handler(exc_type, exc_value, exc_traceback):
@@ -65,5 +172,8 @@ def exception_handler(exc_type, exc_value, exc_traceback):
 
 log_manager = LogManager()
 logger = log_manager.logger
+atexit.register(log_manager.stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=log_manager._after_fork_in_child)
 original_excepthook = sys.excepthook
 sys.excepthook = exception_handler
@@ -2,12 +2,11 @@ import asyncio
 
 from ecjtu import AsyncECJTU
 
-client = AsyncECJTU(stud_id="xxx", password="xxx")
-
 
 async def main():
-    courses = await client.scheduled_courses.today()
-    print(courses)
+    async with AsyncECJTU(stud_id="xxx", password="xxx") as client:
+        courses = await client.scheduled_courses.today()
+        print(courses)
 
 
 asyncio.run(main())
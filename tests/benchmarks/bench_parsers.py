@@ -0,0 +1,245 @@
+"""Benchmarks of the page parsers and the model validation, run on the anonymized
+fixtures of `tests/fixtures`.
+
+For every resource it measures the time to build the parse tree (or decode the
+JSON), the end-to-end time of the parser producing the models, the model time as
+the difference of both medians, and the peak memory of one end-to-end run.
+
+Usage:
+    python -m tests.benchmarks.bench_parsers --output bench.json
+    python -m tests.benchmarks.bench_parsers --compare bench.json --threshold 0.2
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from ecjtu import protocol
+from ecjtu.parser import get_parser_backend, make_soup
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures")
+RESULT_FORMAT_VERSION = 1
+
+
+def load_fixture(name: str) -> bytes:
+    """Load a fixture, the body of a response of the ECJTU systems.
+
+    Args:
+        name(str): File name in `tests/fixtures`
+
+    Returns:
+        bytes: The body, encoded in UTF-8
+    """
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+class Benchmark:
+    """A parser to benchmark.
+
+    Args:
+        name(str): Name of the resource
+        fixture(str): Fixture the parser runs on
+        parse(Callable[[bytes], Any]): Builds the parse tree only
+        run(Callable[[bytes], Any]): Parses the body into models
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fixture: str,
+        parse: Callable[[bytes], Any],
+        run: Callable[[bytes], Any],
+    ) -> None:
+        self.name = name
+        self.fixture = fixture
+        self.parse = parse
+        self.run = run
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark(
+        "score_sheet",
+        "score_page.html",
+        lambda content: make_soup(content, protocol.SCORE_PAGE_STRAINER, "utf-8"),
+        lambda content: protocol.parse_score_sheet(content, "utf-8"),
+    ),
+    Benchmark(
+        "elective_courses",
+        "elective_page.html",
+        lambda content: make_soup(content, protocol.ELECTIVE_PAGE_STRAINER, "utf-8"),
+        lambda content: protocol.parse_elective_courses(content, "utf-8"),
+    ),
+    Benchmark(
+        "scheduled_courses",
+        "weekcalendar.json",
+        json.loads,
+        protocol.parse_scheduled_courses,
+    ),
+    Benchmark(
+        "cas_login",
+        "cas_login.html",
+        lambda content: make_soup(content, protocol.LOGIN_FORM_STRAINER, "utf-8"),
+        lambda content: protocol.parse_login_ticket(content, "utf-8"),
+    ),
+]
+
+
+def _time(
+    func: Callable[[bytes], Any], content: bytes, rounds: int
+) -> Dict[str, float]:
+    timings: List[float] = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(content)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+    }
+
+
+def _peak_memory_kib(func: Callable[[bytes], Any], content: bytes) -> float:
+    tracemalloc.start()
+    try:
+        func(content)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def run_benchmark(benchmark: Benchmark, rounds: int = 50) -> Dict[str, Any]:
+    """Run a benchmark.
+
+    Args:
+        benchmark(Benchmark): The benchmark
+        rounds(int): Times each step runs, the first warm-up run is not counted
+
+    Returns:
+        Dict[str, Any]: Timings in milliseconds and peak memory in KiB
+    """
+    content = load_fixture(benchmark.fixture)
+    benchmark.run(content)
+
+    parse_ms = _time(benchmark.parse, content, rounds)
+    total_ms = _time(benchmark.run, content, rounds)
+    return {
+        "fixture": benchmark.fixture,
+        "fixture_bytes": len(content),
+        "rounds": rounds,
+        "parse_ms": parse_ms,
+        "total_ms": total_ms,
+        "model_ms": max(0.0, total_ms["median"] - parse_ms["median"]),
+        "peak_memory_kib": _peak_memory_kib(benchmark.run, content),
+    }
+
+
+def _get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(rounds: int = 50) -> Dict[str, Any]:
+    """Run every benchmark.
+
+    Args:
+        rounds(int): Times each step runs
+
+    Returns:
+        Dict[str, Any]: The results with the environment they were measured in
+    """
+    return {
+        "version": RESULT_FORMAT_VERSION,
+        "meta": {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "commit": _get_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parser_backend": get_parser_backend(),
+        },
+        "results": {
+            benchmark.name: run_benchmark(benchmark, rounds) for benchmark in BENCHMARKS
+        },
+    }
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Compare the median end-to-end times of two runs.
+
+    Args:
+        baseline(Dict[str, Any]): Results of the reference run
+        current(Dict[str, Any]): Results of this run
+        threshold(float): Max allowed slowdown, eg: 0.2 for 20%
+
+    Returns:
+        List[str]: The resources slower than allowed
+    """
+    regressions: List[str] = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+
+        ratio = result["total_ms"]["median"] / base["total_ms"]["median"]
+        print(
+            f"{name:<20} {base['total_ms']['median']:8.3f}ms -> "
+            f"{result['total_ms']['median']:8.3f}ms ({ratio - 1:+.1%})"
+        )
+        if ratio - 1 > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--rounds", type=int, default=50)
+    arg_parser.add_argument("--output", help="write the results to this JSON file")
+    arg_parser.add_argument("--compare", help="JSON results of a previous run")
+    arg_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="fail if a resource is slower than the compared run by this ratio",
+    )
+    args = arg_parser.parse_args(argv)
+
+    results = run_benchmarks(args.rounds)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"Slower than {args.compare}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
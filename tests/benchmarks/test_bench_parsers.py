@@ -0,0 +1,34 @@
+import json
+
+from ecjtu.protocol import parse_score_sheet
+from tests.benchmarks import bench_parsers
+
+
+def test_benchmarks_run_on_every_fixture(tmp_path):
+    output = tmp_path / "bench.json"
+
+    assert bench_parsers.main(["--rounds", "1", "--output", str(output)]) == 0
+
+    results = json.loads(output.read_text())
+    assert set(results["results"]) == {
+        benchmark.name for benchmark in bench_parsers.BENCHMARKS
+    }
+    for result in results["results"].values():
+        assert result["total_ms"]["median"] > 0
+        assert result["peak_memory_kib"] > 0
+
+
+def test_regressions_are_reported(tmp_path, capsys):
+    baseline = bench_parsers.run_benchmarks(rounds=1)
+    current = json.loads(json.dumps(baseline))
+    current["results"]["score_sheet"]["total_ms"]["median"] *= 2
+
+    assert bench_parsers.compare(baseline, current, threshold=0.5) == ["score_sheet"]
+
+
+def test_fixtures_parse_into_models():
+    score_sheet = parse_score_sheet(bench_parsers.load_fixture("score_page.html"))
+
+    assert score_sheet.gpa.gpa == "3.62"
+    assert len(score_sheet.semesters) == 8
+    assert sum(len(scores) for scores in score_sheet.scores.values()) == 96
@@ -0,0 +1,116 @@
+import httpx
+import pytest
+
+from ecjtu import breaker as breaker_module
+from ecjtu.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, track_staleness
+from ecjtu.client import ECJTU
+from ecjtu.constants import GET_GPA_URL
+from ecjtu.exceptions import CircuitOpenError, SessionExpiredError
+from ecjtu.retry import RetryPolicy
+from tests.test_client import LOGIN_PAGE
+from tests.test_crud import SCORE_PAGE
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=60)
+    for _ in range(3):
+        breaker.before_request()
+        breaker.on_failure()
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_half_open_probe_closes_or_reopens_the_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+    breaker.on_failure()
+    assert breaker.state == HALF_OPEN
+
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.on_failure()
+
+    breaker.before_request()
+    breaker.on_success()
+    assert breaker.state == CLOSED
+
+
+def test_stale_data_is_served_while_the_upstream_is_down(monkeypatch):
+    monkeypatch.setattr(breaker_module, "_breakers", {})
+    monkeypatch.setattr(breaker_module, "_options", {"failure_threshold": 1})
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        if len(calls) > 1:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, text=SCORE_PAGE)
+
+    client = ECJTU(
+        cookie={"CASTGC": "TGT"},
+        transport=httpx.MockTransport(handler),
+        retry_policy=RetryPolicy(max_retries=0),
+        circuit_breaker=True,
+        serve_stale=True,
+    )
+    with track_staleness() as staleness:
+        assert client.gpa.today().gpa == "4.01"
+    assert staleness.age is None
+
+    with track_staleness() as staleness:
+        assert client.gpa.today(force_refresh=True).gpa == "4.01"
+        # the breaker is open, the upstream is not even called
+        assert client.gpa.today(force_refresh=True).gpa == "4.01"
+    assert staleness.age is not None
+    assert calls == [GET_GPA_URL, GET_GPA_URL]
+
+    client.serve_stale = False
+    with pytest.raises(CircuitOpenError):
+        client.gpa.today(force_refresh=True)
+
+
+def test_stale_data_does_not_mask_an_expired_session():
+    responses = [
+        httpx.Response(200, text=SCORE_PAGE),
+        httpx.Response(200, content=LOGIN_PAGE),
+    ]
+
+    client = ECJTU(
+        cookie={"CASTGC": "TGT"},
+        transport=httpx.MockTransport(lambda request: responses.pop(0)),
+        retry_policy=RetryPolicy(max_retries=0),
+        serve_stale=True,
+    )
+    assert client.gpa.today().gpa == "4.01"
+
+    with track_staleness() as staleness:
+        with pytest.raises(SessionExpiredError):
+            client.gpa.today(force_refresh=True)
+    assert staleness.age is None
+
+
+def test_stale_data_is_served_on_a_server_error():
+    responses = [
+        httpx.Response(200, text=SCORE_PAGE),
+        httpx.Response(200, json={"weekcalendarpojoList": []}),
+        httpx.Response(503, text="<html>Service Unavailable</html>"),
+        httpx.Response(503, text="<html>Service Unavailable</html>"),
+    ]
+
+    client = ECJTU(
+        cookie={"CASTGC": "TGT"},
+        transport=httpx.MockTransport(lambda request: responses.pop(0)),
+        retry_policy=RetryPolicy(max_retries=0),
+        serve_stale=True,
+    )
+    assert client.gpa.today().gpa == "4.01"
+    assert client.scheduled_courses.filter(date="2024-03-04") == []
+
+    with track_staleness() as staleness:
+        assert client.gpa.today(force_refresh=True).gpa == "4.01"
+        assert (
+            client.scheduled_courses.filter(date="2024-03-04", force_refresh=True) == []
+        )
+    assert staleness.age is not None
@@ -0,0 +1,104 @@
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+
+from ecjtu.cache import MISSING, TTLCache
+from ecjtu.client import ECJTU, AsyncECJTU
+from tests.test_crud import SCORE_PAGE
+
+COURSES = {"weekcalendarpojoList": []}
+
+
+def _handler(calls: Counter):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls[request.content] += 1
+        return httpx.Response(200, json=COURSES)
+
+    return handler
+
+
+def test_entries_expire_and_lru_is_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("ecjtu.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+
+    now[0] += 61
+    assert cache.get("a") is MISSING
+    assert len(cache) == 1
+
+
+def test_crud_results_are_cached_until_refreshed():
+    calls = Counter()
+    client = ECJTU(
+        cookie={"CASTGC": "TGT"}, transport=httpx.MockTransport(_handler(calls))
+    )
+
+    client.scheduled_courses.filter(date="2024-03-04")
+    client.scheduled_courses.filter(date="2024-03-04")
+    client.scheduled_courses.range("2024-03-04", "2024-03-05")
+    assert sum(calls.values()) == 2
+
+    client.scheduled_courses.filter(date="2024-03-04", force_refresh=True)
+    assert calls[b"date=2024-03-04"] == 2
+
+    client.invalidate_cache()
+    client.scheduled_courses.filter(date="2024-03-05")
+    assert calls[b"date=2024-03-05"] == 2
+
+
+def test_cache_can_be_disabled_per_resource():
+    calls = Counter()
+    client = ECJTU(
+        cookie={"CASTGC": "TGT"},
+        transport=httpx.MockTransport(_handler(calls)),
+        cache_ttl={"scheduled_courses": 0},
+    )
+
+    client.scheduled_courses.filter(date="2024-03-04")
+    client.scheduled_courses.filter(date="2024-03-04")
+    assert calls[b"date=2024-03-04"] == 2
+
+
+def test_async_crud_results_are_cached():
+    calls = Counter()
+
+    async def main():
+        async with AsyncECJTU(
+            cookie={"CASTGC": "TGT"}, transport=httpx.MockTransport(_handler(calls))
+        ) as client:
+            await client.scheduled_courses.filter(date="2024-03-04")
+            courses = await client.scheduled_courses.filter(date="2024-03-04")
+            courses.append("not cached")
+            assert await client.scheduled_courses.filter(date="2024-03-04") == []
+
+    asyncio.run(main())
+    assert calls[b"date=2024-03-04"] == 1
+
+
+def test_gpa_shares_the_cache_of_the_scores():
+    calls = Counter()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls[request.url.path] += 1
+        return httpx.Response(200, text=SCORE_PAGE)
+
+    client = ECJTU(cookie={"CASTGC": "TGT"}, transport=httpx.MockTransport(handler))
+    client.scores.today()
+    client.gpa.today()
+    assert sum(calls.values()) == 1
+
+    client.gpa.invalidate()
+    client.scores.today()
+    assert sum(calls.values()) == 2
+
+    with pytest.raises(ValueError, match="gpa"):
+        ECJTU(cookie={"CASTGC": "TGT"}, cache_ttl={"gpa": 60})
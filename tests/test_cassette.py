@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from ecjtu.cassette import AsyncReplayTransport, RecordTransport, ReplayTransport
+from ecjtu.client import ECJTU, AsyncECJTU
+from ecjtu.exceptions import CassetteError
+from tests.test_client import FakeJWXT
+
+
+def _record(path) -> FakeJWXT:
+    upstream = FakeJWXT()
+    transport = RecordTransport(str(path), httpx.MockTransport(upstream.handler))
+    with ECJTU("2021000000", "secret-pwd", transport=transport) as client:
+        client.login()
+        assert client.cookies.get("CASTGC") == "TGT-1"
+        assert client.scheduled_courses.filter(date="2024-03-04")
+    return upstream
+
+
+def test_replayed_client_logs_in_and_fetches_offline(tmp_path):
+    path = tmp_path / "cassette.json"
+    upstream = _record(path)
+    assert upstream.logins == 1
+    content = path.read_text()
+    assert "secret-pwd" not in content
+    assert "TGT-1" not in content
+
+    client = ECJTU("2021000000", "secret-pwd", transport=ReplayTransport(str(path)))
+    client.login()
+    courses = client.scheduled_courses.filter(date="2024-03-04")
+
+    assert client.has_login
+    assert courses[0].course == "高等数学"
+    assert upstream.logins == 1
+
+
+def test_unrecorded_request_is_an_error(tmp_path):
+    path = tmp_path / "cassette.json"
+    _record(path)
+
+    client = ECJTU(cookie={"CASTGC": "TGT"}, transport=ReplayTransport(str(path)))
+    with pytest.raises(CassetteError):
+        client.scheduled_courses.filter(date="2024-03-05")
+
+
+def test_async_replay_simulates_latency(tmp_path):
+    path = tmp_path / "cassette.json"
+    _record(path)
+
+    async def main():
+        transport = AsyncReplayTransport(str(path), latency=0.05)
+        async with AsyncECJTU(cookie={"CASTGC": "TGT"}, transport=transport) as client:
+            start = time.monotonic()
+            courses = await client.scheduled_courses.filter(date="2024-03-04")
+            return courses, time.monotonic() - start
+
+    courses, elapsed = asyncio.run(main())
+    assert len(courses) == 1
+    assert elapsed >= 0.05
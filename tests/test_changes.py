@@ -0,0 +1,51 @@
+import httpx
+import pytest
+
+from ecjtu import protocol
+from ecjtu.changes import diff, take_snapshot
+from ecjtu.client import ECJTU
+from tests.benchmarks.bench_parsers import load_fixture
+
+KEY = ("semester", "course_name")
+
+
+def _scores():
+    return list(protocol.parse_score_sheet(load_fixture("score_page.html")).iter())
+
+
+def test_diff_reports_added_removed_and_modified_rows():
+    scores = _scores()
+    snapshot = take_snapshot(scores, KEY)
+    assert not diff(scores, snapshot, KEY)
+
+    current = scores[1:] + [scores[0].model_copy(update={"course_name": "新课程"})]
+    current[0] = current[0].model_copy(update={"grade": "100"})
+    changes = diff(current, snapshot, KEY)
+
+    assert [score.course_name for score in changes.added] == ["新课程"]
+    assert changes.removed == [(scores[0].semester, scores[0].course_name)]
+    assert changes.modified == [current[0]]
+    assert not diff(current, changes.snapshot, KEY)
+
+
+def test_first_diff_adds_every_row_and_bad_snapshots_are_rejected():
+    scores = _scores()
+    assert len(diff(scores, None, KEY).added) == len(scores)
+    with pytest.raises(ValueError):
+        diff(scores, "not a snapshot", KEY)
+
+
+def test_scores_changes_since():
+    pages = [load_fixture("score_page.html")]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=pages[0])
+
+    client = ECJTU(cookie={"CASTGC": "TGT"}, transport=httpx.MockTransport(handler))
+    changes = client.scores.changes_since()
+    assert len(changes.added) == 96
+
+    pages[0] = pages[0].replace("高等数学".encode(), "高等数学Ⅱ".encode(), 1)
+    assert not client.scores.changes_since(changes.snapshot)
+    changes = client.scores.changes_since(changes.snapshot, force_refresh=True)
+    assert len(changes.added) == len(changes.removed) == 1
@@ -0,0 +1,367 @@
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from ecjtu import transport as transport_module
+from ecjtu.client import ECJTU, AsyncECJTU
+from ecjtu.constants import (
+    ECJTU2JWXT_URL,
+    ECJTU_LOGIN_URL,
+    GET_CLASSES_URL,
+    JWXT_LOGIN_URL,
+    PWD_ENC_URL,
+)
+from ecjtu.exceptions import SessionExpiredError
+from ecjtu.retry import RetryPolicy
+from ecjtu.session import SessionStore
+
+LOGIN_PAGE = b'<form><input type="hidden" name="lt" value="LT-1-test" /></form>'
+JWXT_TICKET_URL = "https://jwxt.ecjtu.edu.cn/stuMag/Login_dcpLogin.action?ticket=ST-1"
+COURSE = {
+    "classSpan": "1,2",
+    "course": "高等数学",
+    "className": "高等数学(20232-1)",
+    "weekSpan": "1-16",
+    "courseRequire": "必修课",
+    "teacherName": "张三",
+    "weekDay": 1,
+    "classRoom": "31-313",
+    "pkType": "正常",
+}
+
+
+class FakeJWXT:
+    """A fake CAS/JWXT upstream counting every request it serves."""
+
+    def __init__(self, login_delay: float = 0.0, password_ok: bool = True):
+        self.calls = Counter()
+        self.login_delay = login_delay
+        self.password_ok = password_ok
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        self.calls[(request.method, url)] += 1
+
+        if url == PWD_ENC_URL:
+            return httpx.Response(200, content=b"{'passwordEnc': 'ENC'}")
+        if url == ECJTU2JWXT_URL:
+            if request.headers.get("cookie") != "CASTGC=TGT-1":
+                return httpx.Response(200, content=LOGIN_PAGE)
+            return httpx.Response(302, headers={"location": JWXT_TICKET_URL})
+        if url == ECJTU_LOGIN_URL and request.method == "GET":
+            return httpx.Response(200, content=LOGIN_PAGE)
+        if url == ECJTU_LOGIN_URL and request.method == "POST":
+            time.sleep(self.login_delay)
+            form = parse_qs(request.content.decode())
+            if not self.password_ok or form.get("password") != ["ENC"]:
+                return httpx.Response(200, content=LOGIN_PAGE)
+            return httpx.Response(
+                200, headers={"set-cookie": "CASTGC=TGT-1; Path=/cas/"}
+            )
+        if url in (JWXT_LOGIN_URL, JWXT_TICKET_URL):
+            return httpx.Response(200, content=b"ok")
+        if url == GET_CLASSES_URL:
+            return httpx.Response(200, json={"weekcalendarpojoList": [COURSE]})
+        return httpx.Response(404)
+
+    async def async_handler(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.login_delay if request.method == "POST" else 0)
+        return self.handler(request)
+
+    @property
+    def logins(self) -> int:
+        return self.calls[("POST", ECJTU_LOGIN_URL)]
+
+
+def test_concurrent_callers_share_one_login():
+    upstream = FakeJWXT(login_delay=0.05)
+    client = ECJTU("2021000000", "pwd", transport=httpx.MockTransport(upstream.handler))
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                client.scheduled_courses.filter(date="2024-03-04")
+            )
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert upstream.logins == 1
+    assert len(results) == 8
+    assert results[0][0].course == "高等数学"
+
+
+def test_waiting_callers_share_login_error():
+    upstream = FakeJWXT(login_delay=0.05, password_ok=False)
+    client = ECJTU("2021000000", "pwd", transport=httpx.MockTransport(upstream.handler))
+
+    errors = []
+
+    def _call():
+        try:
+            client.scheduled_courses.filter(date="2024-03-04")
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=_call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 4
+    assert upstream.logins == 1
+
+
+def test_async_concurrent_callers_share_one_login():
+    upstream = FakeJWXT(login_delay=0.05)
+
+    async def main():
+        client = AsyncECJTU(
+            "2021000000",
+            "pwd",
+            transport=httpx.MockTransport(upstream.async_handler),
+        )
+        return await client.scheduled_courses.this_week()
+
+    week = asyncio.run(main())
+
+    assert upstream.logins == 1
+    assert len(week) == 7
+
+
+def test_transient_errors_are_retried():
+    upstream = FakeJWXT()
+    failures = [httpx.ConnectError("reset"), httpx.ReadTimeout("slow")]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if str(request.url) == GET_CLASSES_URL and failures:
+            raise failures.pop(0)
+        return upstream.handler(request)
+
+    client = ECJTU(
+        "2021000000",
+        "pwd",
+        retry_policy=RetryPolicy(backoff_factor=0),
+        transport=httpx.MockTransport(handler),
+    )
+
+    courses = client.scheduled_courses.filter(date="2024-03-04")
+
+    assert courses[0].course == "高等数学"
+    assert not failures
+
+
+def test_server_errors_are_retried_until_the_budget_is_spent():
+    upstream = FakeJWXT()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if str(request.url) == GET_CLASSES_URL:
+            upstream.calls["server_error"] += 1
+            return httpx.Response(503)
+        return upstream.handler(request)
+
+    client = ECJTU(
+        "2021000000",
+        "pwd",
+        retry_policy=RetryPolicy(max_retries=2, backoff_factor=0),
+        transport=httpx.MockTransport(handler),
+    )
+
+    response = client.post(GET_CLASSES_URL, data={"date": "2024-03-04"})
+
+    assert response.status_code == 503
+    assert upstream.calls["server_error"] == 3
+
+
+def test_expired_session_is_relogged_and_replayed():
+    upstream = FakeJWXT()
+    expired = {"count": 1}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if str(request.url) == GET_CLASSES_URL and expired["count"]:
+            expired["count"] -= 1
+            return httpx.Response(200, content=LOGIN_PAGE)
+        return upstream.handler(request)
+
+    client = ECJTU("2021000000", "pwd", transport=httpx.MockTransport(handler))
+
+    courses = client.scheduled_courses.filter(date="2024-03-04")
+
+    assert courses[0].course == "高等数学"
+    assert upstream.logins == 2
+
+
+def test_concurrent_expired_requests_share_one_relogin():
+    upstream = FakeJWXT(login_delay=0.05)
+    client = ECJTU("2021000000", "pwd", transport=httpx.MockTransport(upstream.handler))
+    client.login()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if str(request.url) == GET_CLASSES_URL and upstream.logins == 1:
+            return httpx.Response(
+                302, headers={"location": ECJTU_LOGIN_URL}, request=request
+            )
+        return upstream.handler(request)
+
+    client._transport = httpx.MockTransport(handler)
+    results = client._parallel_map(
+        lambda _: client.scheduled_courses.filter(date="2024-03-04"), range(6)
+    )
+
+    assert all(courses[0].course == "高等数学" for courses in results)
+    assert upstream.logins == 2
+
+
+def test_session_expired_again_is_fatal():
+    upstream = FakeJWXT()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if str(request.url) == GET_CLASSES_URL:
+            upstream.calls["expired"] += 1
+            return httpx.Response(302, headers={"location": ECJTU_LOGIN_URL})
+        return upstream.handler(request)
+
+    client = ECJTU("2021000000", "pwd", transport=httpx.MockTransport(handler))
+
+    with pytest.raises(SessionExpiredError):
+        client.scheduled_courses.filter(date="2024-03-04")
+    assert upstream.calls["expired"] == 2
+    assert upstream.logins == 2
+
+
+def test_async_expired_session_is_relogged_and_replayed():
+    upstream = FakeJWXT()
+    expired = {"count": 1}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if str(request.url) == GET_CLASSES_URL and expired["count"]:
+            expired["count"] -= 1
+            return httpx.Response(
+                200, json={"weekcalendarpojoList": [], "msg": "请登录"}
+            )
+        return upstream.handler(request)
+
+    async def main():
+        client = AsyncECJTU("2021000000", "pwd", transport=httpx.MockTransport(handler))
+        return await client.scheduled_courses.filter(date="2024-03-04")
+
+    courses = asyncio.run(main())
+
+    assert courses[0].course == "高等数学"
+    assert upstream.logins == 2
+
+
+def test_session_snapshot_skips_login(tmp_path):
+    upstream = FakeJWXT()
+    transport = httpx.MockTransport(upstream.handler)
+    client = ECJTU("2021000000", "pwd", transport=transport)
+    client.login()
+    client.save_session(str(tmp_path / "session.json"))
+
+    restored = ECJTU.from_session(str(tmp_path / "session.json"), transport=transport)
+    courses = restored.scheduled_courses.filter(date="2024-03-04")
+
+    assert restored.stud_id == "2021000000"
+    assert courses[0].course == "高等数学"
+    assert upstream.logins == 1
+    assert [(c.domain, c.path) for c in restored.cookies.jar] == [
+        (c.domain, c.path) for c in client.cookies.jar
+    ]
+
+
+def test_session_store_is_keyed_by_student(tmp_path):
+    upstream = FakeJWXT()
+    transport = httpx.MockTransport(upstream.handler)
+    store = SessionStore(str(tmp_path))
+
+    ECJTU("2021000000", "pwd", session_store=store, transport=transport).login()
+    client = ECJTU("2021000000", "pwd", session_store=store, transport=transport)
+    other = ECJTU("2021000001", "pwd", session_store=store, transport=transport)
+
+    assert client.has_login
+    assert not other.has_login
+    assert upstream.logins == 1
+
+
+def test_concurrent_session_saves_do_not_collide(tmp_path):
+    path = str(tmp_path / "session.json")
+    client = ECJTU(cookie={"CASTGC": "TGT-1"})
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: client.save_session(path), range(32)))
+
+    assert ECJTU.from_session(path).cookies.get("CASTGC") == "TGT-1"
+    assert os.listdir(tmp_path) == ["session.json"]
+
+
+def test_cookie_clients_read_credentials_from_env_only_on_request(monkeypatch):
+    monkeypatch.setenv("ECJTU_STUDENT_ID", "2021000000")
+    monkeypatch.setenv("ECJTU_PASSWORD", "pwd")
+
+    client = ECJTU(cookie={"CASTGC": "TGT-1"})
+    assert (client.stud_id, client.password) == (None, None)
+
+    client = ECJTU(cookie={"CASTGC": "TGT-1"}, credentials_from_env=True)
+    assert (client.stud_id, client.password) == ("2021000000", "pwd")
+    assert ECJTU().password == "pwd"
+
+
+def test_shared_transport_keeps_cookies_per_client(monkeypatch):
+    upstream = FakeJWXT()
+    monkeypatch.setattr(
+        transport_module, "_transport", httpx.MockTransport(upstream.handler)
+    )
+
+    first = ECJTU("2021000000", "pwd", shared_transport=True)
+    second = ECJTU("2021000001", "pwd", shared_transport=True)
+    first.login()
+    first.close()
+
+    assert first.has_login
+    assert not second.has_login
+    assert second.scheduled_courses.filter(date="2024-03-04")
+    assert upstream.calls[("POST", PWD_ENC_URL)] == 2
+
+
+def test_stats_break_calls_down_by_phase():
+    upstream = FakeJWXT()
+    client = ECJTU(
+        "2021000000",
+        "pwd",
+        transport=httpx.MockTransport(upstream.handler),
+        collect_stats=True,
+    )
+    phases = []
+    client.stats.add_hook(lambda phase, seconds: phases.append(phase))
+
+    client.scheduled_courses.filter(date="2024-03-04")
+
+    assert phases == [
+        "parse",
+        "login.encrypt",
+        "parse",
+        "login.ticket",
+        "login.cas",
+        "login.jwxt",
+        "login.redirect",
+        "network",
+        "validate",
+        "parse",
+    ]
+    stats = client.stats.snapshot()
+    assert stats["network"]["count"] == 1
+    assert stats["parse"]["count"] == 3
+    assert all(phase["total"] >= 0 for phase in stats.values())
+    assert ECJTU("2021000000", "pwd").stats is None
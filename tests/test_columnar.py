@@ -0,0 +1,52 @@
+import pytest
+
+from ecjtu import protocol
+from ecjtu.columnar import ColumnarResult
+from ecjtu.models import Score
+from tests.benchmarks.bench_parsers import load_fixture
+
+
+def _scores():
+    sheet = protocol.parse_score_sheet(load_fixture("score_page.html"))
+    return list(sheet.iter())
+
+
+def test_round_trip_to_models():
+    scores = _scores()
+    result = ColumnarResult.from_models(Score, scores)
+
+    assert len(result) == len(scores) == 96
+    assert result.to_models() == scores
+    assert result.column("credit").typecode == "d"
+    assert result.column("semester")[0] is result.column("semester")[1]
+
+
+def test_filter_sort_and_group_by():
+    scores = _scores()
+    result = ColumnarResult.from_models(Score, scores, stud_id="2021000000")
+
+    filtered = result.filter(semester="2022.1", credit=lambda credit: credit >= 3)
+    assert filtered.to_models() == [
+        score for score in scores if score.semester == "2022.1" and score.credit >= 3
+    ]
+    assert set(filtered.column("stud_id")) == {"2021000000"}
+
+    credits = list(result.sort("credit", reverse=True).column("credit"))
+    assert credits == sorted((score.credit for score in scores), reverse=True)
+
+    groups = result.group_by("semester")
+    assert list(groups) == list(dict.fromkeys(score.semester for score in scores))
+    assert sum(len(group) for group in groups.values()) == len(scores)
+
+
+def test_concat_joins_students():
+    scores = _scores()
+    joined = ColumnarResult.concat(
+        ColumnarResult.from_models(Score, scores, stud_id=stud_id)
+        for stud_id in ["1", "2"]
+    )
+
+    assert len(joined) == 2 * len(scores)
+    assert list(joined.group_by("stud_id")) == ["1", "2"]
+    with pytest.raises(ValueError):
+        ColumnarResult.concat([joined, ColumnarResult.from_models(Score, scores)])
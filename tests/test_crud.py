@@ -0,0 +1,368 @@
+import asyncio
+import threading
+import time
+from datetime import date, datetime
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from ecjtu.client import BATCH_WORKERS, ECJTU, AsyncECJTU
+from ecjtu.constants import GET_GPA_URL
+from ecjtu.retry import RetryPolicy
+from ecjtu.utils import get_date_range, get_week_dates
+from tests.benchmarks.bench_parsers import load_fixture
+from tests.test_client import COURSE
+
+SCORE_PAGE = """
+<table>
+<tr><th>学号</th></tr><tr><td></td></tr><tr><td></td></tr>
+<tr><td>2021000000</td><td>张三</td><td>正常|有学籍</td><td></td><td></td><td></td>
+<td>4.01</td></tr>
+</table>
+<ul class="s_head"><li>学期</li><li>课程</li></ul>
+<ul class="s_termScore 2022_1"><li>2022.1</li><li>高等数学</li><li>必修课</li>
+<li>考试</li><li>6.0</li><li>90</li></ul>
+<ul class="s_termScore 2022_2"><li>2022.2</li><li>大学英语</li><li>必修课</li>
+<li>考试</li><li>3.0</li><li>良好</li></ul>
+<ul class="s_termScore 2022_2"><li>2022.2</li><li>体育</li><li>必修课</li>
+<li>考查</li><li>1.0</li><li>93</li></ul>
+"""
+ELECTIVE_PAGE = """<html><head><meta charset="utf-8"></head><body>
+<table><thead><tr><th>学期</th></tr></thead><tbody>
+<tr><td>2022.1</td><td>1</td><td></td><td></td><td>必修课</td><td>考查</td><td></td>
+<td>2.0</td><td>第1-16周 星期一 第3,4节[25-424]</td><td>李四</td><td></td>
+<td>Linux应用与编程(20221-1)【小1班】</td><td>2</td></tr>
+<tr><td>2022.1</td><td>2</td><td></td><td></td><td>限选课</td><td>考试</td><td></td>
+<td>3.5</td><td></td><td>王五 &amp; 赵六</td><td></td>
+<td>单片机原理及接口技术(20221-1)</td><td>3</td></tr>
+</tbody></table></body></html>"""
+
+
+def _make_client(calls: list) -> ECJTU:
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        page = SCORE_PAGE if str(request.url) == GET_GPA_URL else ELECTIVE_PAGE
+        return httpx.Response(200, text=page)
+
+    return ECJTU(cookie={"CASTGC": "TGT"}, transport=httpx.MockTransport(handler))
+
+
+def test_gpa_and_scores_share_one_fetch_of_the_score_page():
+    calls = []
+    client = _make_client(calls)
+
+    gpa = client.gpa.today()
+    scores = client.scores.all()
+    semesters = client.scores.filter_semesters(["2022.2", "2023.1"])
+
+    assert calls == [GET_GPA_URL]
+    assert (gpa.student_name, gpa.gpa, gpa.status) == ("张三", "4.01", "正常|有学籍")
+    assert list(scores) == ["2022.1", "2022.2"]
+    assert [score.course_name for score in scores["2022.2"]] == ["大学英语", "体育"]
+    assert scores["2022.1"][0].credit == 6.0
+    assert semesters == {"2022.2": scores["2022.2"], "2023.1": []}
+
+
+def test_force_refresh_fetches_the_score_page_again():
+    calls = []
+    client = _make_client(calls)
+
+    client.scores.filter(semester="2022.1")
+    client.gpa.today(force_refresh=True)
+
+    assert len(calls) == 2
+
+
+def test_iter_yields_rows_and_caches_once_exhausted():
+    calls = []
+    client = _make_client(calls)
+
+    first = next(client.elective_courses.iter(semester="2022.1"))
+    assert first.teacher == "李四"
+    courses = list(client.elective_courses.iter(semester="2022.1"))
+    assert [course.class_number for course in courses] == ["2", "3"]
+    assert client.elective_courses.filter(semester="2022.1") == courses
+    assert len(calls) == 2
+
+    scores = list(client.scores.iter(semester="2022.2"))
+    assert [score.course_name for score in scores] == ["大学英语", "体育"]
+    assert len(list(client.scores.iter())) == 3
+    assert client.gpa.today().gpa == "4.01"
+    assert len(calls) == 3
+
+
+def test_score_iter_goes_through_the_stats_and_stale_data():
+    responses = [httpx.Response(200, text=SCORE_PAGE), httpx.Response(503)]
+    client = ECJTU(
+        cookie={"CASTGC": "TGT"},
+        transport=httpx.MockTransport(lambda request: responses.pop(0)),
+        retry_policy=RetryPolicy(max_retries=0),
+        serve_stale=True,
+        collect_stats=True,
+    )
+
+    scores = list(client.scores.iter())
+    assert client.stats["parse"].count == 1
+    assert list(client.scores.iter(force_refresh=True)) == scores
+
+
+def test_modifying_the_score_sheet_does_not_change_the_cache():
+    calls = []
+    client = _make_client(calls)
+
+    sheet = client.scores.sheet()
+    sheet.gpa.gpa = "0.00"
+    sheet.scores["2022.1"][0].grade = "0"
+    sheet.add(sheet.scores["2022.2"].pop())
+
+    cached = client.scores.sheet()
+    assert cached.gpa.gpa == "4.01"
+    assert cached.scores["2022.1"][0].grade == "90"
+    assert [score.course_name for score in cached.scores["2022.2"]] == [
+        "大学英语",
+        "体育",
+    ]
+    assert len(calls) == 1
+
+
+def test_async_iter_yields_rows():
+    async def main():
+        async with AsyncECJTU(
+            cookie={"CASTGC": "TGT"},
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, text=ELECTIVE_PAGE)
+            ),
+        ) as client:
+            return [
+                course.class_number
+                async for course in client.elective_courses.iter(semester="2022.1")
+            ]
+
+    assert asyncio.run(main()) == ["2", "3"]
+
+
+@pytest.mark.parametrize("parse_executor", ["thread", "process"])
+def test_async_parse_executor_gives_the_same_results(parse_executor):
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = SCORE_PAGE if str(request.url) == GET_GPA_URL else ELECTIVE_PAGE
+        return httpx.Response(200, text=page)
+
+    async def main():
+        async with AsyncECJTU(
+            cookie={"CASTGC": "TGT"},
+            transport=httpx.MockTransport(handler),
+            parse_executor=parse_executor,
+        ) as client:
+            courses = [
+                course.class_number
+                async for course in client.elective_courses.iter(semester="2022.1")
+            ]
+            scores = [score.course_name async for score in client.scores.iter()]
+            gpa = await client.gpa.today()
+            assert client.parse_executor is not None
+        assert client.parse_executor is None
+        return courses, scores, gpa.gpa
+
+    assert asyncio.run(main()) == (["2", "3"], ["高等数学", "大学英语", "体育"], "4.01")
+
+
+def test_async_unknown_parse_executor_is_rejected():
+    with pytest.raises(ValueError):
+        AsyncECJTU(cookie={"CASTGC": "TGT"}, parse_executor="fork")
+
+
+def test_week_response_serves_every_day_of_its_iso_week():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.content)
+        return httpx.Response(200, content=load_fixture("weekcalendar.json"))
+
+    client = ECJTU(cookie={"CASTGC": "TGT"}, transport=httpx.MockTransport(handler))
+
+    # the first response tells that the endpoint answers with whole weeks
+    client.scheduled_courses.filter(date="2024-03-06")
+    courses = client.scheduled_courses.range("2024-03-06", "2024-03-17")
+    assert len(calls) == 2
+    assert list(courses) == get_date_range("2024-03-06", "2024-03-17")
+    counts = [len(courses[day]) for day in get_week_dates("2024-03-06")[2:]]
+    assert counts == [0, 2, 3, 1, 1]
+    assert all(course.week_day == 2 for course in courses["2024-03-12"])
+    assert client.scheduled_courses.filter(date="2024-03-08") == courses["2024-03-08"]
+    assert len(calls) == 2
+
+
+def test_day_responses_are_fetched_per_date():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.content)
+        return httpx.Response(200, json={"weekcalendarpojoList": []})
+
+    client = ECJTU(cookie={"CASTGC": "TGT"}, transport=httpx.MockTransport(handler))
+
+    courses = client.scheduled_courses.range("2024-03-04", "2024-03-10")
+    assert len(calls) == 7
+    assert courses == {day: [] for day in get_week_dates("2024-03-04")}
+
+
+class DayUpstream:
+    """Answers the courses of the requested date only, named after the date,
+    counting the requests in flight."""
+
+    def __init__(self, delays=None, failures=()):
+        self.delays = delays or {}
+        self.failures = failures
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def _response(self, request: httpx.Request) -> httpx.Response:
+        day = parse_qs(request.content.decode())["date"][0]
+        if day in self.failures:
+            raise httpx.ConnectError(f"failed {day}", request=request)
+        week_day = datetime.strptime(day, "%Y-%m-%d").isoweekday()
+        course = dict(COURSE, course=day, weekDay=week_day)
+        return httpx.Response(200, json={"weekcalendarpojoList": [course]})
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delays.get(request.content.decode()[5:], 0.02))
+            return self._response(request)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    async def async_handler(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(request.content.decode()[5:], 0.02))
+            return self._response(request)
+        finally:
+            self.in_flight -= 1
+
+
+def _day_client(upstream: DayUpstream, **kwargs) -> ECJTU:
+    return ECJTU(
+        cookie={"CASTGC": "TGT"},
+        transport=httpx.MockTransport(upstream.handler),
+        retry_policy=RetryPolicy(max_retries=0),
+        **kwargs,
+    )
+
+
+def test_filter_accepts_a_date_object():
+    courses = _day_client(DayUpstream()).scheduled_courses.filter(date=date(2024, 3, 6))
+    assert [course.course for course in courses] == ["2024-03-06"]
+
+
+def test_range_keeps_date_order_across_weeks():
+    # later dates answer first
+    delays = {
+        day: 0.05 - i * 0.005
+        for i, day in enumerate(get_date_range("2024-03-02", "2024-03-12"))
+    }
+    client = _day_client(DayUpstream(delays))
+
+    courses = client.scheduled_courses.range("2024-03-02", "2024-03-12")
+
+    assert list(courses) == get_date_range("2024-03-02", "2024-03-12")
+    assert all(courses[day][0].course == day for day in courses)
+
+
+def test_this_week_returns_the_days_in_order():
+    client = _day_client(DayUpstream())
+
+    week = client.scheduled_courses.this_week()
+
+    dates = get_week_dates(date.today())
+    assert [courses[0].course for courses in week] == dates
+
+
+def test_clients_share_the_batch_worker_pool():
+    upstream = DayUpstream(delays={})
+    # kept open, as in a pool of clients
+    clients = [_day_client(upstream) for _ in range(10)]
+    for client in clients:
+        client.scheduled_courses.range("2024-03-04", "2024-03-10")
+
+    workers = [
+        thread for thread in threading.enumerate() if thread.name.startswith("ecjtu_")
+    ]
+    assert 1 < len(workers) <= BATCH_WORKERS
+
+
+def test_day_responses_are_fetched_in_a_single_round():
+    upstream = DayUpstream(delays={day: 0.05 for day in get_week_dates("2024-03-04")})
+    client = _day_client(upstream)
+
+    client.scheduled_courses.range("2024-03-04", "2024-03-10")
+    assert upstream.max_in_flight == 7
+
+
+def test_first_failed_date_is_raised_when_several_fail():
+    # the later date fails first
+    upstream = DayUpstream(
+        delays={"2024-03-06": 0.05, "2024-03-08": 0.0},
+        failures=("2024-03-06", "2024-03-08"),
+    )
+    client = _day_client(upstream)
+
+    with pytest.raises(httpx.ConnectError, match="2024-03-06"):
+        client.scheduled_courses.range("2024-03-04", "2024-03-10")
+
+
+def test_worker_pool_bounds_the_requests_in_flight():
+    upstream = DayUpstream()
+    client = _day_client(upstream, max_workers=3)
+
+    client.scheduled_courses.range("2024-03-04", "2024-03-17")
+
+    assert 1 < upstream.max_in_flight <= 3
+
+
+def _async_day_client(upstream: DayUpstream) -> AsyncECJTU:
+    return AsyncECJTU(
+        cookie={"CASTGC": "TGT"},
+        transport=httpx.MockTransport(upstream.async_handler),
+        retry_policy=RetryPolicy(max_retries=0),
+    )
+
+
+def test_async_range_keeps_date_order_and_bounds_concurrency():
+    delays = {
+        day: 0.05 - i * 0.005
+        for i, day in enumerate(get_date_range("2024-03-02", "2024-03-12"))
+    }
+    upstream = DayUpstream(delays)
+
+    async def main():
+        async with _async_day_client(upstream) as client:
+            return await client.scheduled_courses.range(
+                "2024-03-02", "2024-03-12", max_concurrency=2
+            )
+
+    courses = asyncio.run(main())
+    assert list(courses) == get_date_range("2024-03-02", "2024-03-12")
+    assert all(courses[day][0].course == day for day in courses)
+    assert upstream.max_in_flight == 2
+
+
+def test_async_first_failed_date_is_raised_when_several_fail():
+    upstream = DayUpstream(
+        delays={"2024-03-06": 0.05, "2024-03-08": 0.0},
+        failures=("2024-03-06", "2024-03-08"),
+    )
+
+    async def main():
+        async with _async_day_client(upstream) as client:
+            await client.scheduled_courses.this_week()
+            await client.scheduled_courses.range("2024-03-04", "2024-03-10")
+
+    with pytest.raises(httpx.ConnectError, match="2024-03-06"):
+        asyncio.run(main())
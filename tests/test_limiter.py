@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+from ecjtu import limiter as limiter_module
+from ecjtu.client import ECJTU
+from ecjtu.constants import CAS_ECJTU_DOMAIN, GET_GPA_URL
+from ecjtu.limiter import Budget, LimitedTransport, UpstreamLimiter
+from ecjtu.retry import RetryPolicy
+
+CAS_URL = f"http://{CAS_ECJTU_DOMAIN}/"
+
+
+def test_token_bucket_caps_the_rate():
+    budget = Budget("test", rate=1.0, burst=2, initial_concurrency=8)
+
+    assert budget.try_acquire() == 0
+    assert budget.try_acquire() == 0
+    assert 0 < budget.try_acquire() <= 1.0
+
+
+def test_concurrency_limit_backs_off_and_recovers():
+    budget = Budget("test", rate=1000, burst=1000, initial_concurrency=4)
+    for _ in range(4):
+        assert budget.try_acquire() == 0
+    assert budget.try_acquire() > 0
+
+    budget.release(0.1, overloaded=True)
+    budget.release(0.1, overloaded=True)
+    assert budget.concurrency_limit == 2
+
+    for _ in range(20):
+        while budget.in_flight < budget.concurrency_limit:
+            budget.try_acquire()
+        budget.release(0.1, overloaded=False)
+    assert budget.concurrency_limit > 2
+
+
+def test_slow_responses_count_as_overload():
+    budget = Budget("test", initial_concurrency=4, target_latency=1.0)
+    budget.try_acquire()
+    budget.release(1.5, overloaded=False)
+
+    assert budget.concurrency_limit == 2
+
+
+def test_clients_share_the_cas_and_jwxt_budgets(monkeypatch):
+    limiter = UpstreamLimiter()
+    monkeypatch.setattr(limiter_module, "_limiter", limiter)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503 if request.url == CAS_URL else 200)
+
+    clients = [
+        ECJTU(
+            cookie={"CASTGC": "TGT"},
+            transport=httpx.MockTransport(handler),
+            retry_policy=RetryPolicy(max_retries=0),
+            limit_upstream=True,
+        )
+        for _ in range(2)
+    ]
+    for client in clients:
+        assert client.get(GET_GPA_URL).status_code == 200
+    assert clients[0].get(CAS_URL).status_code == 503
+
+    assert limiter.jwxt.concurrency_limit == 4
+    assert limiter.cas.concurrency_limit == 1
+    assert limiter.jwxt.in_flight == limiter.cas.in_flight == 0
+
+
+class _Chunks(httpx.SyncByteStream):
+    """A body read from the network, not loaded in memory by httpx.Response."""
+
+    def __iter__(self):
+        yield b"chunk"
+
+
+def _limited_client(limiter, monkeypatch, handler, **kwargs) -> ECJTU:
+    monkeypatch.setattr(limiter_module, "_limiter", limiter)
+    return ECJTU(
+        cookie={"CASTGC": "TGT"},
+        transport=httpx.MockTransport(handler),
+        retry_policy=RetryPolicy(max_retries=0),
+        limit_upstream=True,
+        **kwargs,
+    )
+
+
+def test_streamed_body_holds_its_slot_until_closed(monkeypatch):
+    limiter = UpstreamLimiter(jwxt=Budget("jwxt", initial_concurrency=1))
+    client = _limited_client(
+        limiter, monkeypatch, lambda request: httpx.Response(200, stream=_Chunks())
+    )
+    waiter = threading.Thread(
+        target=limiter.acquire, args=(client.build_request("GET", GET_GPA_URL),)
+    )
+
+    with client.stream("GET", GET_GPA_URL) as response:
+        assert limiter.jwxt.in_flight == 1
+        waiter.start()
+        time.sleep(0.05)
+        assert waiter.is_alive()
+        # reading the whole body closes the response and releases the slot
+        assert response.read() == b"chunk"
+
+    # the waiter is woken by the release, it takes the slot
+    waiter.join(timeout=1)
+    assert not waiter.is_alive()
+    assert limiter.jwxt.in_flight == 1
+
+
+def test_async_waiter_is_woken_by_a_release_from_another_thread():
+    budget = Budget("test", initial_concurrency=1)
+    budget.try_acquire()
+
+    async def main():
+        threading.Timer(0.05, budget.release, args=(0.05, False)).start()
+        await asyncio.wait_for(budget.await_slot(), timeout=1)
+        return budget.try_acquire()
+
+    assert asyncio.run(main()) == 0
+
+
+def test_transports_built_from_the_client_arguments_are_wrapped(monkeypatch):
+    limiter = UpstreamLimiter()
+    in_flight = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        in_flight.append(limiter.jwxt.in_flight)
+        return httpx.Response(200)
+
+    client = _limited_client(
+        limiter,
+        monkeypatch,
+        handler,
+        mounts={"https://jwxt.ecjtu.edu.cn": httpx.MockTransport(handler)},
+        proxy="http://127.0.0.1:3128",
+    )
+    assert client.get(GET_GPA_URL).status_code == 200
+    assert in_flight == [1]
+    assert all(
+        isinstance(transport, LimitedTransport) for transport in client._mounts.values()
+    )
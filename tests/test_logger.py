@@ -0,0 +1,59 @@
+import datetime
+import logging
+import os
+
+import pytest
+
+from ecjtu.utils.logger import (
+    DailyFileHandler,
+    _level_from_env,
+    get_log_path,
+    log_manager,
+    logger,
+)
+
+
+def test_records_are_written_by_a_background_thread(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    log_manager.stop()
+
+    logger.info("hello from the test")
+    assert log_manager.listener is not None
+    log_manager.stop()
+
+    assert get_log_path().startswith(str(tmp_path))
+    with open(get_log_path(), encoding="utf-8") as f:
+        assert "hello from the test" in f.read()
+
+
+def test_daily_file_handler_switches_file_without_renaming(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    handler = DailyFileHandler()
+    tomorrow = datetime.datetime.now() + datetime.timedelta(days=1)
+
+    for created, msg in ((None, "today"), (tomorrow.timestamp(), "tomorrow")):
+        record = logging.LogRecord("ecjtu", logging.INFO, "", 0, msg, None, None)
+        if created is not None:
+            record.created = created
+        handler.handle(record)
+    handler.close()
+
+    with open(get_log_path(), encoding="utf-8") as f:
+        assert f.read() == "today\n"
+    with open(get_log_path(tomorrow.date()), encoding="utf-8") as f:
+        assert f.read() == "tomorrow\n"
+    assert len(os.listdir(tmp_path / ".ecjtu" / "logs")) == 2
+
+
+def test_level_is_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("ECJTU_LOG_LEVEL", "warning")
+    assert _level_from_env() == logging.WARNING
+
+    monkeypatch.delenv("ECJTU_LOG_LEVEL")
+    assert _level_from_env() == logging.DEBUG
+
+
+def test_unknown_level_falls_back_to_debug(monkeypatch):
+    monkeypatch.setenv("ECJTU_LOG_LEVEL", "verbose")
+    with pytest.warns(RuntimeWarning, match="VERBOSE"):
+        assert _level_from_env() == logging.DEBUG
@@ -0,0 +1,52 @@
+import httpx
+
+from ecjtu import metrics
+from ecjtu.client import ECJTU
+from ecjtu.constants import GET_GPA_URL
+from ecjtu.metrics import Counter, Histogram, Registry
+from tests.test_crud import SCORE_PAGE
+
+
+def test_render_in_the_prometheus_text_format():
+    registry = Registry()
+    counter = Counter("test_total", "Test counter", ("route",), registry=registry)
+    histogram = Histogram(
+        "test_seconds", "Test histogram", ("route",), registry=registry, buckets=(1,)
+    )
+    counter.inc('/a"b')
+    counter.inc('/a"b', amount=2)
+    histogram.observe(0.5, "/a")
+    histogram.observe(1.5, "/a")
+
+    assert registry.render().splitlines() == [
+        "# HELP test_total Test counter",
+        "# TYPE test_total counter",
+        'test_total{route="/a\\"b"} 3',
+        "# HELP test_seconds Test histogram",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="/a",le="1"} 1',
+        'test_seconds_bucket{route="/a",le="+Inf"} 2',
+        'test_seconds_sum{route="/a"} 2',
+        'test_seconds_count{route="/a"} 2',
+    ]
+
+
+def test_client_records_upstream_latency_and_cache_lookups():
+    endpoint = httpx.URL(GET_GPA_URL).host + httpx.URL(GET_GPA_URL).path
+    requests = metrics.UPSTREAM_LATENCY.count(endpoint)
+    hits = metrics.CACHE_LOOKUPS.get("sheet", "hit")
+    misses = metrics.CACHE_LOOKUPS.get("sheet", "miss")
+
+    client = ECJTU(
+        cookie={"CASTGC": "TGT"},
+        transport=httpx.MockTransport(lambda _: httpx.Response(200, text=SCORE_PAGE)),
+        collect_metrics=True,
+    )
+    client.gpa.today()
+    client.scores.today()
+
+    assert metrics.UPSTREAM_LATENCY.count(endpoint) == requests + 1
+    assert metrics.UPSTREAM_REQUESTS.get(endpoint, "200") >= 1
+    assert metrics.CACHE_LOOKUPS.get("sheet", "miss") == misses + 1
+    assert metrics.CACHE_LOOKUPS.get("sheet", "hit") == hits + 1
+    assert "ecjtu_upstream_request_duration_seconds_bucket" in metrics.render()
@@ -0,0 +1,61 @@
+import httpx
+import pytest
+
+from ecjtu import parser
+from ecjtu.client import ECJTU
+from ecjtu.constants import GET_GPA_URL
+from tests.test_crud import ELECTIVE_PAGE, SCORE_PAGE
+
+BACKENDS = [
+    "html.parser",
+    pytest.param(
+        "lxml",
+        marks=pytest.mark.skipif(
+            not parser._is_available("lxml"), reason="lxml is not installed"
+        ),
+    ),
+]
+
+
+@pytest.fixture
+def backend(request):
+    parser.set_parser_backend(request.param)
+    yield request.param
+    parser.set_parser_backend()
+
+
+def _fetch_all(client: ECJTU):
+    return (
+        client.scores.sheet().model_dump(),
+        [
+            course.model_dump()
+            for course in client.elective_courses.filter(semester="2022.1")
+        ],
+    )
+
+
+def _make_client() -> ECJTU:
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = SCORE_PAGE if str(request.url) == GET_GPA_URL else ELECTIVE_PAGE
+        return httpx.Response(
+            200,
+            content=page.encode(),
+            headers={"content-type": "text/html; charset=utf-8"},
+        )
+
+    return ECJTU(cookie={"CASTGC": "TGT"}, transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.parametrize("backend", BACKENDS, indirect=True)
+def test_backends_parse_the_same_models(backend):
+    parser.set_parser_backend("html.parser")
+    expected = _fetch_all(_make_client())
+
+    parser.set_parser_backend(backend)
+    assert _fetch_all(_make_client()) == expected
+    assert expected[1][1]["teacher"] == "王五 & 赵六"
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        parser.set_parser_backend("html5")
@@ -0,0 +1,112 @@
+import threading
+
+import httpx
+import pytest
+
+from ecjtu.client import ECJTU
+from ecjtu.pool import ClientPool
+
+
+def _make_pool(**kwargs) -> ClientPool:
+    def factory(stud_id, password):
+        transport = httpx.MockTransport(lambda request: httpx.Response(200))
+        return ECJTU(stud_id, password, cookie={"CASTGC": "TGT"}, transport=transport)
+
+    return ClientPool(factory=factory, **kwargs)
+
+
+def test_clients_are_reused_by_student():
+    pool = _make_pool()
+
+    assert pool.get("2021000000") is pool.get("2021000000")
+    assert pool.get("2021000000") is not pool.get("2021000001")
+    assert len(pool) == 2
+
+
+def test_least_recently_used_client_is_evicted_and_closed():
+    pool = _make_pool(max_size=2)
+    first = pool.get("2021000000")
+    second = pool.get("2021000001")
+    pool.get("2021000000")
+
+    pool.get("2021000002")
+
+    assert "2021000001" not in pool
+    assert second.is_closed
+    assert not first.is_closed
+
+
+def test_idle_clients_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("ecjtu.pool.time.monotonic", lambda: now[0])
+    pool = _make_pool(idle_ttl=60)
+    idle = pool.get("2021000000")
+
+    now[0] += 61
+    pool.get("2021000001")
+
+    assert "2021000000" not in pool
+    assert idle.is_closed
+
+
+def test_close_closes_every_client():
+    with _make_pool() as pool:
+        clients = [pool.get("2021000000"), pool.get("2021000001")]
+
+    assert len(pool) == 0
+    assert all(client.is_closed for client in clients)
+
+
+def test_leased_client_is_closed_after_its_last_lease():
+    pool = _make_pool()
+    with pool.lease("2021000000") as client:
+        pool.remove("2021000000")
+        assert "2021000000" not in pool
+        assert not client.is_closed
+        assert pool.get("2021000000") is not client
+
+    assert client.is_closed
+
+
+def test_clients_are_created_outside_the_pool_lock():
+    started = threading.Barrier(2, timeout=5)
+    created = []
+
+    def factory(stud_id, password):
+        # both calls must run at once to pass the barrier
+        started.wait()
+        client = ECJTU(stud_id, cookie={"CASTGC": "TGT"})
+        created.append(client)
+        return client
+
+    pool = ClientPool(factory=factory)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(pool.get("2021000000")))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # the client created last lost the race and is closed
+    assert results[0] is results[1]
+    assert len(pool) == 1
+    assert sorted(client.is_closed for client in created) == [False, True]
+
+
+def test_wrong_password_does_not_get_the_pooled_session():
+    pool = _make_pool()
+    client = pool.get("2021000000", "pwd")
+
+    with pytest.raises(ValueError, match="2021000000"):
+        pool.get("2021000000", "wrong")
+    with pytest.raises(ValueError):
+        with pool.lease("2021000000", "wrong"):
+            pass
+
+    assert client.password == "pwd"
+    assert pool.get("2021000000", "pwd") is client
+    assert pool.get("2021000000") is client
+    assert pool._entries["2021000000"].leases == 0
@@ -0,0 +1,72 @@
+import json
+from datetime import date
+
+import pytest
+
+from ecjtu import protocol
+from ecjtu.constants import GET_CLASSES_URL, GET_ELERTIVE_COURSE_URL_TEMPLATE
+from tests.benchmarks.bench_parsers import load_fixture
+from tests.test_client import COURSE
+
+
+def test_request_builders():
+    request = protocol.build_scheduled_courses_request("2024-03-04")
+    assert (request.method, request.url) == ("POST", GET_CLASSES_URL)
+    assert request.data == {"date": "2024-03-04"}
+
+    request = protocol.build_elective_courses_request("2023.1")
+    assert request.url == GET_ELERTIVE_COURSE_URL_TEMPLATE + "?term=2023.1"
+
+
+def test_parsers_take_bytes_and_return_models():
+    courses = protocol.parse_scheduled_courses(load_fixture("weekcalendar.json"))
+    elective_courses = protocol.parse_elective_courses(
+        load_fixture("elective_page.html")
+    )
+    gpa, scores = protocol.parse_score_page(load_fixture("score_page.html"))
+
+    assert courses and all(1 <= course.week_day <= 7 for course in courses)
+    assert len(elective_courses) == 40
+    assert gpa.student_name == "张三"
+    assert next(scores).semester == "2021.1"
+    assert protocol.parse_login_ticket(load_fixture("cas_login.html")).startswith("LT-")
+    assert protocol.parse_enc_password(b"{'passwordEnc': 'ENC'}") == "ENC"
+
+
+def test_bulk_validation_matches_row_by_row():
+    content = load_fixture("elective_page.html")
+    assert protocol.parse_elective_courses(content) == list(
+        protocol.iter_elective_courses(content)
+    )
+
+    content = load_fixture("score_page.html")
+    gpa, scores = protocol.parse_score_page(content)
+    sheet = protocol.parse_score_sheet(content)
+    assert sheet.gpa == gpa
+    assert [
+        score for semester in sheet.semesters for score in sheet.get(semester)
+    ] == list(scores)
+
+
+def test_week_calendar_rejects_a_weekday_out_of_range():
+    content = json.dumps(
+        {"weekcalendarpojoList": [{**COURSE, "weekDay": 3}, {**COURSE, "weekDay": 4}]}
+    ).encode()
+    week = protocol.parse_week_calendar(content, "2024-03-04")
+    assert [len(week[day]) for day in sorted(week)] == [0, 0, 1, 1, 0, 0, 0]
+
+    for week_day in (0, 8):
+        content = json.dumps(
+            {"weekcalendarpojoList": [{**COURSE, "weekDay": week_day}]}
+        ).encode()
+        with pytest.raises(ValueError, match=f"weekDay {week_day}"):
+            protocol.parse_week_calendar(content, "2024-03-04", covers_week=True)
+        with pytest.raises(ValueError, match=f"weekDay {week_day}"):
+            protocol.parse_week_calendar(content, "2024-03-04")
+
+
+def test_week_calendar_accepts_a_date_object():
+    content = json.dumps({"weekcalendarpojoList": [COURSE]}).encode()
+    assert protocol.parse_week_calendar(content, date(2024, 3, 4)) == (
+        protocol.parse_week_calendar(content, "2024-03-04")
+    )
@@ -0,0 +1,72 @@
+import httpx
+import pytest
+
+from ecjtu.retry import RetryPolicy, is_login_redirect
+
+URL = "https://jwxt.ecjtu.edu.cn/Schedule/Weekcalendar_getTodayWeekcalendar.action"
+
+
+def _response(status_code: int, **kwargs) -> httpx.Response:
+    return httpx.Response(status_code, request=httpx.Request("GET", URL), **kwargs)
+
+
+def test_backoff_grows_exponentially_and_is_capped():
+    policy = RetryPolicy(backoff_factor=0.5, max_backoff=3.0, jitter=0)
+
+    assert [policy.get_backoff(i) for i in range(4)] == [0.5, 1.0, 2.0, 3.0]
+
+
+def test_jitter_only_shortens_the_delay():
+    policy = RetryPolicy(backoff_factor=1.0, jitter=0.5)
+
+    delays = [policy.get_backoff(0) for _ in range(100)]
+    assert all(0.5 <= delay <= 1.0 for delay in delays)
+
+
+@pytest.mark.parametrize(
+    "exc, retryable",
+    [
+        (httpx.ConnectError("reset"), True),
+        (httpx.ReadTimeout("slow"), True),
+        (httpx.RemoteProtocolError("closed"), True),
+        (httpx.UnsupportedProtocol("ftp"), False),
+        (httpx.TooManyRedirects("loop"), False),
+    ],
+)
+def test_classify_exceptions(exc, retryable):
+    policy = RetryPolicy(jitter=0)
+
+    assert (policy.next_delay(0, 0.0, exc=exc) is not None) is retryable
+
+
+@pytest.mark.parametrize("status_code, retryable", [(503, True), (404, False)])
+def test_classify_responses(status_code, retryable):
+    policy = RetryPolicy(jitter=0)
+
+    delay = policy.next_delay(0, 0.0, response=_response(status_code))
+    assert (delay is not None) is retryable
+
+
+def test_retry_budget():
+    policy = RetryPolicy(max_retries=2, backoff_factor=1.0, jitter=0, max_elapsed=5)
+    exc = httpx.ConnectError("reset")
+
+    assert policy.next_delay(1, 0.0, exc=exc) == 2.0
+    assert policy.next_delay(2, 0.0, exc=exc) is None
+    assert policy.next_delay(1, 3.5, exc=exc) is None
+
+
+def test_retry_after_header_is_respected():
+    policy = RetryPolicy(backoff_factor=0.1, jitter=0)
+
+    response = _response(503, headers={"retry-after": "2"})
+    assert policy.next_delay(0, 0.0, response=response) == 2.0
+
+
+def test_login_redirect():
+    redirect = _response(
+        302, headers={"location": "http://cas.ecjtu.edu.cn/cas/login?service=x"}
+    )
+
+    assert is_login_redirect(redirect)
+    assert not is_login_redirect(_response(200))
@@ -0,0 +1,28 @@
+import httpx
+from fastapi.testclient import TestClient
+
+from ecjtu.client import ECJTU
+from ecjtu.pool import ClientPool
+from ecjtu.server import api, auth
+from tests.test_crud import DayUpstream
+
+
+def test_schedule_date_route_answers_the_courses_of_the_date(monkeypatch):
+    upstream = DayUpstream()
+    monkeypatch.setattr(auth, "get_stud_id", lambda token: "2021000000")
+    monkeypatch.setattr(
+        api,
+        "client_pool",
+        ClientPool(
+            factory=lambda stud_id, _: ECJTU(
+                stud_id,
+                cookie={"CASTGC": "TGT"},
+                transport=httpx.MockTransport(upstream.handler),
+            )
+        ),
+    )
+
+    response = TestClient(api.app).get("/schedule/2024-03-06", headers={"token": "t"})
+
+    assert response.status_code == 200
+    assert [course["course"] for course in response.json()["data"]] == ["2024-03-06"]